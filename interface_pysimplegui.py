@@ -36,13 +36,15 @@ from sportsbetting.interface_functions import (odds_table_combine,
                                                delete_site_interface,
                                                get_current_competitions_interface,
                                                best_combine_reduit_interface,
-                                               find_surebets_interface, odds_match_surebets_interface,
+                                               find_surebets_interface, odds_match_surebets_interface, odds_changes_interface,
                                                find_values_interface, odds_match_values_interface,
                                                open_bookmaker_odds, find_perf_players, display_middle_info, search_perf,
                                                display_surebet_info, best_match_miles_interface, sort_middle_gap, sort_middle_trj,
                                                sort_middle_proba, get_best_conversion_rates_freebet, compute_odds, calculator_interface)
+from sportsbetting.watch_functions import OddsChange, watch_competitions
 
-PATH_DATA = os.path.dirname(sb.__file__) + "/resources/data.json"
+PATH_DATA = os.path.dirname(sb.__file__) + "/resources/data.npz"
+PATH_DATA_JSON = os.path.dirname(sb.__file__) + "/resources/data.json"
 PATH_SITES = os.path.dirname(sb.__file__) + "/resources/sites.json"
 PATH_THEME = os.path.dirname(sb.__file__) + "/../theme.txt"
 
@@ -55,10 +57,18 @@ print(r"""
     /_/                                                         /____/   
 """)
 
-try:
-    sb.ODDS = load_odds(PATH_DATA)
-except FileNotFoundError:
-    pass
+
+def reload_odds():
+    """
+    Recharge les cotes sauvegardées (data.npz, ou à défaut l'ancien data.json)
+    """
+    try:
+        sb.ODDS = load_odds(PATH_DATA if os.path.exists(PATH_DATA) else PATH_DATA_JSON)
+    except FileNotFoundError:
+        pass
+
+
+reload_odds()
 
 HEIGHT_FIELD_SIMPLE     = 10
 HEIGHT_FIELD_GAGNANT    = 12
@@ -66,6 +76,7 @@ HEIGHT_FIELD_COMBINE    = 18
 LENGTH_FIELD            = 160
 
 sb.DB_MANAGEMENT = "--db" in sys.argv
+sb.HISTORY = "--history" in sys.argv
 nb_bookmakers = len(sb.BOOKMAKERS)
 
 
@@ -97,6 +108,8 @@ parsing_layout = [
      sg.Col([[sg.Button('Récupérer tous les sports', key="START_ALL_PARSING")]]),
      sg.Col([[sg.Checkbox('Seulement football, basketball et tennis', key="PARTIAL_PARSING", default=True)]]),
      sg.Col([[sg.Button('Stop', key="STOP_PARSING", button_color=("white", "red"), visible=False)]]),
+     sg.Col([[sg.Button('Suivre les cotes', key="START_WATCH")]]),
+     sg.Col([[sg.Button('Arrêter le suivi', key="STOP_WATCH", button_color=("white", "red"), visible=False)]]),
      sg.Col([[sg.ProgressBar(max_value=100, orientation='h', size=(20, 20), key='PROGRESS_PARSING',
                              visible=False)]]),
      sg.Col([[sg.Text("Initialisation de selenium en cours", key="TEXT_PARSING", visible=False)]]),
@@ -659,6 +672,7 @@ thread = None
 thread_stakes = None
 thread_combine = None
 thread_perf = None
+watcher = None
 window_odds_active = False
 sport = ''
 old_stdout = sys.stdout
@@ -753,11 +767,17 @@ while True:
             window["PROGRESS_PERF"].update(ceil(sb.PROGRESS), 100)
     except AttributeError:
         pass
+    changes = []
     try:  # see if something has been posted to Queue
         message = sb.QUEUE_TO_GUI.get_nowait()
+        while isinstance(message, OddsChange):  # modifications des cotes en mode suivi
+            changes.append(message)
+            message = sb.QUEUE_TO_GUI.get_nowait()
         sb.QUEUE_FROM_GUI.put(sg.popup_yes_no(message))
     except queue.Empty:  # get_nowait() will get exception when Queue is empty
         pass  # break from the loop if no more messages are queued up
+    if changes:
+        odds_changes_interface(window, values, changes)
     if event == "SPORT":
         sport = values["SPORT"][0]
         competitions = get_all_competitions(sport)
@@ -850,6 +870,19 @@ while True:
         window["STOP_PARSING"].update(visible=False)
         window["TEXT_PARSING"].update("Interruption en cours")
         sb.ABORT = True
+    elif event == "START_WATCH":
+        selected_competitions = values["COMPETITIONS"]
+        selected_sites = values["SITES"]
+        if selected_competitions and selected_sites and not watcher:
+            watcher = watch_competitions(selected_competitions, sport, *selected_sites)
+            window["START_WATCH"].update(visible=False)
+            window["STOP_WATCH"].update(visible=True)
+    elif event == "STOP_WATCH":
+        if watcher:
+            threading.Thread(target=watcher.stop).start()  # attend la fin des récupérations en cours
+            watcher = None
+        window["STOP_WATCH"].update(visible=False)
+        window["START_WATCH"].update(visible=True)
     elif event == "BEST_MATCH_UNDER_CONDITION":
         best_match_under_conditions_interface(window, values)
     elif event == "DELETE_MATCH_UNDER_CONDITION":
@@ -858,7 +891,7 @@ while True:
         if sport_under_condition and match_under_condition in sb.ODDS[sport_under_condition[0]]:
             del sb.ODDS[sport_under_condition[0]][match_under_condition]
     elif event == "RELOAD_ODDS_UNDER_CONDITION":
-        sb.ODDS = load_odds(PATH_DATA)
+        reload_odds()
     elif event == "SPORT_STAKE":
         try:
             matches = sorted(list(sb.ODDS[values["SPORT_STAKE"][0]]))
@@ -875,7 +908,7 @@ while True:
         if sport_freebet and match_freebet in sb.ODDS[sport_freebet[0]]:
             del sb.ODDS[sport_freebet[0]][match_freebet]
     elif event == "RELOAD_ODDS_FREEBET":
-        sb.ODDS = load_odds(PATH_DATA)
+        reload_odds()
     elif event == "BEST_MATCH_CASHBACK":
         best_match_cashback_interface(window, values)
     elif event == "DELETE_MATCH_CASHBACK":
@@ -884,7 +917,7 @@ while True:
         if sport_cashback and match_cashback in sb.ODDS[sport_cashback[0]]:
             del sb.ODDS[sport_cashback[0]][match_cashback]
     elif event == "RELOAD_ODDS_CASHBACK":
-        sb.ODDS = load_odds(PATH_DATA)
+        reload_odds()
     elif event == "BEST_MATCHES_COMBINE":
         def combine_thread():
             best_matches_combine_interface(window, values)
@@ -949,7 +982,7 @@ while True:
         if sport_gagnant and match_gagnant in sb.ODDS[sport_gagnant[0]]:
             del sb.ODDS[sport_gagnant[0]][match_gagnant]
     elif event == "RELOAD_ODDS_GAGNANT":
-        sb.ODDS = load_odds(PATH_DATA)
+        reload_odds()
     elif event == "NAME_SORT_ODDS":
         try:
             matches = sorted(list([x for x in sb.ODDS[values["SPORT_ODDS"][0]] if values["SEARCH_ODDS"].lower() in x.lower()]))
@@ -1056,7 +1089,7 @@ while True:
         if sport_miles and match_miles in sb.ODDS[sport_miles[0]]:
             del sb.ODDS[sport_miles[0]][match_miles]
     elif event == "RELOAD_ODDS_MILES":
-        sb.ODDS = load_odds(PATH_DATA)
+        reload_odds()
     elif event == "ADD_CALC":
         if visible_calc < 9:
             window["SITE_CALC_" + str(visible_calc)].update(visible=True)
@@ -1108,6 +1141,8 @@ while True:
     else:
         pass
 sb.INTERFACE = False
+if watcher:
+    watcher.stop()
 window.close()
 sys.stdout = old_stdout
 for site in sb.SELENIUM_SITES:
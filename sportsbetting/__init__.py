@@ -1,5 +1,7 @@
 """
-initialisation du module
+initialisation du module. Le user agent, le chemin du chromedriver, les traductions et les taux
+de conversion des freebets ne sont obtenus qu'à leur première utilisation (le user agent et le
+chromedriver étant de plus mis en cache sur le disque), si bien que l'import reste rapide
 """
 import collections
 import json
@@ -7,12 +9,9 @@ import os
 import queue
 import re
 import sys
-import urllib.error
-
-import chromedriver_autoinstaller
-import colorama
-from fake_useragent import UserAgent
-import termcolor
+import threading
+import time
+import types
 
 ALL_ODDS_COMBINE = {}
 ODDS = {}
@@ -28,7 +27,6 @@ INTERFACE = False
 IS_PARSING = False
 ABORT = False
 SPORTS = ["basketball", "football", "handball", "hockey-sur-glace", "rugby", "tennis"]
-PATH_DRIVER = ""
 SELENIUM_SITES = {"joa"}
 DB_BOOKMAKERS = ["betclic", "betfair", "betway", "bwin", "france_pari", "joa", "netbet", "parionssport",
               "pasinobet", "pinnacle", "pmu", "pokerstars", "unibet", "winamax", "zebet"]
@@ -36,14 +34,13 @@ BOOKMAKERS = sorted(DB_BOOKMAKERS + ["barrierebet", "vbet"])
 BOOKMAKERS_BOOST = sorted(BOOKMAKERS + ["unibet_boost"])
 TEST = False
 DB_MANAGEMENT = False
+HISTORY = False
 COOKIES_JOA_ACCEPTED = False
-TRANSLATION = {}
 BETA = False
 SUREBETS = {}
 MIDDLES = {}
 MILES_RATES = {"5€" : 385, "10€" : 770, "20€" : 1510, "50€" : 3700, "100€": 7270, "200€" : 14290, "500€" : 35090, "1000€" : 69000, "2000€":135600, "5000€": 333330}
 SEEN_SUREBET = {x:True for x in SPORTS}
-FREEBETS_RATES = {bookmaker : 80 for bookmaker in BOOKMAKERS if bookmaker not in ["pinnacle", "betfair"]}
 
 
 class UnavailableCompetitionException(Exception):
@@ -83,58 +80,149 @@ def find_files(filename, search_path):
             return os.path.abspath(os.path.join(root, filename))
 
 
-ua = UserAgent(verify_ssl=False)
-USER_AGENT = sorted(ua.data_browsers["chrome"], key=lambda a: grp(r'Chrome/[^ ]+', a))[-1]
-chrome_version = ""
-colorama.init()
-try:
-    PATH_DRIVER = chromedriver_autoinstaller.install(True)
-    chrome_version = chromedriver_autoinstaller.get_chrome_version()
-    print("Chrome version :", chrome_version)
-except IndexError:
-    PATH_DRIVER = find_files("chromedriver.exe", ".")
-    print("Chrome version not found")
-    print(termcolor.colored('Chrome version not found{}'
-                            .format(colorama.Style.RESET_ALL),
-                            'yellow'))
-
-chromedriver_version = ""
-if sys.platform.startswith("win"):
-    chromedriver_version = PATH_DRIVER.split("\\")[-2]
-else:
-    chromedriver_version = PATH_DRIVER.split("/")[-2]
-if chrome_version.split(".")[0] == chromedriver_version:
-    print(termcolor.colored('Matching Chrome and chromedriver versions{}'
-                            .format(colorama.Style.RESET_ALL),
-                            'green'))
-else:
-    print(termcolor.colored('Unmatching Chrome and chromedriver versions\nPlease update Chrome{}'
-                            .format(colorama.Style.RESET_ALL),
-                            'yellow'))
-    print(PATH_DRIVER)
-colorama.deinit()
-
 PATH_DB = os.path.dirname(__file__) + "/resources/teams.db"
 
+PATH_HISTORY = os.path.dirname(__file__) + "/resources/history.db"
+
 PATH_TOKENS = os.path.dirname(__file__) + "/bookmakers/tokens.txt"
 
 PATH_FREEBETS = os.path.dirname(__file__) + "/freebets.txt"
-if not os.path.exists(PATH_FREEBETS):
-    with open(PATH_FREEBETS, "a+") as file:
-        for bookmaker, rate in FREEBETS_RATES.items():
-            if bookmaker in ["pinnacle", "betfair"]:
-                continue
-            file.write("{} {}\n".format(bookmaker, rate))
-else:
-    with open(PATH_FREEBETS, "r") as file:
-        lines = file.readlines()
-        for line in lines:
-            bookmaker, rate = line.split()
-            FREEBETS_RATES[bookmaker] = float(rate)
 
 PATH_TRANSLATION = os.path.dirname(__file__) + "/resources/translation.json"
-with open(PATH_TRANSLATION, encoding='utf-8') as file:
-    TRANSLATION = json.load(file)
 
 PATH_FONT = os.path.dirname(__file__) + "/resources/DejaVuSansMono.ttf"
 
+# Caches générés (user agent, chromedriver, pages HTTP) : dans le répertoire de cache de
+# l'utilisateur plutôt que dans le module
+PATH_USER_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                               "sportsbetting")
+
+PATH_HTTP_CACHE = os.path.join(PATH_USER_CACHE, "http_cache")
+
+PATH_CACHE = os.path.join(PATH_USER_CACHE, "cache.json")
+USER_AGENT_CACHE_DURATION = 7 * 24 * 3600
+
+
+def read_cache():
+    try:
+        with open(PATH_CACHE) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cache(**values):
+    """
+    Met à jour le cache sur le disque (écrit à côté puis renommé)
+    """
+    cache = read_cache()
+    cache.update(values)
+    try:
+        os.makedirs(os.path.dirname(PATH_CACHE), exist_ok=True)
+        with open(PATH_CACHE + ".tmp", "w") as file:
+            json.dump(cache, file)
+        os.replace(PATH_CACHE + ".tmp", PATH_CACHE)
+    except OSError:
+        pass
+
+
+def get_user_agent():
+    """
+    User agent de la dernière version de Chrome
+    """
+    cache = read_cache()
+    if cache.get("user_agent") and time.time() - cache.get("user_agent_time", 0) < USER_AGENT_CACHE_DURATION:
+        return cache["user_agent"]
+    from fake_useragent import UserAgent
+    ua = UserAgent(verify_ssl=False)
+    user_agent = sorted(ua.data_browsers["chrome"], key=lambda a: grp(r'Chrome/[^ ]+', a))[-1]
+    write_cache(user_agent=user_agent, user_agent_time=time.time())
+    return user_agent
+
+
+def get_path_driver():
+    """
+    Chemin du chromedriver, téléchargé si besoin pour correspondre à la version de Chrome
+    """
+    import chromedriver_autoinstaller
+    import colorama
+    import termcolor
+    chrome_version = ""
+    colorama.init()
+    try:
+        chrome_version = chromedriver_autoinstaller.get_chrome_version()
+        cache = read_cache()
+        path_driver = cache.get("path_driver")
+        if cache.get("chrome_version") != chrome_version or not path_driver or not os.path.exists(path_driver):
+            path_driver = chromedriver_autoinstaller.install(True)
+            write_cache(chrome_version=chrome_version, path_driver=path_driver)
+        print("Chrome version :", chrome_version)
+    except IndexError:
+        path_driver = find_files("chromedriver.exe", ".")
+        print("Chrome version not found")
+        print(termcolor.colored('Chrome version not found{}'
+                                .format(colorama.Style.RESET_ALL),
+                                'yellow'))
+
+    chromedriver_version = ""
+    if sys.platform.startswith("win"):
+        chromedriver_version = path_driver.split("\\")[-2]
+    else:
+        chromedriver_version = path_driver.split("/")[-2]
+    if chrome_version.split(".")[0] == chromedriver_version:
+        print(termcolor.colored('Matching Chrome and chromedriver versions{}'
+                                .format(colorama.Style.RESET_ALL),
+                                'green'))
+    else:
+        print(termcolor.colored('Unmatching Chrome and chromedriver versions\nPlease update Chrome{}'
+                                .format(colorama.Style.RESET_ALL),
+                                'yellow'))
+        print(path_driver)
+    colorama.deinit()
+    return path_driver
+
+
+def load_freebets_rates():
+    """
+    Taux de conversion des freebets de chaque bookmaker, lus dans PATH_FREEBETS (créé avec des
+    taux de 80 % s'il n'existe pas)
+    """
+    rates = {bookmaker : 80 for bookmaker in BOOKMAKERS if bookmaker not in ["pinnacle", "betfair"]}
+    if not os.path.exists(PATH_FREEBETS):
+        with open(PATH_FREEBETS, "a+") as file:
+            for bookmaker, rate in rates.items():
+                file.write("{} {}\n".format(bookmaker, rate))
+    else:
+        with open(PATH_FREEBETS, "r") as file:
+            lines = file.readlines()
+            for line in lines:
+                bookmaker, rate = line.split()
+                rates[bookmaker] = float(rate)
+    return rates
+
+
+def load_translation():
+    with open(PATH_TRANSLATION, encoding='utf-8') as file:
+        return json.load(file)
+
+
+LAZY_ATTRIBUTES = {"USER_AGENT": get_user_agent, "PATH_DRIVER": get_path_driver,
+                   "FREEBETS_RATES": load_freebets_rates, "TRANSLATION": load_translation}
+LAZY_LOCK = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module dont les attributs de LAZY_ATTRIBUTES sont calculés au premier accès
+    """
+
+    def __getattr__(self, name):
+        if name not in LAZY_ATTRIBUTES:
+            raise AttributeError("module {!r} has no attribute {!r}".format(self.__name__, name))
+        with LAZY_LOCK:
+            if name not in self.__dict__:
+                self.__dict__[name] = LAZY_ATTRIBUTES[name]()
+        return self.__dict__[name]
+
+
+sys.modules[__name__].__class__ = LazyModule
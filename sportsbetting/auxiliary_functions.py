@@ -15,6 +15,7 @@ import sqlite3
 import sys
 
 import dateutil.parser
+import numpy as np
 import tabulate
 
 from PIL import Image, ImageDraw, ImageFont
@@ -33,7 +34,10 @@ from sportsbetting.database_functions import (get_formatted_name, is_in_db_site,
                                               is_matching_next_match, get_time_next_match)
 
 from sportsbetting.basic_functions import (cotes_combine, cotes_freebet, mises2, mises, gain2, gain,
-                                           gain_pari_rembourse_si_perdant, mises_pari_rembourse_si_perdant, cotes_combine_optimise)
+                                           gain_pari_rembourse_si_perdant, mises_pari_rembourse_si_perdant, cotes_combine_optimise,
+                                           combine_reduit_rec)
+from sportsbetting.odds_store import OddsStore, as_dict, atomic_write, load_snapshot, save_snapshot
+from sportsbetting.vectorized_functions import best_match_engine, reduced_combined_odds
 
 
 def valid_odds(all_odds, sport):
@@ -43,16 +47,32 @@ def valid_odds(all_odds, sport):
     retirées
     """
     n = 2 + (sport not in ["tennis", "volleyball", "basketball"])
-    copy_all_odds = copy.deepcopy(all_odds)
-    for match in all_odds:
-        if not all_odds[match]["odds"]:
-            del copy_all_odds[match]
+    today = datetime.datetime.today()
+    new_odds = {}
+    for match, odds_match in all_odds.items():
+        if not odds_match["odds"]:
             continue
-        for site in all_odds[match]["odds"]:
-            if (len(all_odds[match]["odds"][site]) != n
-                    or (all_odds[match].get("date") and all_odds[match]["date"] < datetime.datetime.today())):
-                copy_all_odds[match]["odds"][site] = [1.01 for _ in range(n)]
-    return copy_all_odds
+        is_past = odds_match.get("date") and odds_match["date"] < today
+        invalid_sites = [site for site, odds in odds_match["odds"].items() if is_past or len(odds) != n]
+        if invalid_sites:
+            # Seul le dictionnaire des cotes du match modifié est recopié
+            odds_match = dict(odds_match, odds=dict(odds_match["odds"]))
+            for site in invalid_sites:
+                odds_match["odds"][site] = [1.01 for _ in range(n)]
+        new_odds[match] = odds_match
+    return new_odds
+
+
+def copy_match_odds(odds_match):
+    """
+    Copie d'un match dont les cotes et les identifiants peuvent être modifiés sans altérer
+    l'original (les dates et noms de compétition, non modifiables, sont partagés)
+    """
+    new_odds_match = dict(odds_match)
+    new_odds_match["odds"] = {site: list(odds) for site, odds in odds_match["odds"].items()}
+    if isinstance(odds_match.get("id"), dict):
+        new_odds_match["id"] = dict(odds_match["id"])
+    return new_odds_match
 
 
 def add_matches_to_db(odds, sport, site, id_competition):
@@ -184,38 +204,38 @@ def format_team_names(dict_odds, sport, competition):
 
 def merge_dict_odds(dict_odds, needs_date=True):
     """
-    Fusion des cotes entre les différents sites
+    Fusion des cotes entre les différents sites. La première date rencontrée pour un match est
+    conservée et les cotes des sites dont la date diffère de plus d'un jour et demi sont ignorées
     """
     new_dict = {}
-    all_keys = set()
+    dated_matches = set()
+    tolerance = datetime.timedelta(days=1.5)
     for odds in dict_odds:
-        if odds:
-            all_keys = all_keys.union(odds.keys())
-    for match in all_keys:
-        new_dict[match] = {}
-        new_dict[match]["odds"] = {}
-        new_dict[match]["id"] = {}
-        new_dict[match]["date"] = None
-        new_dict[match]["competition"] = None
-        date_found = False
-        for odds in dict_odds:
-            if odds:
-                if list(list(odds.values())[0]["odds"].keys()):
-                    site = list(list(odds.values())[0]["odds"].keys())[0]
-                    if match in odds.keys() and odds[match]["odds"] and odds[match]["odds"][site]:
-                        if (not date_found and odds[match].get("date") and odds[match]["date"] != "undefined"):
-                            new_dict[match]["date"] = odds[match]["date"]
-                            date_found = True
-                        if date_found and abs(new_dict[match]["date"] - odds[match]["date"]) > datetime.timedelta(days=1.5):
-                            continue
-                        if site in odds[match]["odds"]:
-                            new_dict[match]["odds"][site] = odds[match]["odds"][site]
-                        if "id" in odds[match] and odds[match]["id"] and site in odds[match]["id"]:
-                            new_dict[match]["id"][site] = odds[match]["id"][site]
-                        if odds[match].get("competition"):
-                            new_dict[match]["competition"] = odds[match]["competition"]
-        if not date_found and needs_date:
-            new_dict[match]["date"] = datetime.datetime.today()
+        if not odds:
+            continue
+        site = next(iter(next(iter(odds.values()))["odds"]), None)
+        for match, odds_match in odds.items():
+            if match not in new_dict:
+                new_dict[match] = {"odds": {}, "id": {}, "date": None, "competition": None}
+            if site is None or not odds_match["odds"] or not odds_match["odds"].get(site):
+                continue
+            merged_match = new_dict[match]
+            date = odds_match.get("date")
+            if match not in dated_matches and date and date != "undefined":
+                merged_match["date"] = date
+                dated_matches.add(match)
+            if match in dated_matches and abs(merged_match["date"] - date) > tolerance:
+                continue
+            merged_match["odds"][site] = odds_match["odds"][site]
+            if odds_match.get("id") and site in odds_match["id"]:
+                merged_match["id"][site] = odds_match["id"][site]
+            if odds_match.get("competition"):
+                merged_match["competition"] = odds_match["competition"]
+    if needs_date:
+        today = datetime.datetime.today()
+        for match, merged_match in new_dict.items():
+            if match not in dated_matches:
+                merged_match["date"] = today
     return new_dict
 
 
@@ -433,9 +453,10 @@ def cotes_combine_reduit_all_sites(*matches):
     for match in matches:
         sites = sites.intersection(match["odds"].keys())
     combine_dict = [{"date": max([match["date"] for match in matches]), "odds": {}} for _ in range(6)]
-    for i in range(6):
-        for site in sites:
-            combine_dict[i]["odds"][site] = cotes_combine_optimise([match["odds"][site] for match in matches])[0][i]
+    for site in sites:
+        odds_site = cotes_combine_optimise([match["odds"][site] for match in matches])[0]
+        for i in range(6):
+            combine_dict[i]["odds"][site] = odds_site[i]
     return combine_dict
 
 def defined_bets(odds_main, odds_second, main_sites, second_sites):
@@ -472,6 +493,80 @@ def defined_bets(odds_main, odds_second, main_sites, second_sites):
     return [0, [], []]
 
 
+def best_defined_bets(odds_main, odds_second, main_sites, stakes, best_profit, identical_stakes=False):
+    """
+    Meilleure affectation des mises stakes ([[mise, site, cote minimale], ...]) à des issues
+    distinctes, parcourues dans l'ordre de permutations(range(n), len(stakes)) (seulement la
+    première si identical_stakes). Retourne (profit, defined_bets) pour la première affectation
+    dont le profit dépasse best_profit, ou None.
+    Le profit de defined_bets vaut G (1 - somme des 1/cote principale) - somme des mises
+    + somme des mise * cote secondaire / cote principale, où G est le plus grand des gains
+    mise * cote secondaire : les affectations sont énumérées par séparation et évaluation, en
+    élaguant celles dont un majorant de ce profit ne dépasse pas best_profit
+    """
+    n = len(odds_main)
+    nb_stakes = len(stakes)
+    if nb_stakes > n:
+        return None
+    factor = 1 - sum(1 / odd for odd in odds_main)
+    sum_stakes = sum(stake[0] for stake in stakes)
+    # Issues admissibles de chaque mise (cote minimale atteinte), avec gain et gain pondéré
+    candidates = []
+    for j, (stake, site, minimum_odd) in enumerate(stakes):
+        if site not in odds_second:
+            return None
+        outcomes = [j] if identical_stakes else range(n)
+        candidates.append([(i, stake * odds_second[site][i], stake * odds_second[site][i] / odds_main[i])
+                           for i in outcomes if odds_second[site][i] >= minimum_odd])
+        if not candidates[-1]:
+            return None
+    best = None
+    used = [False] * n
+    assignment = [0] * nb_stakes
+
+    def upper_bound(j, max_gain, weighted_gains):
+        """
+        Majorant du profit des affectations prolongeant les j premières mises affectées
+        """
+        min_gain = max_gain
+        for candidates_k in candidates[j:]:
+            available = [candidate for candidate in candidates_k if not used[candidate[0]]]
+            if not available:
+                return None
+            weighted_gains += max(candidate[2] for candidate in available)
+            if factor <= 0:
+                min_gain = max(min_gain, min(candidate[1] for candidate in available))
+            else:
+                min_gain = max(min_gain, max(candidate[1] for candidate in available))
+        return factor * min_gain - sum_stakes + weighted_gains
+
+    def explore(j, max_gain, weighted_gains):
+        nonlocal best, best_profit
+        if j == nb_stakes:
+            profit = factor * max_gain - sum_stakes + weighted_gains
+            if profit <= best_profit - 1e-9:
+                return
+            defined_second_sites = [[assignment[k], stake[0], stake[1]] for k, stake in enumerate(stakes)]
+            defined_bets_temp = defined_bets(odds_main, odds_second, main_sites, defined_second_sites)
+            profit = defined_bets_temp[0] - np.sum(defined_bets_temp[1])
+            if profit > best_profit:
+                best_profit = profit
+                best = profit, defined_bets_temp
+            return
+        for i, stake_gain, weighted_gain in candidates[j]:
+            if used[i]:
+                continue
+            used[i] = True
+            assignment[j] = i
+            bound = upper_bound(j + 1, max(max_gain, stake_gain), weighted_gains + weighted_gain)
+            if bound is not None and bound > best_profit - 1e-6:
+                explore(j + 1, max(max_gain, stake_gain), weighted_gains + weighted_gain)
+            used[i] = False
+
+    explore(0, 0, 0)
+    return best
+
+
 def get_future_opponents(name, matches):
     """
     Retourne la liste des futurs adversaires d'une équipe/joueur
@@ -493,39 +588,42 @@ def get_future_opponents(name, matches):
 
 def best_combine_reduit(matches, combinaison_boostee, site_combinaison, mise, sport, cote_boostee=0, taux_cashback=0,
                         cashback_freebet=True, freebet=False, output=True):
+    combinaison_boostee = tuple(combinaison_boostee)
+    all_combinaisons = combine_reduit_rec(combinaison_boostee, get_nb_outcomes(sport))
+    # Cotes combinées de chaque site pour toutes les combinaisons d'issues distinctes
+    columns = {}
+    for combinaisons in all_combinaisons:
+        for combinaison in combinaisons:
+            columns.setdefault(combinaison, len(columns))
+    all_sites = list(sb.BOOKMAKERS_BOOST)
+    if site_combinaison and site_combinaison not in all_sites:
+        all_sites.append(site_combinaison)
+    combined_odds, integers = reduced_combined_odds([sb.ODDS[sport][match] for match in matches], all_sites,
+                                                    list(columns), get_nb_outcomes(sport))
+    combined_odds_list, integers_list = combined_odds.tolist(), integers.tolist()
+
+    def get_site_odd(row, column):
+        odd = combined_odds_list[row][column]
+        if odd <= 1:
+            return 1, ""
+        return (int(odd) if integers_list[row][column] else odd), all_sites[row]
+    best_odds = [get_site_odd(row, column)
+                 for column, row in enumerate(combined_odds[:len(sb.BOOKMAKERS_BOOST)].argmax(axis=0).tolist())]
+
     def get_odd(combinaison, matches, site_combinaison=None):
-        sites = sb.BOOKMAKERS_BOOST
         if site_combinaison:
-            sites = [site_combinaison]
-        best_odd = 1
-        best_site = ""
-        for site in sites:
-            odd = 1
-            if len([x for x in combinaison if x != float("inf")]) < 3 and site == "unibet_boost":
-                continue
-            for i, match in zip(combinaison, matches):
-                if i != float("inf"):
-                    if site in sb.ODDS[sport][match]["odds"].keys():
-                        odd *= sb.ODDS[sport][match]["odds"][site][i]
-                    else:
-                        break
-            if odd > best_odd:
-                best_odd = odd
-                best_site = site
-        return best_odd, best_site
-    odds = {}
-    for match in matches:
-        odds[match] = sb.ODDS[sport][match]
+            return get_site_odd(all_sites.index(site_combinaison), columns[combinaison])
+        return best_odds[columns[combinaison]]
     best_combinaison = []
     best_cotes = []
     best_sites = []
     best_gain = -float("inf")
     best_i = -1
-    for combinaisons in combine_reduit_rec(combinaison_boostee, get_nb_outcomes(sport)):
+    for combinaisons in all_combinaisons:
         cotes = []
         sites = []
         for i, combinaison in enumerate(combinaisons):
-            if list(combinaison) == combinaison_boostee:
+            if combinaison == combinaison_boostee:
                 i_boost = i
                 sites.append(site_combinaison)
                 if cote_boostee:
@@ -547,9 +645,10 @@ def best_combine_reduit(matches, combinaison_boostee, site_combinaison, mise, sp
             best_combinaison = combinaisons
             best_gain = new_gain
             best_i = i_boost
+    if not output:
+        return best_gain
     matches_name = " / ".join(matches)
-    if output:
-        print(matches_name)
+    print(matches_name)
     if not taux_cashback:
         stakes = mises2(best_cotes, mise, best_i)
     else:
@@ -564,8 +663,6 @@ def best_combine_reduit(matches, combinaison_boostee, site_combinaison, mise, sp
     nb_chars = max(map(lambda x: len(" / ".join(x)), product(*opponents)))
     sites = sb.BOOKMAKERS_BOOST
     odds = {site: [get_odd(combine, matches, site)[0] for combine in best_combinaison] for site in sites}
-    if not output:
-        return best_gain
     pprint({"date" : max(date for date in [sb.ODDS[sport][match]["date"]
                                            for match in matches]),
             "odds" :odds}, compact=True)
@@ -619,10 +716,12 @@ def best_match_base(odds_function, profit_function, criteria, display_function,
                     result_function, site, sport="football", date_max=None,
                     time_max=None, date_min=None, time_min=None, combine=False,
                     nb_matches_combine=2, freebet=False, one_site=False, recalcul=False,
-                    combine_opt=False, taux_cashback=0, cashback_freebet=True):
+                    combine_opt=False, taux_cashback=0, cashback_freebet=True, vectorized_functions=None):
     """
     Fonction de base de détermination du meilleur match sur lequel parier en
-    fonction de critères donnés
+    fonction de critères donnés. Si vectorized_functions (versions vectorisées de
+    odds_function, criteria et profit_function) est renseigné, tous les matches sont évalués
+    en une fois par le moteur numpy
     """
     try:
         if combine:
@@ -647,37 +746,51 @@ def best_match_base(odds_function, profit_function, criteria, display_function,
     best_overall_odds = None
     sites = None
     nb_matches = len(all_odds)
-    for match in all_odds:
-        sb.PROGRESS += 100 / nb_matches
-        if site in all_odds[match]['odds']:
-            odds_site = all_odds[match]['odds'][site]
-            best_odds = copy.deepcopy(odds_site)
-            best_sites = [site for _ in range(n)]
-            if not one_site:
-                for odds in all_odds[match]['odds'].items():
-                    if odds[0] == "unibet_boost":
-                        continue
+    if vectorized_functions:
+        matches, bookmakers, best_sites_indices, profits = best_match_engine(all_odds, site, n, one_site,
+                                                                             *vectorized_functions)
+        sb.PROGRESS += 100
+        if profits.size and profits.max() > -float("inf"):
+            i_match, best_rank = map(int, divmod(int(profits.argmax()), n))
+            best_match = matches[i_match]
+            odds_site = all_odds[best_match]['odds'][site]
+            best_sites = [bookmakers[j] for j in best_sites_indices[i_match]]
+            best_odds = [all_odds[best_match]['odds'][site_i][i] for i, site_i in enumerate(best_sites)]
+            best_overall_odds = odds_function(best_odds, odds_site, best_rank)
+            best_profit = profit_function(best_overall_odds, best_rank)
+            sites = best_sites[:best_rank] + [site] + best_sites[best_rank + 1:]
+    else:
+        for match in all_odds:
+            sb.PROGRESS += 100 / nb_matches
+            if site in all_odds[match]['odds']:
+                odds_site = all_odds[match]['odds'][site]
+                best_odds = copy.deepcopy(odds_site)
+                best_sites = [site for _ in range(n)]
+                if not one_site:
+                    for odds in all_odds[match]['odds'].items():
+                        if odds[0] == "unibet_boost":
+                            continue
+                        for i in range(n):
+                            if odds[1][i] > best_odds[i] and (odds[1][i] >= 1.05 or odds[0] == "pmu"):
+                                best_odds[i] = odds[1][i]
+                                best_sites[i] = odds[0]
+                for odd_i, site_i in zip(best_odds, best_sites):
+                    if odd_i < 1.05 and site_i != "pmu":
+                        break
+                else:
                     for i in range(n):
-                        if odds[1][i] > best_odds[i] and (odds[1][i] >= 1.05 or odds[0] == "pmu"):
-                            best_odds[i] = odds[1][i]
-                            best_sites[i] = odds[0]
-            for odd_i, site_i in zip(best_odds, best_sites):
-                if odd_i < 1.05 and site_i != "pmu":
-                    break
-            else:
-                for i in range(n):
-                    try:
-                        odds_to_check = odds_function(best_odds, odds_site, i)
-                        if criteria(odds_to_check, i):
-                            profit = profit_function(odds_to_check, i)
-                            if profit > best_profit:
-                                best_rank = i
-                                best_profit = profit
-                                best_match = match
-                                best_overall_odds = odds_to_check
-                                sites = best_sites[:i] + [site] + best_sites[i + 1:]
-                    except ZeroDivisionError:  # Si calcul freebet avec cote de 1
-                        pass
+                        try:
+                            odds_to_check = odds_function(best_odds, odds_site, i)
+                            if criteria(odds_to_check, i):
+                                profit = profit_function(odds_to_check, i)
+                                if profit > best_profit:
+                                    best_rank = i
+                                    best_profit = profit
+                                    best_match = match
+                                    best_overall_odds = odds_to_check
+                                    sites = best_sites[:i] + [site] + best_sites[i + 1:]
+                        except ZeroDivisionError:  # Si calcul freebet avec cote de 1
+                            pass
     if best_match:
         if combine_opt and combine:
             ref_combinaison = list(reversed(convert_decimal_to_base(best_rank, get_nb_outcomes(sport))))
@@ -689,7 +802,7 @@ def best_match_base(odds_function, profit_function, criteria, display_function,
                                 0, taux_cashback, cashback_freebet)
         else:
             print(best_match)
-            pprint(all_odds[best_match], compact=True)
+            pprint(as_dict(all_odds[best_match]), compact=True)
             if recalcul:
                 sum_almost_won = find_almost_won_matches(best_match,
                                                          result_function(best_overall_odds, best_rank),
@@ -748,42 +861,24 @@ def datetime_from_strings(date_max=None, time_max=None, date_min=None, time_min=
     return datetime_max, datetime_min
 
 def filter_dict_dates(odds, date_max=None, time_max=None, date_min=None, time_min=None):
-    all_odds = copy.deepcopy(odds)
+    """
+    Retourne les matches (non recopiés) compris entre deux dates
+    """
     datetime_max, datetime_min = datetime_from_strings(date_max, time_max, date_min, time_min)
+    if isinstance(odds, OddsStore):
+        return odds.filter_dates(datetime_min, datetime_max)
     def check(datetime_min, datetime_max, date):
         return ((not datetime_min) or datetime_min <= date) and ((not datetime_max) or datetime_max >= date)
-    all_odds = {k: v for k, v in all_odds.items() if check(datetime_min, datetime_max, v["date"])}
-    return all_odds
+    return {k: v for k, v in odds.items() if check(datetime_min, datetime_max, v["date"])}
 
 def filter_dict_minimum_odd(odds, minimum_odd, site):
-    all_odds = copy.deepcopy(odds)
-    all_odds = {k: v for k, v in all_odds.items()
-                if site in v["odds"] and all([odd >= minimum_odd for odd in v["odds"][site]])}
-    return all_odds
-
-def combine_reduit_rec(combi_to_keep, nb_outcomes):
-    n = len(combi_to_keep)
-    if n <= 1:
-        return [[[i] for i in range(nb_outcomes)]]
-    out = []
-    for i in range(n):
-        ref_combi = combi_to_keep[:i]+combi_to_keep[i+1:]
-        combines_partiels = combine_reduit_rec(ref_combi, nb_outcomes)
-        for list_combi in combines_partiels:
-            new_combi = []
-            for combi in list_combi:
-                if combi != ref_combi:
-                    copy_combi = copy.deepcopy(combi)
-                    copy_combi.insert(i, float("inf"))
-                    new_combi.append(copy_combi)
-                else:
-                    for j in range(nb_outcomes):
-                        copy_combi = copy.deepcopy(combi)
-                        copy_combi.insert(i, j)
-                        new_combi.append(copy_combi)
-            out.append(new_combi)
-    return out
-
+    """
+    Retourne les matches (non recopiés) dont toutes les cotes sur site dépassent minimum_odd
+    """
+    if isinstance(odds, OddsStore):
+        return odds.filter_minimum_odd(minimum_odd, site)
+    return {k: v for k, v in odds.items()
+            if site in v["odds"] and all([odd >= minimum_odd for odd in v["odds"][site]])}
 
 def get_nb_outcomes(sport):
     return 2+(sport not in ["basketball", "tennis"])
@@ -822,6 +917,11 @@ def reverse_match_odds(match, odds):
     return match, odds
 
 def load_odds(path):
+    """
+    Charge des cotes sauvegardées par save_odds (au format .npz ou JSON selon l'extension)
+    """
+    if path.endswith(".npz"):
+        return load_snapshot(path)
     with open(path) as file:
         try:
             odds = json.load(file)
@@ -833,11 +933,19 @@ def load_odds(path):
     return odds
 
 def save_odds(odds, path):
-    saved_odds = copy.deepcopy(odds)
-    for sport in saved_odds:
-        for match in saved_odds[sport]:
-            saved_odds[sport][match]["date"] = saved_odds[sport][match]["date"].isoformat()
-    with open(path, "w") as file:
+    """
+    Sauvegarde des cotes, au format .npz ou JSON selon l'extension de path
+    """
+    if path.endswith(".npz"):
+        save_snapshot(odds, path)
+        return
+    saved_odds = {}
+    for sport, odds_sport in odds.items():
+        if isinstance(odds_sport, OddsStore):
+            odds_sport = odds_sport.to_dict()
+        saved_odds[sport] = {match: dict(odds_match, date=odds_match["date"].isoformat())
+                             for match, odds_match in odds_sport.items()}
+    with atomic_write(path) as file:
         json.dump(saved_odds, file, indent=2)
 
 
@@ -874,3 +982,68 @@ def calculator(odds, lay, commissions, stake, reference, outcomes, sites):
     if sys.platform.startswith("win"):
         copy_to_clipboard(text)
 
+
+def trj_match(match_odds):
+    odds = []
+    bookmakers = []
+    for bookmaker in match_odds["odds"]:
+        if bookmaker == "unibet_boost":
+            continue
+        tmp_odds = match_odds["odds"][bookmaker]
+        tmp_bookmakers = [bookmaker for _ in tmp_odds]
+        if not odds:
+            odds = copy.deepcopy(tmp_odds)
+            bookmakers = copy.deepcopy(tmp_bookmakers)
+            continue
+        for i, tmp_odd in enumerate(tmp_odds):
+            if not odds[i]:
+                odds[i] = 1.01
+            if not tmp_odd:
+                continue
+            try:
+                if tmp_odd > odds[i]:
+                    odds[i] = tmp_odd
+                    bookmakers[i] = bookmaker
+            except TypeError:
+                print(match_odds, tmp_odd, odds[i])
+    if not odds or 1.01 in odds:
+        return 0, bookmakers, odds
+    return gain(odds), bookmakers, odds
+
+def get_values(match_odds, rate):
+    odds = []
+    bookmakers = []
+    sums = []
+    for bookmaker in match_odds["odds"]:
+        if bookmaker == "unibet_boost":
+            continue
+        tmp_odds = match_odds["odds"][bookmaker]
+        tmp_bookmakers = [bookmaker for _ in tmp_odds]
+        if not odds:
+            odds = copy.deepcopy(tmp_odds)
+            sums = copy.deepcopy(tmp_odds)
+            bookmakers = copy.deepcopy(tmp_bookmakers)
+            continue
+        for i, tmp_odd in enumerate(tmp_odds):
+            sums[i] += tmp_odd
+            if tmp_odd > odds[i]:
+                odds[i] = tmp_odd
+                bookmakers[i] = bookmaker
+    values = []
+    best_rate = rate-1
+    n = len(match_odds["odds"])
+    i = 0
+    has_pinnacle = "pinnacle" in match_odds["odds"]
+    for odd, sum, bookmaker in zip(odds, sums, bookmakers):
+        if odd < 1.1:
+            return 0, []
+        ref = sum/n if not has_pinnacle else match_odds["odds"]["pinnacle"][i]
+        if ref < 1.1:
+            return 0, []
+        rate_tmp = odd/ref-1
+        if rate_tmp >= rate:
+            best_rate = max(best_rate, rate_tmp)
+        value = [odd, rate_tmp, bookmaker]
+        values.append(value)
+        i += 1
+    return best_rate, values
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests de la fusion des cotes entre sites
+"""
+
+import datetime
+import itertools
+
+from sportsbetting.auxiliary_functions import merge_dict_odds
+from sportsbetting.basic_functions import combine_reduit_rec, cotes_combine_optimise
+from sportsbetting.benchmarks import generate_dict_odds
+from sportsbetting.vectorized_functions import reduced_combined_odds
+
+
+def test_merge_dict_odds_dates():
+    date = datetime.datetime(2030, 1, 1, 20)
+    dict_odds = [
+        {"A - B": {"odds": {"betclic": [2, 3, 4]}, "date": date, "id": {"betclic": 1}, "competition": "L1"}},
+        {},
+        {"A - B": {"odds": {"winamax": [2.1, 3, 4]}, "date": date + datetime.timedelta(days=1),
+                   "id": {"winamax": 2}},
+         "C - D": {"odds": {"winamax": [1.5, 4, 6]}, "date": "undefined"}},
+        {"A - B": {"odds": {"unibet": [2.2, 3, 4]}, "date": date + datetime.timedelta(days=2)}},
+    ]
+    odds = merge_dict_odds(dict_odds)
+    assert odds["A - B"] == {"odds": {"betclic": [2, 3, 4], "winamax": [2.1, 3, 4]},
+                             "id": {"betclic": 1, "winamax": 2}, "date": date, "competition": "L1"}
+    assert odds["C - D"]["odds"] == {"winamax": [1.5, 4, 6]}
+    assert isinstance(odds["C - D"]["date"], datetime.datetime)
+    assert merge_dict_odds(dict_odds[2:3], False)["C - D"]["date"] is None
+
+
+def test_merge_dict_odds_synthetic():
+    dict_odds = generate_dict_odds(nb_sites=5, nb_matches=200)
+    odds = merge_dict_odds(dict_odds)
+    assert odds.keys() == set().union(*dict_odds)
+    for match, odds_match in odds.items():
+        for site, odds_site in odds_match["odds"].items():
+            assert abs(odds_match["date"] - next(x[match]["date"] for x in dict_odds if match in x)) \
+                <= datetime.timedelta(days=1.5)
+            assert any(x.get(match, {}).get("odds", {}).get(site) is odds_site for x in dict_odds)
+
+
+def test_combine_reduit():
+    for nb_outcomes, combination in [(3, (0, 1)), (2, (1, 0, 1)), (3, (2, 0, 1))]:
+        reduced = combine_reduit_rec(list(combination), nb_outcomes)
+        assert len(set(reduced)) == len(reduced) and reduced is combine_reduit_rec(combination, nb_outcomes)
+        for outcomes in reduced:
+            assert combination in outcomes
+            # Chaque issue du combiné complet est couverte par exactement un combiné réduit
+            for issue in itertools.product(range(nb_outcomes), repeat=len(combination)):
+                assert sum(all(i == j or j == float("inf") for i, j in zip(issue, combi)) for combi in outcomes) == 1
+    odds, all_outcomes = cotes_combine_optimise([[2, 3.2, 4], [1.5, 4, 6]])
+    assert len(odds) == len(set(all_outcomes)) == 6
+    assert all_outcomes[0] == ((float("inf"), 0), (0, 1), (1, 1), (2, 1), (float("inf"), 2))
+    assert odds[0] == [1.5, 8, 12.8, 16, 6]
+
+
+def test_reduced_combined_odds():
+    inf = float("inf")
+    odds_matches = [{"odds": {"betclic": [2, 3.1, 4], "unibet_boost": [2.2, 3, 4]}},
+                    {"odds": {"betclic": [1.5, 4, 6], "unibet_boost": [1.6, 4, 6], "pmu": [1.4, 4.2, 6]}},
+                    {"odds": {"unibet_boost": [3, 3, 2.5], "pmu": [3, 3.5, 2]}}]
+    sites = ["betclic", "pmu", "unibet_boost"]
+    combined, integers = reduced_combined_odds(odds_matches, sites, [(0, 1, 2), (inf, 1, 1), (1, inf, 0)], 3)
+    # betclic ne propose pas le 3e match, pmu le 1er : le produit s'arrête au match manquant
+    assert combined.tolist() == [[2 * 4, 4, 3.1], [1, 4.2 * 3.5, 1], [2.2 * 4 * 2.5, 0, 0]]
+    assert integers.tolist() == [[True, True, False], [True, False, True], [False, True, True]]
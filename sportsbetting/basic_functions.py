@@ -4,6 +4,7 @@ Assistant de paris sportifs
 """
 
 import copy
+import functools
 from itertools import product, combinations, permutations
 import numpy as np
 
@@ -540,31 +541,38 @@ def mises_pari_rembourse_si_perdant_paliers(cotes, output=False):
     return mis_reelles
 
 def combine_reduit_rec(combi_to_keep, nb_outcomes):
+    """
+    Retourne les combinés réduits (tuples d'issues, float("inf") désignant un match non joué)
+    couvrant toutes les issues et contenant combi_to_keep, sans doublon
+    """
+    return combine_reduit(tuple(combi_to_keep), nb_outcomes)
+
+
+@functools.lru_cache(maxsize=None)
+def combine_reduit(combi_to_keep, nb_outcomes):
+    """
+    Version mise en cache de combine_reduit_rec, combi_to_keep étant un tuple
+    """
     n = len(combi_to_keep)
     if n <= 1:
-        return [[[i] for i in range(nb_outcomes)]]
-    out = []
+        return (tuple((i,) for i in range(nb_outcomes)),)
+    out = {}
     for i in range(n):
-        ref_combi = combi_to_keep[:i]+combi_to_keep[i+1:]
-        combines_partiels = combine_reduit_rec(ref_combi, nb_outcomes)
-        for list_combi in combines_partiels:
+        ref_combi = combi_to_keep[:i] + combi_to_keep[i + 1:]
+        for list_combi in combine_reduit(ref_combi, nb_outcomes):
             new_combi = []
             for combi in list_combi:
                 if combi != ref_combi:
-                    copy_combi = copy.deepcopy(combi)
-                    copy_combi.insert(i, float("inf"))
-                    new_combi.append(copy_combi)
+                    new_combi.append(combi[:i] + (float("inf"),) + combi[i:])
                 else:
-                    for j in range(nb_outcomes):
-                        copy_combi = copy.deepcopy(combi)
-                        copy_combi.insert(i, j)
-                        new_combi.append(copy_combi)
-            out.append(new_combi)
-    return out
+                    new_combi.extend(combi[:i] + (j,) + combi[i:] for j in range(nb_outcomes))
+            out[tuple(new_combi)] = None
+    return tuple(out)
 
 
 def mises_combine_optimise(odds, combination, stake, minimum_odd, output=False):
     nb_outcomes = len(odds[0])
+    combination = tuple(combination)
     best_odds = []
     best_profit = float("-inf")
     best_combination = []
@@ -598,6 +606,7 @@ def mises_combine_optimise(odds, combination, stake, minimum_odd, output=False):
 
 def gain_combine_optimise(odds, combination, stake, minimum_odd):
     nb_outcomes = len(odds[0])
+    combination = tuple(combination)
     best_profit = float("-inf")
     for outcomes in combine_reduit_rec(combination, nb_outcomes):
         tmp_odds = []
@@ -622,23 +631,30 @@ def cotes_combine_optimise(odds):
     """
     Calcule les cotes optimisees de plusieurs matches combines
     """
-    nb_outcomes = len(odds[0])
-    nb_matches = len(odds)
+    all_outcomes = reduced_combinations(len(odds[0]), len(odds))
     all_odds = []
-    all_outcomes = []
+    for outcomes in all_outcomes:
+        tmp_odds = []
+        for combi in outcomes:
+            odd = 1
+            for j, outcome in enumerate(combi):
+                if outcome == float("inf"):
+                    continue
+                odd *= odds[j][outcome]
+            tmp_odds.append(round(odd, 4))
+        all_odds.append(tmp_odds)
+    return all_odds, list(all_outcomes)
+
+
+@functools.lru_cache(maxsize=None)
+def reduced_combinations(nb_outcomes, nb_matches):
+    """
+    Combinés réduits distincts de nb_matches matches à nb_outcomes issues, dans l'ordre
+    des permutations d'issues qui les engendrent
+    """
+    all_outcomes = {}
     for combination in permutations(range(nb_outcomes), nb_matches):
-        for outcomes in combine_reduit_rec(list(combination), nb_outcomes):
-            tmp_odds = []
-            if outcomes in all_outcomes:
-                continue
-            all_outcomes.append(outcomes)
-            for i, combi in enumerate(outcomes):
-                odd = 1
-                for j, outcome in enumerate(combi):
-                    if outcome == float("inf"):
-                        continue
-                    odd *= odds[j][outcome]
-                tmp_odds.append(round(odd, 4))
-            all_odds.append(tmp_odds)
-    return all_odds, all_outcomes
+        for outcomes in combine_reduit(combination, nb_outcomes):
+            all_outcomes[outcomes] = None
+    return tuple(all_outcomes)
 
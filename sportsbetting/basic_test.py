@@ -10,7 +10,7 @@ import urllib.request
 from bs4 import BeautifulSoup
 
 import sportsbetting as sb
-from sportsbetting.database_functions import is_id_consistent
+from sportsbetting.database_functions import SCHEMA_VERSION, is_id_consistent
 from sportsbetting.user_functions import parse_competitions
 
 
@@ -88,3 +88,12 @@ def test_consistency():
     for result in results:
         assert is_id_consistent(result[0])
     sb.TEST = False
+
+
+def test_packaged_db_schema():
+    """
+    La base livrée est déjà au dernier schéma : l'ouvrir ne la modifie pas
+    """
+    conn = sqlite3.connect("file:{}?mode=ro".format(sb.PATH_DB), uri=True)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Mesures de performance sur des données synthétiques
+(python -m sportsbetting.benchmarks)
+"""
+
+import datetime
+import random
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+import sportsbetting as sb
+from sportsbetting.auxiliary_functions import get_nb_outcomes, merge_dict_odds
+from sportsbetting.odds_store import OddsStore
+from sportsbetting.process_functions import get_nb_processes
+from sportsbetting.vectorized_functions import best_combinations
+
+
+def generate_dict_odds(nb_sites=15, nb_matches=2000, sport="football", seed=0):
+    """
+    Génère une cote par site et par match, chaque site proposant environ 80 % des matches.
+    Environ 1 % des matches sont datés de plus de deux jours d'écart selon les sites
+    """
+    rand = random.Random(seed)
+    sites = (sb.BOOKMAKERS * (nb_sites // len(sb.BOOKMAKERS) + 1))[:nb_sites]
+    nb_outcomes = get_nb_outcomes(sport)
+    start = datetime.datetime.today() + datetime.timedelta(days=1)
+    dates = [start + datetime.timedelta(minutes=rand.randrange(10000)) for _ in range(nb_matches)]
+    dict_odds = []
+    for i, site in enumerate(sites):
+        odds = {}
+        for j in range(nb_matches):
+            if rand.random() > 0.8:
+                continue
+            date = dates[j]
+            if rand.random() < 0.01:
+                date += datetime.timedelta(days=2)
+            odds["Equipe {} - Equipe {}".format(2 * j, 2 * j + 1)] = {
+                "odds": {site: [round(rand.uniform(1.1, 8), 2) for _ in range(nb_outcomes)]},
+                "date": date, "id": {site: "{}-{}".format(i, j)}, "competition": "Compétition"
+            }
+        dict_odds.append(odds)
+    return dict_odds
+
+
+def benchmark_merge_dict_odds(nb_sites=15, nb_matches=2000, number=10):
+    """
+    Durée moyenne (en secondes) de la fusion des cotes de nb_sites sites proposant nb_matches
+    matches
+    """
+    dict_odds = generate_dict_odds(nb_sites, nb_matches)
+    return timeit.timeit(lambda: merge_dict_odds(dict_odds), number=number) / number
+
+
+def benchmark_odds_store(nb_sites=15, nb_matches=2000):
+    """
+    Mémoire (en octets) occupée par les cotes fusionnées de nb_sites sites proposant nb_matches
+    matches, stockées dans des dictionnaires puis dans un OddsStore
+    """
+    dict_odds = generate_dict_odds(nb_sites, nb_matches)
+    sizes = []
+    for to_store in [lambda: merge_dict_odds(copy_odds(dict_odds)),
+                     lambda: OddsStore(merge_dict_odds(dict_odds))]:
+        tracemalloc.start()
+        odds = to_store()
+        sizes.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        del odds
+    return sizes
+
+
+def copy_odds(dict_odds):
+    """
+    Copie des cotes des sites (pour mesurer la mémoire occupée par les listes de cotes)
+    """
+    return [{match: dict(odds_match, odds={site: list(odds_site) for site, odds_site in odds_match["odds"].items()})
+             for match, odds_match in odds.items()} for odds in dict_odds]
+
+
+def benchmark_best_combinations(nb_sites=15, nb_matches=300, nb_matches_combine=3, number=1, processes=1):
+    """
+    Durée moyenne (en secondes) de la recherche des meilleures combinaisons de
+    nb_matches_combine matches parmi nb_matches, sur processes processus (None pour un par cœur)
+    """
+    odds = OddsStore(merge_dict_odds(generate_dict_odds(nb_sites, nb_matches)))
+    site = next(iter(odds.bookmakers))
+    return timeit.timeit(lambda: best_combinations(odds, site, 3, nb_matches_combine, 10, 1.5,
+                                                   processes=processes),
+                         number=number) / number
+
+
+def benchmark_import(module="sportsbetting", number=3):
+    """
+    Durée moyenne (en secondes) de l'import de module dans un nouvel interpréteur
+    """
+    code = "import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)".format(module)
+    durations = [float(subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, check=True,
+                                      universal_newlines=True).stdout.split()[-1])
+                 for _ in range(number)]
+    return sum(durations) / number
+
+
+def main():
+    for module in ["sportsbetting", "sportsbetting.basic_functions", "sportsbetting.user_functions"]:
+        print("import {} : {:.0f} ms".format(module, benchmark_import(module) * 1000))
+    print("merge_dict_odds (15 sites x 2000 matches) : {:.1f} ms"
+          .format(benchmark_merge_dict_odds() * 1000))
+    print("Mémoire des cotes (15 sites x 2000 matches) : dictionnaires {:.1f} Mo, OddsStore {:.1f} Mo"
+          .format(*(size / 1e6 for size in benchmark_odds_store())))
+    print("best_combinations (300 matches, combinés de 3 matches) : {:.2f} s"
+          .format(benchmark_best_combinations()))
+    print("best_combinations (1000 matches, combinés de 3 matches) : {:.2f} s sur 1 processus, {:.2f} s sur {}"
+          .format(benchmark_best_combinations(nb_matches=1000),
+                  benchmark_best_combinations(nb_matches=1000, processes=None), get_nb_processes()))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,14 @@ import datetime
 import re
 
 import dateutil.parser
-import requests
 
 
 import sportsbetting as sb
+from sportsbetting import http_functions
 from sportsbetting.auxiliary_functions import merge_dicts, truncate_datetime
 from sportsbetting.database_functions import (
     is_player_in_db, add_close_player_to_db, add_player_to_db, is_player_added_in_db,
-    is_in_db_site, get_formatted_name_by_id
+    is_in_db_site, get_formatted_name_by_id, transaction
 )
 
 def parse_betclic_api(id_league):
@@ -23,7 +23,7 @@ def parse_betclic_api(id_league):
     """
     url = ("https://offer.cdn.betclic.fr/api/pub/v2/competitions/{}?application=2&countrycode=fr"
            "&fetchMultipleDefaultMarkets=true&language=fr&sitecode=frfr".format(id_league))
-    req = requests.get(url)
+    req = http_functions.get(url, "betclic", raise_for_status=False)
     parsed = req.json()
     odds_match = {}
     if (not parsed) or "unifiedEvents" not in parsed:
@@ -72,7 +72,7 @@ def parse_sport_betclic(id_sport):
     """
     url = ("https://offer.cdn.betclic.fr/api/pub/v2/sports/{}?application=2&countrycode=fr&language=fr&sitecode=frfr"
            .format(id_sport))
-    req = requests.get(url)
+    req = http_functions.get(url, "betclic", raise_for_status=False)
     parsed = req.json()
     list_odds = []
     competitions = parsed["competitions"]
@@ -82,6 +82,7 @@ def parse_sport_betclic(id_sport):
     return merge_dicts(list_odds)
 
 
+@transaction()
 def get_sub_markets_players_basketball_betclic(id_match):
     """
     Get submarket odds from basketball match
@@ -92,7 +93,7 @@ def get_sub_markets_players_basketball_betclic(id_match):
         'https://offer.cdn.betclic.fr/api/pub/v4/events/{}?application=2&'
         'countrycode=fr&language=fr&sitecode=frfr'.format(str(id_match))
     )
-    req = requests.get(url)
+    req = http_functions.get(url, "betclic", raise_for_status=False)
     parsed = req.json()
     if not parsed:
         return {}
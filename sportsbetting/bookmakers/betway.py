@@ -6,9 +6,9 @@ import re
 
 import dateutil
 import demjson
-import requests
 
 import sportsbetting as sb
+from sportsbetting import http_functions
 from sportsbetting.auxiliary_functions import truncate_datetime
 
 def parse_betway(url):
@@ -17,7 +17,7 @@ def parse_betway(url):
     """
     if url.count("/") < 5:
         return parse_sport_betway(url)
-    parsed = str(requests.get(url).content)
+    parsed = str(http_functions.get(url, "betway", raise_for_status=False).content)
     if "prematch_event_list:" not in parsed or "params:{}}," not in parsed:
         raise sb.UnavailableCompetitionException
     parsed = parsed.split("prematch_event_list:")[-1]
@@ -43,7 +43,7 @@ def parse_sport_betway(url):
     """
     Get Betway odds from a sport URL
     """
-    parsed = str(requests.get(url).content)
+    parsed = str(http_functions.get(url, "betway", raise_for_status=False).content)
     if "top_bets:" not in parsed or "params:{}}," not in parsed:
         raise sb.UnavailableCompetitionException
     parsed = parsed.split("top_bets:")[-1]
@@ -4,50 +4,40 @@ Bwin odds scraper
 
 import datetime
 import json
-import os
 import re
-import urllib
 
 import dateutil.parser
-import seleniumwire.webdriver
 
-import sportsbetting as sb
+from sportsbetting import selenium_init
+from sportsbetting.token_functions import TOKENS, get_with_token
 from sportsbetting.auxiliary_functions import reverse_match_odds, truncate_datetime
 
 
 
-def get_bwin_token():
+def fetch_bwin_token():
     """
-    Get Bwin token to access the API
+    Get a new Bwin token from the website
     """
     token = ""
-    if os.path.exists(sb.PATH_TOKENS):
-        with open(sb.PATH_TOKENS, "r") as file:
-            lines = file.readlines()
-            for line in lines:
-                bookmaker, token = line.split()
-                if bookmaker == "bwin":
-                    return token
     print("Récupération du token de connexion de Bwin")
-    options = seleniumwire.webdriver.ChromeOptions()
-    prefs = {'profile.managed_default_content_settings.images': 2,
-             'disk-cache-size': 4096}
-    options.add_argument('log-level=3')
-    options.add_experimental_option("prefs", prefs)
-    options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    options.add_argument("--headless")
-    options.add_argument("--disable-extensions")
-    driver = seleniumwire.webdriver.Chrome(sb.PATH_DRIVER, options=options)
-    driver.get("https://sports.bwin.fr/fr/sports")
-    for request in driver.requests:
-        if request.response and "x-bwin-accessid=" in request.url:
-            token = request.url.split("x-bwin-accessid=")[1].split("&")[0]
-            with open(sb.PATH_TOKENS, "a+") as file:
-                file.write("bwin {}\n".format(token))
-            break
-    driver.quit()
+    with selenium_init.get_pool().borrow() as driver:
+        driver.get("https://sports.bwin.fr/fr/sports")
+        for request in driver.requests:
+            if request.response and "x-bwin-accessid=" in request.url:
+                token = request.url.split("x-bwin-accessid=")[1].split("&")[0]
+                break
     return token
 
+
+def get_bwin_token():
+    """
+    Get Bwin token to access the API
+    """
+    return TOKENS.get("bwin")
+
+
+TOKENS.register("bwin", fetch_bwin_token)
+
 def parse_bwin_api(parameter):
     """
     Get Bwin odds from API
@@ -55,10 +45,10 @@ def parse_bwin_api(parameter):
     token = get_bwin_token()
     if not token:
         return {}
-    url = ("https://cds-api.bwin.fr/bettingoffer/fixtures?x-bwin-accessid={}&lang=fr&country=FR&userCountry=FR"
+    url = ("https://cds-api.bwin.fr/bettingoffer/fixtures?x-bwin-accessid={{token}}&lang=fr&country=FR&userCountry=FR"
            "&fixtureTypes=Standard&state=Latest&offerMapping=Filtered&offerCategories=Gridable&fixtureCategories=Gridable"
-           "&{}&skip=0&take=1000&sortBy=Tags".format(token, parameter))
-    content = urllib.request.urlopen(url).read()
+           "&{}&skip=0&take=1000&sortBy=Tags".format(parameter))
+    content = get_with_token(url, "bwin").content
     parsed = json.loads(content)
     fixtures = parsed["fixtures"]
     odds_match = {}
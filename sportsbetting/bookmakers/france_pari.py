@@ -4,17 +4,24 @@ France-pari odds scraper
 
 import datetime
 import re
-import requests
 
 from bs4 import BeautifulSoup
 
 import sportsbetting as sb
+from sportsbetting import http_functions
 
 def parse_france_pari(url):
     """
     Retourne les cotes disponibles sur france-pari
     """
-    soup = BeautifulSoup(requests.get(url).content, features="lxml")
+    return http_functions.get_parsed(url, "france_pari", parse_france_pari_response, raise_for_status=False)
+
+
+def parse_france_pari_response(response):
+    """
+    Retourne les cotes d'une page france-pari
+    """
+    soup = BeautifulSoup(response.content, features="lxml")
     match_odds_hash = {}
     today = datetime.datetime.today()
     today = datetime.datetime(today.year, today.month, today.day)
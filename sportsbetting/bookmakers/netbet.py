@@ -3,17 +3,16 @@ NetBet odds scraper
 """
 
 import datetime
-import http.client
+import functools
 import re
-import urllib
-import urllib.error
-import urllib.request
 
 import fake_useragent
 
 from bs4 import BeautifulSoup
+import requests
 
 import sportsbetting as sb
+from sportsbetting import http_functions
 from sportsbetting.auxiliary_functions import truncate_datetime
 
 
@@ -31,24 +30,28 @@ def parse_netbet(url):
                              "Safari/537.36"}
     for _ in range(3):
         try:
-            request = urllib.request.Request(url, None, headers)
-            response = urllib.request.urlopen(request, timeout=5)
-            soup = BeautifulSoup(response, features="lxml")
-            break
-        except http.client.IncompleteRead:
+            return http_functions.get_parsed(url, "netbet", functools.partial(parse_netbet_response, sport),
+                                             headers=headers, timeout=5, retries=0)
+        except requests.exceptions.ChunkedEncodingError:
             headers = {"User-Agent": fake_useragent.UserAgent().random}
             print("User agent change")
-        except urllib.error.HTTPError:
+        except requests.exceptions.HTTPError:
             headers = {"User-Agent": fake_useragent.UserAgent().random}
             print("User agent change (403)")
-        except urllib.error.URLError:
+        except requests.exceptions.RequestException:
             headers = {"User-Agent": fake_useragent.UserAgent().random}
             print("User agent change (Timeout)")
-    else:
-        raise sb.UnavailableSiteException
+    raise sb.UnavailableSiteException
+
+
+def parse_netbet_response(sport, response):
+    """
+    Retourne les cotes d'une page netbet
+    """
+    soup = BeautifulSoup(response.content, features="lxml")
     if soup.find(attrs={"class": "none"}):
         raise sb.UnavailableCompetitionException
-    if response.geturl() == "https://www.netbet.fr/":
+    if response.url == "https://www.netbet.fr/":
         raise sb.UnavailableCompetitionException
     match_odds_hash = {}
     today = datetime.datetime.today()
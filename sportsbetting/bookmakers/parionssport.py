@@ -4,54 +4,45 @@ ParionsSport odds scraper
 
 from collections import defaultdict
 import datetime
-import os
 import re
 
-import requests
-import seleniumwire
 
 
 import sportsbetting as sb
+from sportsbetting import selenium_init
+from sportsbetting.token_functions import TOKENS, get_with_token
 from sportsbetting.auxiliary_functions import merge_dicts
 from sportsbetting.database_functions import (
     is_player_added_in_db, add_close_player_to_db, is_in_db_site,
-    get_formatted_name_by_id
+    get_formatted_name_by_id, transaction
 )
 
-def get_parionssport_token():
+def fetch_parionssport_token():
     """
-    Get ParionsSport token to access the API
+    Get a new ParionsSport token from the website
     """
     token = None
-    if os.path.exists(sb.PATH_TOKENS):
-        with open(sb.PATH_TOKENS, "r") as file:
-            lines = file.readlines()
-            for line in lines:
-                bookmaker, token = line.split()
-                if bookmaker == "parionssport":
-                    return token
     print("Récupération du token de connexion de Parions Sport")
-    options = seleniumwire.webdriver.ChromeOptions()
-    prefs = {'profile.managed_default_content_settings.images': 2,
-             'disk-cache-size': 4096}
-    options.add_argument('log-level=3')
-    options.add_experimental_option("prefs", prefs)
-    options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    options.add_argument("--headless")
-    options.add_argument("--disable-extensions")
-    driver = seleniumwire.webdriver.Chrome(sb.PATH_DRIVER, options=options)
-    driver.get("https://enligne.parionssport.fdj.fr")
-    for request in driver.requests:
-        if request.response:
-            token = request.headers.get("X-LVS-HSToken")
-            if token:
-                with open(sb.PATH_TOKENS, "a+") as file:
-                    file.write("parionssport {}\n".format(token))
-                break
-    driver.quit()
+    with selenium_init.get_pool().borrow() as driver:
+        driver.get("https://enligne.parionssport.fdj.fr")
+        for request in driver.requests:
+            if request.response:
+                token = request.headers.get("X-LVS-HSToken")
+                if token:
+                    break
     return token
 
 
+def get_parionssport_token():
+    """
+    Get ParionsSport token to access the API
+    """
+    return TOKENS.get("parionssport")
+
+
+TOKENS.register("parionssport", fetch_parionssport_token)
+
+
 
 def parse_parionssport_match_basketball(id_match):
     """
@@ -59,7 +50,7 @@ def parse_parionssport_match_basketball(id_match):
     """
     url = ("https://www.enligne.parionssport.fdj.fr/lvs-api/ff/{}?originId=3&lineId=1&showMarketTypeGroups=true&ext=1"
            "&showPromotions=true".format(id_match))
-    req = requests.get(url, headers={'X-LVS-HSToken': get_parionssport_token()})
+    req = get_with_token(url, "parionssport", "X-LVS-HSToken", raise_for_status=False)
     parsed = req.json()
     items = parsed["items"]
     odds = []
@@ -95,7 +86,7 @@ def parse_parionssport_api(id_league):
     """
     url = ("https://www.enligne.parionssport.fdj.fr/lvs-api/next/50/{}?originId=3&lineId=1&breakdownEventsIntoDays=true"
            "&eType=G&showPromotions=true".format(id_league))
-    req = requests.get(url, headers={'X-LVS-HSToken': get_parionssport_token()})
+    req = get_with_token(url, "parionssport", "X-LVS-HSToken", raise_for_status=False)
     parsed = req.json()
     odds_match = {}
     if "items" not in parsed:
@@ -143,7 +134,7 @@ def parse_sport_parionssport(sport):
         "hockey-sur-glace"  : "ICEH"
     }
     url = "https://www.enligne.parionssport.fdj.fr/lvs-api/leagues?sport={}".format(sports_alias[sport])
-    req = requests.get(url, headers={'X-LVS-HSToken': get_parionssport_token()})
+    req = get_with_token(url, "parionssport", "X-LVS-HSToken", raise_for_status=False)
     competitions = req.json()
     list_odds = []
     for competition in competitions:
@@ -175,6 +166,7 @@ def parse_parionssport(url):
     return merge_dicts(list_odds)
 
 
+@transaction()
 def get_sub_markets_players_basketball_parionssport(id_match):
     """
     Get Parions Sport odds for sub-markets in basketball match
@@ -183,7 +175,7 @@ def get_sub_markets_players_basketball_parionssport(id_match):
         return {}
     url = ("https://www.enligne.parionssport.fdj.fr/lvs-api/ff/{}?originId=3&lineId=1&showMarketTypeGroups=true&ext=1"
            "&showPromotions=true".format(id_match))
-    req = requests.get(url, headers={'X-LVS-HSToken': get_parionssport_token()})
+    req = get_with_token(url, "parionssport", "X-LVS-HSToken", raise_for_status=False)
     parsed = req.json()
     items = parsed["items"]
     markets_to_keep = {
@@ -4,92 +4,62 @@ Pasinobet odds scraper
 
 import datetime
 
-import asyncio
-import ssl
 import re
-import json
-
-import websockets
 
 from sportsbetting.auxiliary_functions import merge_dicts, reverse_match_odds
+from sportsbetting.websocket_functions import get_swarm_client
+
+SITE_IDS = {"pasinobet": "599", "barrierebet": "1869622", "vbet": "277"}
 
-async def get_json_pasinobet_api(id_league, barrierebet, vbet):
+
+def get_bookmaker(barrierebet, vbet):
+    if barrierebet:
+        return "barrierebet"
+    if vbet:
+        return "vbet"
+    return "pasinobet"
+
+
+def get_client(barrierebet, vbet):
     """
-    Get odds JSON from league id
+    Get the persistent swarm client of the bookmaker
     """
-    site_id = "599"
-    if barrierebet:
-        site_id = "1869622"
-    elif vbet:
-        site_id = "277"
-    async with websockets.connect('wss://swarm-2.vbet.fr/', ssl=ssl.SSLContext(protocol=ssl.PROTOCOL_TLS)) as websocket:
-        data = {"command":"request_session",
-                "params":{"language":"fra", "site_id":site_id}}
-        await websocket.send(json.dumps(data))
-        response = await websocket.recv()
-        data = ('{"command":"get","params":{"source":"betting","what":{"region":["name"], "competition":["name", "teams_reversed"], '
-                '"game":["id", "is_blocked", "start_ts","team1_name","team2_name","is_started"],'
-                '"market":["event"],"event":["price","order"]},'
-                '"where":{"competition":{"id":'+str(id_league)+'},"game":{"@or":[{"type":{"@in":[0,2]}},'
-                '{"visible_in_prematch":1,"type":1}]},"market":{"display_key":"WINNER", "type":{"@in":["P1P2", "P1XP2"]}}}}}')
-        await websocket.send(data)
-        response = await websocket.recv()
-        parsed = json.loads(response)
-        return parsed
-
-
-
-async def get_json_sport_pasinobet_api(sport, barrierebet, vbet):
-    """
-    Get odds JSON from sport
-    """
-    site_id = "599"
-    if barrierebet:
-        site_id = "1869622"
-    elif vbet:
-        site_id = "277"
-    async with websockets.connect('wss://swarm-2.vbet.fr/', ssl=ssl.SSLContext(protocol=ssl.PROTOCOL_TLS)) as websocket:
-        data = {"command":"request_session",
-                "params":{"language":"fra", "site_id":site_id}}
-        await websocket.send(json.dumps(data))
-        response = await websocket.recv()
-        data = {"command":"get",
-                "params":{"source":"betting",
-                          "what":{"competition":["id", "name"]},
-                          "where":{"sport":{"name":sport},
-                                   "game":{"@or":[{"type":{"@in":[0, 2]}},
-                                                  {"visible_in_prematch":1, "type":1}]}}}}
-        await websocket.send(json.dumps(data))
-        response = await websocket.recv()
-        parsed = json.loads(response)
-        list_odds = []
-        for league in parsed["data"]["data"]["competition"].values():
-            if "Compétition" in league["name"]:
-                continue
-            data = ('{"command":"get","params":{"source":"betting","what":{"region":["name"], "competition":["name", "teams_reversed"], '
-                    '"game":["id", "is_blocked", "start_ts","team1_name","team2_name","is_started"],'
-                    '"market":["event"],"event":["price","order"]},'
-                    '"where":{"competition":{"id":'+str(league["id"])+'},"game":{"@or":[{"type":{"@in":[0,2]}},'
-                    '{"visible_in_prematch":1,"type":1}]},"market":{"display_key":"WINNER", "type":{"@in":["P1P2", "P1XP2"]}}'
-                    '}}}}')
-            await websocket.send(data)
-            response = await websocket.recv()
-            parsed_league = json.loads(response)
-            odds_league = get_odds_from_league_json(parsed_league, barrierebet, vbet)
-            list_odds.append(odds_league)
-        return merge_dicts(list_odds)
+    return get_swarm_client(SITE_IDS[get_bookmaker(barrierebet, vbet)])
+
+
+def get_id_league(url):
+    return re.findall(r'\/\d+', url)[0].strip("/")
+
+
+def get_league_params(id_league):
+    """
+    Swarm get request of the odds of a league
+    """
+    return {"source":"betting",
+            "what":{"region":["name"], "competition":["name", "teams_reversed"],
+                    "game":["id", "is_blocked", "start_ts", "team1_name", "team2_name", "is_started"],
+                    "market":["event"], "event":["price", "order"]},
+            "where":{"competition":{"id":int(id_league)},
+                     "game":{"@or":[{"type":{"@in":[0, 2]}}, {"visible_in_prematch":1, "type":1}]},
+                     "market":{"display_key":"WINNER", "type":{"@in":["P1P2", "P1XP2"]}}}}
+
+
+def get_sport_params(sport):
+    """
+    Swarm get request of the leagues of a sport
+    """
+    return {"source":"betting",
+            "what":{"competition":["id", "name"]},
+            "where":{"sport":{"name":sport},
+                     "game":{"@or":[{"type":{"@in":[0, 2]}}, {"visible_in_prematch":1, "type":1}]}}}
 
 
 def get_odds_from_league_json(parsed_league, barrierebet, vbet):
     """
     Get odds from league json
     """
-    bookmaker = "pasinobet"
-    if barrierebet:
-        bookmaker = "barrierebet"
-    elif vbet:
-        bookmaker = "vbet"
-    regions = parsed_league["data"]["data"]["region"]
+    bookmaker = get_bookmaker(barrierebet, vbet)
+    regions = parsed_league.get("region", {})
     odds_league = {}
     for region in regions.values():
         region_name = region["name"]
@@ -123,19 +93,35 @@ def parse_pasinobet_api(id_league, barrierebet, vbet):
     """
     Get Pasinobet odds from league id
     """
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    parsed = asyncio.get_event_loop().run_until_complete(get_json_pasinobet_api(id_league, barrierebet, vbet))
-    return get_odds_from_league_json(parsed, barrierebet, vbet)
+    parsed = get_client(barrierebet, vbet).get(get_league_params(id_league))
+    return get_odds_from_league_json(parsed["data"], barrierebet, vbet)
 
 
 def parse_pasinobet_sport(sport, barrierebet, vbet):
     """
-    Get Pasinobet odds from sport ("Tennis ", "Football " ...)
+    Get Pasinobet odds from sport ("Tennis ", "Football " ...), all leagues being requested at once
     """
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    return asyncio.get_event_loop().run_until_complete(get_json_sport_pasinobet_api(sport, barrierebet, vbet))
+    client = get_client(barrierebet, vbet)
+    parsed = client.get(get_sport_params(sport))
+    id_leagues = [league["id"] for league in parsed["data"].get("competition", {}).values()
+                  if "Compétition" not in league["name"]]
+    parsed_leagues = client.get_all([get_league_params(id_league) for id_league in id_leagues])
+    return merge_dicts([get_odds_from_league_json(parsed_league["data"], barrierebet, vbet)
+                        for parsed_league in parsed_leagues])
+
+
+def subscribe_pasinobet(url, callback, barrierebet=False, vbet=False):
+    """
+    Subscribe to the odds of a league from url: callback(odds) is called with the odds of the
+    league each time they are updated. Returns the subscription id (see unsubscribe_pasinobet)
+    """
+    return get_client(barrierebet, vbet).subscribe(
+        get_league_params(get_id_league(url)),
+        lambda data: callback(get_odds_from_league_json(data, barrierebet, vbet)))
+
+
+def unsubscribe_pasinobet(subid, barrierebet=False, vbet=False):
+    get_client(barrierebet, vbet).unsubscribe(subid)
 
 
 def parse_pasinobet(url, barrierebet=False, vbet=False):
@@ -144,5 +130,4 @@ def parse_pasinobet(url, barrierebet=False, vbet=False):
     """
     if not "https://" in url:
         return parse_pasinobet_sport(url, barrierebet, vbet)
-    id_league = re.findall(r'\/\d+', url)[0].strip("/")
-    return parse_pasinobet_api(id_league, barrierebet, vbet)
+    return parse_pasinobet_api(get_id_league(url), barrierebet, vbet)
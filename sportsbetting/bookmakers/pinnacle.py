@@ -4,19 +4,18 @@ Pinnacle odds scraper
 
 import datetime
 import json
-import os
-import urllib
-import time
 
 import dateutil.parser
-import seleniumwire
+import selenium.common
 
 from collections import defaultdict
 
 
 import sportsbetting as sb
+from sportsbetting import selenium_init
+from sportsbetting.token_functions import TOKENS, get_all_with_token, get_with_token
 from sportsbetting.auxiliary_functions import merge_dicts, truncate_datetime
-from sportsbetting.database_functions import is_player_in_db, add_player_to_db, is_player_added_in_db, is_url_in_db
+from sportsbetting.database_functions import is_player_in_db, add_player_to_db, is_player_added_in_db, is_url_in_db, transaction
 
 
 def convert_american_odds(american_odds):
@@ -49,53 +48,45 @@ def get_pinnacle_odds_from_market_id(id_market, all_odds):
     return [], 0
                 
 
-def get_pinnacle_token():
+def fetch_pinnacle_token():
     """
-    Get Pinnacle token to access the API
+    Get a new Pinnacle token from the website
     """
     token = ""
-    if os.path.exists(sb.PATH_TOKENS):
-        with open(sb.PATH_TOKENS, "r") as file:
-            lines = file.readlines()
-            for line in lines:
-                bookmaker, token = line.split()
-                if bookmaker == "pinnacle":
-                    return token
     print("Récupération du token de connexion de Pinnacle")
-    options = seleniumwire.webdriver.ChromeOptions()
-    prefs = {'profile.managed_default_content_settings.images': 2,
-             'disk-cache-size': 4096}
-    options.add_argument('log-level=3')
-    options.add_experimental_option("prefs", prefs)
-    options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    options.add_argument("--headless")
-    options.add_argument("--disable-extensions")
-    driver = seleniumwire.webdriver.Chrome(sb.PATH_DRIVER, options=options)
-    driver.get("https://www.pinnacle.com/")
-    time.sleep(30)
-    for request in driver.requests:
-        if request.response:
-            token = request.headers.get("X-API-KEY")
-            if token:
-                with open(sb.PATH_TOKENS, "a+") as file:
-                    file.write("pinnacle {}\n".format(token))
-                break
-    driver.quit()
+    with selenium_init.get_pool().borrow() as driver:
+        driver.get("https://www.pinnacle.com/")
+        try:
+            driver.wait_for_request("arcadia.pinnacle.com", 30)
+        except selenium.common.exceptions.TimeoutException:
+            pass
+        for request in driver.requests:
+            if request.response:
+                token = request.headers.get("X-API-KEY")
+                if token:
+                    break
     return token
 
+
+def get_pinnacle_token():
+    """
+    Get Pinnacle token to access the API
+    """
+    return TOKENS.get("pinnacle")
+
+
+TOKENS.register("pinnacle", fetch_pinnacle_token)
+
 def parse_pinnacle(id_league):
     """
     Get odds from Pinnacle API
     """
     if not id_league.isnumeric():
         return parse_sport_pinnacle(id_league)
-    token = get_pinnacle_token()
     url_straight = "https://guest.api.arcadia.pinnacle.com/0.1/leagues/{}/markets/straight".format(id_league)
     url_matchup = "https://guest.api.arcadia.pinnacle.com/0.1/leagues/{}/matchups".format(id_league)
-    req_straight = urllib.request.Request(url_straight, headers={'x-api-key': token})
-    req_matchup = urllib.request.Request(url_matchup, headers={'x-api-key': token})
-    content_straight = urllib.request.urlopen(req_straight).read()
-    content_matchup = urllib.request.urlopen(req_matchup).read()
+    content_straight, content_matchup = (
+        response.content for response in get_all_with_token([url_straight, url_matchup], "pinnacle", "x-api-key"))
     all_odds = json.loads(content_straight)
     matches = json.loads(content_matchup)
     odds_match = {}
@@ -134,9 +125,7 @@ def parse_sport_pinnacle(sport):
                  "hockey-sur-glace" :19,
                  "handball" : 18}
     url = "https://guest.api.arcadia.pinnacle.com/0.1/sports/{}/leagues?all=false".format(id_sports[sport])
-    token = get_pinnacle_token()
-    req = urllib.request.Request(url, headers={'x-api-key': token})
-    content = urllib.request.urlopen(req).read()
+    content = get_with_token(url, "pinnacle", "x-api-key").content
     leagues = json.loads(content)
     list_odds = []
     for league in leagues:
@@ -150,16 +139,14 @@ def parse_sport_pinnacle(sport):
     return merge_dicts(list_odds)
 
 
+@transaction()
 def get_sub_markets_players_basketball_pinnacle(id_match):
     if not id_match:
         return {}
-    token = get_pinnacle_token()
     url_straight = "https://guest.api.arcadia.pinnacle.com/0.1/matchups/{}/markets/related/straight".format(id_match)
     url_related = "https://guest.api.arcadia.pinnacle.com/0.1/matchups/{}/related".format(id_match)
-    req_straight = urllib.request.Request(url_straight, headers={'x-api-key': token})
-    req_related = urllib.request.Request(url_related, headers={'x-api-key': token})
-    content_straight = urllib.request.urlopen(req_straight).read()
-    content_related = urllib.request.urlopen(req_related).read()
+    content_straight, content_related = (
+        response.content for response in get_all_with_token([url_straight, url_related], "pinnacle", "x-api-key"))
     all_odds = json.loads(content_straight)
     markets = json.loads(content_related)
     markets_to_keep = {'PointsReboundsAssist':'Points + passes + rebonds',
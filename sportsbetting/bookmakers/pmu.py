@@ -5,15 +5,13 @@ PMU odds scraper
 from collections import defaultdict
 import datetime
 import json
-import urllib
-import urllib.error
-import urllib.request
 
 from bs4 import BeautifulSoup
 
 import sportsbetting as sb
+from sportsbetting import http_functions
 from sportsbetting.auxiliary_functions import merge_dicts, truncate_datetime
-from sportsbetting.database_functions import is_player_in_db, add_player_to_db, is_player_added_in_db
+from sportsbetting.database_functions import is_player_in_db, add_player_to_db, is_player_added_in_db, transaction
 
 def parse_pmu(url=""):
     """
@@ -21,8 +19,11 @@ def parse_pmu(url=""):
     """
     if "http" not in url:
         return parse_sport_pmu(url)
-    soup = BeautifulSoup(urllib.request.urlopen(url), features="lxml")
-    return parse_pmu_html(soup)
+    return http_functions.get_parsed(url, "pmu", parse_pmu_response)
+
+
+def parse_pmu_response(response):
+    return parse_pmu_html(BeautifulSoup(response.content, features="lxml"))
 
 
 def parse_pmu_html(soup):
@@ -108,7 +109,7 @@ def parse_page_match_pmu(url):
     """
     Retourne les cotes d'une page de match sur pmu
     """
-    soup = BeautifulSoup(urllib.request.urlopen(url), features="lxml")
+    soup = BeautifulSoup(http_functions.get(url, "pmu").content, features="lxml")
     _id = "-1"
     odds = []
     name = soup.find("title").text.split(" - ")[0].replace("//", "-")
@@ -139,8 +140,8 @@ def parse_sport_pmu(sport):
     for _id in id_sport[sport]:
         while True:
             url = "https://paris-sportifs.pmu.fr/pservices/more_events/{0}/{1}/pmu-event-list-load-more-{0}".format(_id, i)
-            response = urllib.request.urlopen(url)
-            data = json.loads(response.read())
+            response = http_functions.get(url, "pmu")
+            data = json.loads(response.content)
             soup = BeautifulSoup(data[1]["html"], features="lxml")
             try:
                 list_odds.append(parse_pmu_html(soup))
@@ -150,6 +151,7 @@ def parse_sport_pmu(sport):
     return merge_dicts(list_odds)
 
 
+@transaction()
 def get_sub_markets_players_basketball_pmu(id_match):
     """
     Get submarkets odds from basketball match
@@ -165,7 +167,7 @@ def get_sub_markets_players_basketball_pmu(id_match):
         'Joueur(s) qui marque(nt) 35 points ou plus':'Points',
         'Joueur(s) qui marque(nt) 40 points ou plus':'Points'
     }
-    soup = BeautifulSoup((urllib.request.urlopen(url)), features='lxml')
+    soup = BeautifulSoup(http_functions.get(url, "pmu").content, features='lxml')
     sub_markets = {v:defaultdict(list) for v in markets_to_keep.values()}
     market_name = None
     odds = []
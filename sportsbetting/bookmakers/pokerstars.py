@@ -5,9 +5,9 @@ Pokerstars odds scraper
 import datetime
 import random
 import re
-import requests
 
 import sportsbetting as sb
+from sportsbetting import http_functions
 from sportsbetting.auxiliary_functions import merge_dicts
 
 def parse_pokerstars_api(id_league):
@@ -22,7 +22,7 @@ def parse_pokerstars_api(id_league):
         "includeOutrights=false&channelId=11&locale=fr-fr&siteId=32&foo={}"
         .format(id_league, str(random.random())[2:10])
     )
-    req = requests.get(url)
+    req = http_functions.get(url, "pokerstars", raise_for_status=False)
     if req.status_code == 503:
         raise sb.UnavailableSiteException
     parsed = req.json()
@@ -84,7 +84,7 @@ def parse_sport_pokerstars(sport):
         "includeCoupons=true&channelId=11&locale=fr-fr&siteId=32&foo={}"
         .format(sport.upper(), str(random.random())[2:10])
     )
-    req = requests.get(url)
+    req = http_functions.get(url, "pokerstars", raise_for_status=False)
     if req.status_code == 503:
         raise sb.UnavailableSiteException
     parsed = req.json()
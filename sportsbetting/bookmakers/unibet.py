@@ -6,12 +6,12 @@ from collections import defaultdict
 import datetime
 import json
 
-import requests
 
 import sportsbetting as sb
+from sportsbetting import http_functions
 from sportsbetting.database_functions import (
     is_player_in_db, add_player_to_db, is_player_added_in_db,
-    add_new_player_to_db, is_in_db_site, get_formatted_name_by_id
+    add_new_player_to_db, is_in_db_site, get_formatted_name_by_id, transaction
 )
 
 def get_id_league(url):
@@ -22,7 +22,7 @@ def get_id_league(url):
         return None, None
     public_url = url.split("https://www.unibet.fr")[1]
     request_url = "https://www.unibet.fr/zones/navigation.json?publicUrl="+public_url
-    content = requests.get(request_url).content
+    content = http_functions.get(request_url, "unibet", raise_for_status=False).content
     if "Nos services ne sont pas accessibles pour le moment et seront de retour au plus vite." in str(content):
         raise sb.UnavailableSiteException
     parsed = json.loads(content)
@@ -47,7 +47,7 @@ def parse_unibet_api(id_league, sport, boost):
         parameter = "R%25C3%25A9sultat%2520du%2520match"
     url = ("https://www.unibet.fr/zones/sportnode/markets.json?nodeId={}&filter=R%25C3%25A9sultat&marketname={}"
            .format(id_league, parameter))
-    content = requests.get(url).content
+    content = http_functions.get(url, "unibet", raise_for_status=False).content
     parsed = json.loads(content)
     markets_by_type = parsed.get("marketsByType", [])
     odds_match = {}
@@ -87,6 +87,7 @@ def parse_unibet(url, boost=False):
     return {}
 
 
+@transaction()
 def get_sub_markets_players_basketball_unibet(id_match):
     """
     Get submarkets odds from basketball match
@@ -94,7 +95,7 @@ def get_sub_markets_players_basketball_unibet(id_match):
     if not id_match:
         return {}
     url = 'https://www.unibet.fr/zones/event.json?eventId=' + id_match
-    content = requests.get(url).content
+    content = http_functions.get(url, "unibet", raise_for_status=False).content
     parsed = json.loads(content)
     markets_class_list = parsed.get('marketClassList', [])
     markets_to_keep = {
@@ -4,17 +4,17 @@ Winamax odds scraper
 
 from collections import defaultdict
 import datetime
+import functools
 import json
-import urllib
-import urllib.error
-import urllib.request
 
 from bs4 import BeautifulSoup
+import requests
 
 import sportsbetting as sb
+from sportsbetting import http_functions
 from sportsbetting.database_functions import (
     is_player_in_db, add_player_to_db, is_player_added_in_db,
-    add_new_player_to_db, is_in_db_site, get_formatted_name_by_id
+    add_new_player_to_db, is_in_db_site, get_formatted_name_by_id, transaction
 )
 
 def parse_winamax(url):
@@ -28,12 +28,17 @@ def parse_winamax(url):
         tournament_id = -1
     sport_id = int(ids.split("/")[0])
     try:
-        req = urllib.request.Request(
-            url, headers={'User-Agent': sb.USER_AGENT})
-        webpage = urllib.request.urlopen(req, timeout=10).read()
-        soup = BeautifulSoup(webpage, features="lxml")
-    except urllib.error.HTTPError:
+        return http_functions.get_parsed(url, "winamax", functools.partial(parse_winamax_response, tournament_id, sport_id),
+                                         headers={'User-Agent': sb.USER_AGENT})
+    except requests.exceptions.HTTPError:
         raise sb.UnavailableSiteException
+
+
+def parse_winamax_response(tournament_id, sport_id, response):
+    """
+    Retourne les cotes d'une page winamax
+    """
+    soup = BeautifulSoup(response.content, features="lxml")
     match_odds_hash = {}
     for line in soup.find_all(['script']):
         if "PRELOADED_STATE" not in str(line.string):
@@ -76,6 +81,7 @@ def parse_winamax(url):
         return match_odds_hash
     raise sb.UnavailableSiteException
 
+@transaction()
 def get_sub_markets_players_basketball_winamax(id_match):
     """
     Get submarkets odds from basketball match
@@ -84,10 +90,9 @@ def get_sub_markets_players_basketball_winamax(id_match):
         return {}
     url = 'https://www.winamax.fr/paris-sportifs/match/' + id_match
     try:
-        req = urllib.request.Request(url, headers={'User-Agent': sb.USER_AGENT})
-        webpage = urllib.request.urlopen(req, timeout=10).read()
+        webpage = http_functions.get(url, "winamax", headers={'User-Agent': sb.USER_AGENT}).content
         soup = BeautifulSoup(webpage, features='lxml')
-    except urllib.error.HTTPError:
+    except requests.exceptions.HTTPError:
         raise sb.UnavailableSiteException
     markets_to_keep = {
         '4436':'Points + passes + rebonds',
@@ -5,14 +5,13 @@ ZeBet odds scraper
 from collections import defaultdict
 import datetime
 import re
-import urllib
-import urllib.error
-import urllib.request
 
 from bs4 import BeautifulSoup
+import requests
 
 import sportsbetting as sb
-from sportsbetting.database_functions import is_player_in_db, add_player_to_db, is_player_added_in_db
+from sportsbetting import http_functions
+from sportsbetting.database_functions import is_player_in_db, add_player_to_db, is_player_added_in_db, transaction
 
 def parse_zebet(url):
     """
@@ -21,9 +20,16 @@ def parse_zebet(url):
     if "/sport/" in url:
         return parse_sport_zebet(url)
     try:
-        soup = BeautifulSoup(urllib.request.urlopen(url), features="lxml")
-    except urllib.error.URLError:
+        return http_functions.get_parsed(url, "zebet", parse_zebet_response)
+    except requests.exceptions.RequestException:
         raise sb.UnavailableCompetitionException
+
+
+def parse_zebet_response(response):
+    """
+    Retourne les cotes d'une page de compétition zebet
+    """
+    soup = BeautifulSoup(response.content, features="lxml")
     match_odds_hash = {}
     today = datetime.datetime.today()
     today = datetime.datetime(today.year, today.month, today.day)
@@ -60,7 +66,7 @@ def parse_sport_zebet(url):
     """
     Retourne les cotes disponibles sur zebet pour un sport donné
     """
-    soup = BeautifulSoup(urllib.request.urlopen(url), features="lxml")
+    soup = BeautifulSoup(http_functions.get(url, "zebet").content, features="lxml")
     match_odds_hash = {}
     today = datetime.datetime.today()
     today = datetime.datetime(today.year, today.month, today.day)
@@ -110,6 +116,7 @@ def format_zebet_names(match):
     return ""
 
 
+@transaction()
 def get_sub_markets_players_basketball_zebet(id_match):
     """
     Get submarkets odds from basketball match
@@ -126,7 +133,7 @@ def get_sub_markets_players_basketball_zebet(id_match):
         'Nombre total de points + rebonds (prolongations incluses)' : 'Points + rebonds',
         'Performance du joueur (points + rebonds + passes, prolongations incluses)' : 'Points + passes + rebonds'
     }
-    soup = BeautifulSoup((urllib.request.urlopen(url)), features='lxml')
+    soup = BeautifulSoup(http_functions.get(url, "zebet").content, features='lxml')
     sub_markets = {v:defaultdict(list) for v in markets_to_keep.values()}
     market_name = None
     for line in soup.find_all():
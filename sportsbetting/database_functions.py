@@ -1,8 +1,10 @@
 """
 Fonctions de gestion de la base de données des noms d'équipe/joueur/compétition
 """
+import contextlib
 import json
 import sqlite3
+import threading
 import urllib
 import urllib.request
 import urllib.error
@@ -16,17 +18,430 @@ import termcolor
 
 import sportsbetting as sb
 
+LOCAL_CONNECTION = threading.local()
+SCHEMA_VERSION = 1
+
+
+def get_connection():
+    """
+    Retourne la connexion à la base de données propre au thread courant. Elle est ouverte au
+    premier appel puis réutilisée, ainsi que ses requêtes préparées
+    """
+    conn = getattr(LOCAL_CONNECTION, "conn", None)
+    if conn is None or LOCAL_CONNECTION.path != sb.PATH_DB:
+        conn = sqlite3.connect(sb.PATH_DB, cached_statements=256)
+        migrate_db(conn)
+        LOCAL_CONNECTION.conn = conn
+        LOCAL_CONNECTION.path = sb.PATH_DB
+        LOCAL_CONNECTION.depth = 0
+    return conn
+
+
+def close_connection():
+    """
+    Ferme la connexion à la base de données du thread courant
+    """
+    conn = getattr(LOCAL_CONNECTION, "conn", None)
+    if conn is not None:
+        conn.close()
+        LOCAL_CONNECTION.conn = None
+
+
+@contextlib.contextmanager
+def transaction():
+    """
+    Regroupe toutes les écritures effectuées dans le bloc en une unique transaction, validée à la
+    sortie du bloc le plus externe et annulée en cas d'exception
+    """
+    conn = get_connection()
+    LOCAL_CONNECTION.depth += 1
+    try:
+        yield conn
+    except BaseException:
+        LOCAL_CONNECTION.depth -= 1
+        if not LOCAL_CONNECTION.depth:
+            conn.rollback()
+            RESOLVER.invalidate()
+            NAME_INDEX.invalidate()
+        raise
+    LOCAL_CONNECTION.depth -= 1
+    if not LOCAL_CONNECTION.depth:
+        conn.commit()
+
+
+def execute(query, parameters=()):
+    """
+    Exécute une requête paramétrée sur la connexion du thread courant
+    """
+    return get_connection().execute(query, parameters)
+
+
+def site_column(prefix, site):
+    """
+    Retourne le nom de la colonne associée à un site (les noms de colonne ne pouvant pas être
+    passés en paramètre d'une requête)
+    """
+    if not re.fullmatch(r"[a-z_]+", str(site)):
+        raise ValueError("Site inconnu : {}".format(site))
+    return "{}_{}".format(prefix, site)
+
+
+def get_site_columns(conn, table):
+    """
+    Retourne les colonnes name_<site> d'une table
+    """
+    return [line[1] for line in conn.execute("PRAGMA table_info({})".format(table))
+            if line[1].startswith("name_")]
+
+
+def migrate_db(conn):
+    """
+    Met à jour sur place le schéma d'une base de données existante : index sur (sport, name_<site>)
+    et sur id, et table d'alias names_v2 (id, sport, name, name_site) indexée
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    with conn:
+        for column in get_site_columns(conn, "names"):
+            conn.execute("""
+            CREATE INDEX IF NOT EXISTS index_names_{0} ON names (sport, {0}, id, name)
+            """.format(column))
+        conn.execute("CREATE INDEX IF NOT EXISTS index_names_id ON names (id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS index_players_name ON players (name)")
+        for column in get_site_columns(conn, "players"):
+            conn.execute("""
+            CREATE INDEX IF NOT EXISTS index_players_{0} ON players ({0})
+            """.format(column))
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS names_v2 (id INTEGER, sport TEXT, name TEXT, name_site TEXT)
+        """)
+        fill_names_v2(conn)
+        conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS index_names_v2_alias ON names_v2 (sport, name_site, id, name)
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS index_names_v2_id ON names_v2 (id)")
+        conn.execute("PRAGMA user_version = {}".format(SCHEMA_VERSION))
+
+
+def fill_names_v2(conn):
+    """
+    Reconstruit la table d'alias names_v2 à partir de toutes les colonnes name_<site> de names
+    """
+    conn.execute("DELETE FROM names_v2")
+    conn.execute("""
+    INSERT INTO names_v2 (id, sport, name, name_site)
+    SELECT DISTINCT id, sport, name, name_site FROM ({})
+    """.format(" UNION ".join("SELECT id, sport, name, {0} AS name_site FROM names "
+                              "WHERE {0} IS NOT NULL".format(column)
+                              for column in get_site_columns(conn, "names"))))
+
+
+class NameResolver:
+    """
+    Copie en mémoire des correspondances (site, sport, nom sur le site) -> nom uniformisé des
+    tables names et players, chargée une seule fois puis mise à jour à chaque écriture
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.path = None
+        self.names = {}
+        self.players = {}
+        self.player_names = set()
+
+    def load(self):
+        """
+        Charge les tables names et players de la base de données courante
+        """
+        with self.lock:
+            if self.path == sb.PATH_DB:
+                return
+            conn = get_connection()
+            names = {}
+            columns = get_site_columns(conn, "names")
+            for line in conn.execute("SELECT id, sport, name, {} FROM names ORDER BY _rowid_"
+                                     .format(", ".join(columns))):
+                for column, name_site in zip(columns, line[3:]):
+                    if name_site is not None:
+                        names.setdefault((column[5:], line[1], name_site), []).append((line[0], line[2]))
+            players = {}
+            player_names = set()
+            columns = get_site_columns(conn, "players")
+            for line in conn.execute("SELECT name, {} FROM players ORDER BY _rowid_"
+                                     .format(", ".join(columns))):
+                player_names.add(line[0])
+                for column, name_site in zip(columns, line[1:]):
+                    if name_site is not None:
+                        players.setdefault((column[5:], name_site), line[0])
+            self.names, self.players, self.player_names = names, players, player_names
+            self.path = sb.PATH_DB
+
+    def invalidate(self):
+        """
+        Force le rechargement des données lors du prochain accès
+        """
+        self.path = None
+
+    def is_loaded(self):
+        return self.path == sb.PATH_DB
+
+    def get_names(self, name, sport, site):
+        """
+        Retourne la liste des couples (id, nom uniformisé) associés à un nom sur un site
+        """
+        if not self.is_loaded():
+            self.load()
+        return self.names.get((site, sport, name), [])
+
+    def get_player(self, player, site):
+        """
+        Retourne le nom de référence d'un joueur tel qu'il est affiché sur un site
+        """
+        if not self.is_loaded():
+            self.load()
+        return self.players.get((site, player))
+
+    def is_player(self, player):
+        if not self.is_loaded():
+            self.load()
+        return player in self.player_names
+
+    def refresh_name(self, conn, name, sport, site):
+        """
+        Met à jour les correspondances d'un nom sur un site après une écriture
+        """
+        if not self.is_loaded():
+            return
+        lines = conn.execute("""
+        SELECT id, name FROM names WHERE sport = ? AND {} = ? ORDER BY _rowid_
+        """.format(site_column("name", site)), (sport, name)).fetchall()
+        if lines:
+            self.names[(site, sport, name)] = lines
+        else:
+            self.names.pop((site, sport, name), None)
+
+    def refresh_player(self, conn, player, site):
+        """
+        Met à jour la correspondance d'un joueur sur un site après une écriture
+        """
+        if not self.is_loaded():
+            return
+        line = conn.execute("""
+        SELECT name FROM players WHERE {} = ? ORDER BY _rowid_ LIMIT 1
+        """.format(site_column("name", site)), (player,)).fetchone()
+        if line:
+            self.players[(site, player)] = line[0]
+        else:
+            self.players.pop((site, player), None)
+
+    def add_player(self, player):
+        if self.is_loaded():
+            self.player_names.add(player)
+
+
+RESOLVER = NameResolver()
+
+
+def split_name_without_acronyms(name):
+    """
+    Découpe un nom en mots et retourne ces mots ainsi que le nom privé de ses sigles. Par exemple,
+    "Paris SG" devient "Paris"
+    """
+    split_name = re.split(r'[ .\-,]', name.split("(")[0].strip())
+    return split_name, " ".join([string for string in split_name if (len(string) > 2
+                                                                     or string != string.upper())])
+
+
+class SubstringIndex:
+    """
+    Index de trigrammes permettant de trouver rapidement les chaînes contenant ou contenues dans
+    une chaîne donnée. Les candidats retournés sont un sur-ensemble des résultats exacts
+    """
+
+    def __init__(self):
+        self.ranks = set()
+        self.values = {}
+        self.trigrams = {}
+
+    def add(self, rank, value):
+        self.ranks.add(rank)
+        self.values.setdefault(value, set()).add(rank)
+        for i in range(len(value) - 2):
+            self.trigrams.setdefault(value[i:i + 3], set()).add(rank)
+
+    def containing(self, string):
+        """
+        Retourne les rangs des chaînes pouvant contenir string
+        """
+        if len(string) < 3:
+            return self.ranks
+        postings = sorted((self.trigrams.get(string[i:i + 3], set()) for i in range(len(string) - 2)),
+                          key=len)
+        return set.intersection(*postings)
+
+    def contained_in(self, string):
+        """
+        Retourne les rangs des chaînes contenues dans string
+        """
+        substrings = {string[i:j] for i in range(len(string) + 1) for j in range(i, len(string) + 1)}
+        return set().union(*(self.values.get(substring, ()) for substring in substrings))
+
+
+class SportNameIndex:
+    """
+    Index des noms d'un sport pour la recherche de noms proches : noms en minuscules sans accents,
+    noms sans sigles, ensembles de mots, clés initiale + nom pour le tennis et joueurs des équipes
+    de double
+    """
+
+    def __init__(self, sport):
+        self.sport = sport
+        self.lines = []
+        self.ranks = {}
+        self.filled_sites = []
+        self.lower_names = SubstringIndex()
+        self.short_names = SubstringIndex()
+        self.words = {}
+        self.nb_words = {}
+        self.initials = {}
+        self.doubles = SubstringIndex()
+        self.doubles_ranks = set()
+
+    def add(self, rowid, _id, name, filled_sites):
+        """
+        Ajoute ou met à jour une ligne de la table names
+        """
+        if rowid in self.ranks:
+            rank = self.ranks[rowid]
+            self.lines[rank] = (_id, name)
+            self.filled_sites[rank] = filled_sites
+            return
+        rank = len(self.lines)
+        self.ranks[rowid] = rank
+        self.lines.append((_id, name))
+        self.filled_sites.append(filled_sites)
+        self.lower_names.add(rank, unidecode.unidecode(name.lower()))
+        split_line, split_line2 = split_name_without_acronyms(name)
+        if split_line2:
+            self.short_names.add(rank, unidecode.unidecode(split_line2.lower()))
+            words = set(map(lambda x: unidecode.unidecode(x.lower()), split_line))
+            self.nb_words[rank] = len(words)
+            for word in words:
+                self.words.setdefault(word, set()).add(rank)
+        match = re.match(r'.[a-z]+\s(.)', name)
+        if match:
+            self.initials.setdefault((name[0], match.group(1)), set()).add(rank)
+        if self.sport == "tennis" and " & " in name:
+            self.doubles_ranks.add(rank)
+            for player in unidecode.unidecode(name).lower().split(" & ")[:2]:
+                self.doubles.add(rank, player)
+
+    def get_lines(self, ranks, site, only_null):
+        """
+        Retourne, dans l'ordre de la table, les lignes (id, nom) correspondant aux rangs donnés
+        """
+        return [self.lines[rank] for rank in sorted(ranks)
+                if not (only_null and site in self.filled_sites[rank])]
+
+    def get_subsets(self, words):
+        """
+        Retourne les rangs des noms dont tous les mots appartiennent à words
+        """
+        counts = {}
+        for word in words:
+            for rank in self.words.get(word, ()):
+                counts[rank] = counts.get(rank, 0) + 1
+        return {rank for rank, count in counts.items() if count == self.nb_words[rank]}
+
+    def get_initials(self, init_first_name, last_name):
+        """
+        Retourne les rangs des noms pouvant être de la forme "Prénom Nom" à partir de l'initiale du
+        prénom et du nom
+        """
+        if init_first_name.isalnum() and last_name[:1].isalnum():
+            return self.initials.get((init_first_name, last_name[0]), set())
+        return set(range(len(self.lines)))
+
+    def get_doubles(self, players):
+        """
+        Retourne les rangs des équipes de double pouvant correspondre aux joueurs donnés
+        """
+        return ((self.doubles.containing(players[0]) & self.doubles.containing(players[1]))
+                | (self.doubles.contained_in(players[0]) & self.doubles.contained_in(players[1])))
+
+
+class NameIndex:
+    """
+    Index des noms de la table names par sport, construits à la demande et mis à jour à chaque
+    écriture
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.path = None
+        self.sports = {}
+
+    def get(self, sport):
+        with self.lock:
+            if self.path != sb.PATH_DB:
+                self.sports = {}
+                self.path = sb.PATH_DB
+            if sport not in self.sports:
+                conn = get_connection()
+                columns = get_site_columns(conn, "names")
+                index = SportNameIndex(sport)
+                for line in conn.execute("""
+                SELECT _rowid_, id, name, {} FROM names WHERE sport = ? ORDER BY _rowid_
+                """.format(", ".join(columns)), (sport,)):
+                    index.add(line[0], line[1], line[2],
+                              {column[5:] for column, name_site in zip(columns, line[3:])
+                               if name_site is not None})
+                self.sports[sport] = index
+            return self.sports[sport]
+
+    def invalidate(self):
+        with self.lock:
+            self.path = None
+            self.sports = {}
+
+    def refresh_id(self, conn, _id):
+        """
+        Met à jour les lignes d'un id après une écriture
+        """
+        with self.lock:
+            if self.path != sb.PATH_DB:
+                return
+            columns = get_site_columns(conn, "names")
+            for line in conn.execute("""
+            SELECT _rowid_, id, name, sport, {} FROM names WHERE id = ? ORDER BY _rowid_
+            """.format(", ".join(columns)), (_id,)):
+                if line[3] in self.sports:
+                    self.sports[line[3]].add(line[0], line[1], line[2],
+                                             {column[5:] for column, name_site in zip(columns, line[4:])
+                                              if name_site is not None})
+
+
+NAME_INDEX = NameIndex()
+
+
+def add_alias_to_db(conn, _id, sport, name, name_site):
+    """
+    Ajoute un alias dans la table names_v2
+    """
+    conn.execute("""
+    INSERT OR IGNORE INTO names_v2 (id, sport, name, name_site)
+    VALUES (?, ?, ?, ?)
+    """, (_id, sport, name, name_site))
+
 
 def get_id_from_competition_name(competition, sport):
     """
     Retourne l'id et le nom tel qu'affiché sur comparateur-de-cotes.fr. Par
     exemple, "Ligue 1" devient "France - Ligue 1"
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT id FROM competitions WHERE competition = "{}" AND sport='{}'
-    """.format(competition, sport))
+    c = execute("""
+    SELECT id FROM competitions WHERE competition = ? AND sport = ?
+    """, (competition, sport))
     return c.fetchone()[0]
 
 
@@ -34,11 +449,9 @@ def get_competition_by_id(_id, site):
     """
     Retourne l'url d'une competition donnée sur un site donné
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT url_{} FROM competitions WHERE id='{}'
-    """.format(str(site), _id))
+    c = execute("""
+    SELECT {} FROM competitions WHERE id = ?
+    """.format(site_column("url", site)), (_id,))
     return c.fetchone()[0]
 
 
@@ -47,14 +460,9 @@ def get_formatted_name(name, site, sport):
     Uniformisation d'un nom d'équipe/joueur d'un site donné conformément aux noms disponibles sur
     comparateur-de-cotes.fr. Par exemple, "OM" devient "Marseille"
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    res = list(c.execute("""
-    SELECT name FROM names WHERE sport="{}" AND name_{}="{}"
-    """.format(sport, site, name)))
-    c.close()
+    res = RESOLVER.get_names(name, sport, site)
     try:
-        return res[0][0]
+        return res[0][1]
     except IndexError:
         if sb.DB_MANAGEMENT:
             colorama.init()
@@ -69,11 +477,9 @@ def get_competition_id(name, sport):
     """
     Retourne l'id d'une compétition
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT id, competition FROM competitions WHERE sport='{}'
-    """.format(sport))
+    c = execute("""
+    SELECT id, competition FROM competitions WHERE sport = ?
+    """, (sport,))
     for line in c.fetchall():
         strings_name = name.lower().split()
         possible = True
@@ -89,11 +495,9 @@ def get_competition_url(name, sport, site):
     """
     Retourne l'url d'une compétition sur un site donné
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT competition, url_{} FROM competitions WHERE sport='{}'
-    """.format(site, sport))
+    c = execute("""
+    SELECT competition, {} FROM competitions WHERE sport = ?
+    """.format(site_column("url", site)), (sport,))
     for line in c.fetchall():
         strings_name = name.lower().split()
         possible = True
@@ -106,11 +510,9 @@ def get_competition_url(name, sport, site):
 
 
 def is_url_in_db(url, site):
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT competition FROM competitions WHERE url_{}='{}'
-    """.format(site, url))
+    c = execute("""
+    SELECT competition FROM competitions WHERE {} = ?
+    """.format(site_column("url", site)), (url,))
     return bool(c.fetchone())
 
 
@@ -119,20 +521,18 @@ def import_teams_by_url(url):
     Ajout dans la base de données de toutes les équipes/joueurs d'une même compétition (url) ayant
     un match prévu sur comparateur-de-cotes.fr
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
     soup = BeautifulSoup(urllib.request.urlopen(url), features="lxml")
     sport = soup.find("title").string.split()[-1].lower()
-    for line in soup.find_all(["a"]):
-        if "href" in line.attrs and "-td" in line["href"] and line.text:
-            _id = line["href"].split("-td")[-1]
-            if not is_id_in_db(_id):
-                c.execute("""
-                INSERT INTO names (id, name, sport)
-                VALUES ({}, "{}", "{}")
-                """.format(_id, line.text, sport))
-                conn.commit()
-    c.close()
+    with transaction() as conn:
+        for line in soup.find_all(["a"]):
+            if "href" in line.attrs and "-td" in line["href"] and line.text:
+                _id = line["href"].split("-td")[-1]
+                if not is_id_in_db(_id):
+                    conn.execute("""
+                    INSERT INTO names (id, name, sport)
+                    VALUES (?, ?, ?)
+                    """, (int(_id), line.text, sport))
+                    NAME_INDEX.refresh_id(conn, int(_id))
 
 
 def import_teams_by_sport(sport):
@@ -161,11 +561,9 @@ def is_id_in_db(_id):
     """
     Vérifie si l'id est dans la base de données
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT id FROM names WHERE id="{}"
-    """.format(_id))
+    c = execute("""
+    SELECT id FROM names WHERE id = ?
+    """, (_id,))
     for line in c.fetchall():
         return line
 
@@ -174,16 +572,14 @@ def is_in_db(name, sport, site, only_null=True):
     """
     Vérifie si le nom uniformisé de l'équipe est dans la base de données
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
     if only_null:
-        c.execute("""
-        SELECT id, name FROM names WHERE sport="{}" AND name="{}" and name_{} IS NULL
-        """.format(sport, name, site))
+        c = execute("""
+        SELECT id, name FROM names WHERE sport = ? AND name = ? AND {} IS NULL
+        """.format(site_column("name", site)), (sport, name))
     else:
-        c.execute("""
-        SELECT id FROM names WHERE sport="{}" AND name="{}"
-        """.format(sport, name))
+        c = execute("""
+        SELECT id FROM names WHERE sport = ? AND name = ?
+        """, (sport, name))
     return list(c.fetchall())
 
 
@@ -192,31 +588,24 @@ def is_in_db_site(name, sport, site):
     Vérifie si le nom de l'équipe/joueur tel qu'il est affiché sur un site est dans la base de
     données
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT id FROM names WHERE sport="{}" AND name_{}="{}"
-    """.format(sport, site, name))
-    for line in c.fetchall():
-        return line
+    for line in RESOLVER.get_names(name, sport, site):
+        return line[:1]
 
 
 def get_formatted_name_by_id(_id):
     """
     Retourne le nom d'une équipe en fonction de son id dans la base de donbées
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT name FROM names WHERE id='{}'
-    """.format(_id))
+    c = execute("""
+    SELECT name FROM names WHERE id = ?
+    """, (_id,))
     try:
         return c.fetchone()[0]
     except TypeError:
         add_id_to_db(_id)
-        c.execute("""
-        SELECT name FROM names WHERE id='{}'
-        """.format(_id))
+        c = execute("""
+        SELECT name FROM names WHERE id = ?
+        """, (_id,))
         return c.fetchone()[0]
 
 
@@ -235,14 +624,12 @@ def add_id_to_db(_id):
             if " (" in line.text:
                 name, category = line.text.split(" (")
                 category.strip(")")
-            conn = sqlite3.connect(sb.PATH_DB)
-            c = conn.cursor()
-            c.execute("""
-            INSERT INTO names (id, name, sport, category)
-            VALUES ({}, "{}", "{}", "{}")
-            """.format(_id, name, sport, category))
-            conn.commit()
-            c.close()
+            with transaction() as conn:
+                conn.execute("""
+                INSERT INTO names (id, name, sport, category)
+                VALUES (?, ?, ?, ?)
+                """, (int(_id), name, sport, str(category)))
+                NAME_INDEX.refresh_id(conn, int(_id))
             break
     else:
         if "Aucun évènement n'est programmé pour" in soup.text:
@@ -252,14 +639,12 @@ def add_id_to_db(_id):
                 name, category = name.split(" (")
                 category = category.strip(")")
             sport = soup.find("div", {"class": "head"}).text.split("(")[-1].strip(")").lower()
-            conn = sqlite3.connect(sb.PATH_DB)
-            c = conn.cursor()
-            c.execute("""
-            INSERT INTO names (id, name, sport, category)
-            VALUES ({}, "{}", "{}", "{}")
-            """.format(_id, name, sport, category))
-            conn.commit()
-            c.close()
+            with transaction() as conn:
+                conn.execute("""
+                INSERT INTO names (id, name, sport, category)
+                VALUES (?, ?, ?, ?)
+                """, (int(_id), name, sport, str(category)))
+                NAME_INDEX.refresh_id(conn, int(_id))
 
 
 def add_id_to_db_thesportsdb(_id):
@@ -271,25 +656,21 @@ def add_id_to_db_thesportsdb(_id):
     name = dict_team["teams"][0]["strTeam"]
     sport = (dict_team["teams"][0]["strSport"].lower().replace("soccer", "football")
              .replace("ice_hockey", "hockey-sur-glace"))
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    INSERT INTO names (id, name, sport)
-    VALUES ({}, "{}", "{}")
-    """.format(_id, name, sport))
-    conn.commit()
-    c.close()
+    with transaction() as conn:
+        conn.execute("""
+        INSERT INTO names (id, name, sport)
+        VALUES (?, ?, ?)
+        """, (_id, name, sport))
+        NAME_INDEX.refresh_id(conn, _id)
 
 
 def get_sport_by_id(_id):
     """
     Retourne le sport associé à un id d'équipe/joueur dans la base de données
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT sport FROM names WHERE id='{}'
-    """.format(_id))
+    c = execute("""
+    SELECT sport FROM names WHERE id = ?
+    """, (_id,))
     try:
         return c.fetchone()[0]
     except TypeError:
@@ -297,9 +678,9 @@ def get_sport_by_id(_id):
             add_id_to_db(_id)
         else:
             add_id_to_db_thesportsdb(_id)
-        c.execute("""
-        SELECT sport FROM names WHERE id='{}'
-        """.format(_id))
+        c = execute("""
+        SELECT sport FROM names WHERE id = ?
+        """, (_id,))
         return c.fetchone()[0]
 
 
@@ -310,8 +691,7 @@ def add_name_to_db(_id, name, site, check=False, date_next_match=None, date_next
     sport = get_sport_by_id(_id)
     if is_in_db_site(name, sport, site): #Pour éviter les ajouts intempestifs
         return True
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
+    column = site_column("name", site)
     name_is_potential_double = sport == "tennis" and any(x in name for x in ["-", "/", "&"])
     formatted_name = get_formatted_name_by_id(_id)
     id_is_potential_double = "&" in formatted_name
@@ -334,24 +714,28 @@ def add_name_to_db(_id, name, site, check=False, date_next_match=None, date_next
                             "(nouvelle entrée : {}) (y/n)"
                             .format(formatted_name, site, name))
         if not check or ans in ['y', 'Yes']:
-            c.execute("""
-            UPDATE names
-            SET name_{0} = "{1}"
-            WHERE _rowid_ = (
-                SELECT _rowid_
-                FROM names
-                WHERE id = {2} AND name_{0} IS NULL
-                ORDER BY _rowid_
-                LIMIT 1
-            );
-            """.format(site, name, _id))
+            with transaction() as conn:
+                conn.execute("""
+                UPDATE names
+                SET {0} = ?
+                WHERE _rowid_ = (
+                    SELECT _rowid_
+                    FROM names
+                    WHERE id = ? AND {0} IS NULL
+                    ORDER BY _rowid_
+                    LIMIT 1
+                );
+                """.format(column), (name, _id))
+                add_alias_to_db(conn, _id, sport, formatted_name, name)
+                RESOLVER.refresh_name(conn, name, sport, site)
+                NAME_INDEX.refresh_id(conn, _id)
         else:
             return False
     else:
-        c.execute("""
-        SELECT sport, name, name_{} FROM names
-        WHERE id = {}
-        """.format(site, _id))
+        c = execute("""
+        SELECT sport, name, {} FROM names
+        WHERE id = ?
+        """.format(column), (_id,))
         sport, formatted_name, name_site = c.fetchone()
         if name and name != name_site:
             if check:
@@ -371,27 +755,29 @@ def add_name_to_db(_id, name, site, check=False, date_next_match=None, date_next
                                 "(entrée déjà existante : {}, nouvelle entrée : {}) (y/n)"
                                 .format(formatted_name, site, name_site, name))
             if not check or ans in ['y', 'Yes']:
-                if name_site and not is_id_available_for_site(_id, site):
-                    c.execute("""
-                    INSERT INTO names (id, name, sport, category, name_{})
-                    VALUES ({}, "{}", "{}", "{}", "{}")
-                    """.format(site, _id, formatted_name, sport, get_category(_id), name))
-                else:
-                    c.execute("""
-                    UPDATE names
-                    SET name_{0} = "{1}"
-                    WHERE _rowid_ = (
-                        SELECT _rowid_
-                        FROM names
-                        WHERE id = {2} AND name_{0} IS NULL
-                        ORDER BY _rowid_
-                        LIMIT 1
-                    );
-                    """.format(site, name, _id))
+                with transaction() as conn:
+                    if name_site and not is_id_available_for_site(_id, site):
+                        conn.execute("""
+                        INSERT INTO names (id, name, sport, category, {})
+                        VALUES (?, ?, ?, ?, ?)
+                        """.format(column), (_id, formatted_name, sport, str(get_category(_id)), name))
+                    else:
+                        conn.execute("""
+                        UPDATE names
+                        SET {0} = ?
+                        WHERE _rowid_ = (
+                            SELECT _rowid_
+                            FROM names
+                            WHERE id = ? AND {0} IS NULL
+                            ORDER BY _rowid_
+                            LIMIT 1
+                        );
+                        """.format(column), (name, _id))
+                    add_alias_to_db(conn, _id, sport, formatted_name, name)
+                    RESOLVER.refresh_name(conn, name, sport, site)
+                    NAME_INDEX.refresh_id(conn, _id)
             else:
                 return False
-    c.close()
-    conn.commit()
     return True
 
 
@@ -400,11 +786,9 @@ def is_id_available_for_site(_id, site):
     Vérifie s'il est possible d'ajouter un nom associé à un site et à un id sans créer de nouvelle
     entrée
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT name_{} FROM names WHERE id = {}
-    """.format(site, _id))
+    c = execute("""
+    SELECT {} FROM names WHERE id = ?
+    """.format(site_column("name", site)), (_id,))
     for line in c.fetchall():
         if line[0] is None:
             return True
@@ -415,18 +799,11 @@ def get_close_name(name, sport, site, only_null=True):
     """
     Cherche un nom similaire dans la base de données
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    if only_null:
-        c.execute("""
-        SELECT id, name FROM names WHERE sport='{}' AND name_{} IS NULL
-        """.format(sport, site))
-    else:
-        c.execute("""
-        SELECT id, name FROM names WHERE sport='{}'
-        """.format(sport))
+    index = NAME_INDEX.get(sport)
+    lower_name = unidecode.unidecode(name.lower())
+    ranks = index.lower_names.containing(lower_name) | index.lower_names.contained_in(lower_name)
     results = []
-    for line in c.fetchall():
+    for line in index.get_lines(ranks, site, only_null):
         if (unidecode.unidecode(name.lower()) in unidecode.unidecode(line[1].lower())
                 or unidecode.unidecode(line[1].lower()) in unidecode.unidecode(name.lower())):
             results.append(line)
@@ -445,18 +822,12 @@ def get_close_name2(name, sport, site, only_null=True):
     if not split_name2:
         return []
     set_name = set(map(lambda x: unidecode.unidecode(x.lower()), split_name))
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    if only_null:
-        c.execute("""
-        SELECT id, name FROM names WHERE sport='{}' AND name_{} IS NULL
-        """.format(sport, site))
-    else:
-        c.execute("""
-        SELECT id, name FROM names WHERE sport='{}'
-        """.format(sport))
+    index = NAME_INDEX.get(sport)
+    short_name = unidecode.unidecode(split_name2.lower())
+    ranks = (index.short_names.containing(short_name) | index.short_names.contained_in(short_name)
+             | index.get_subsets(set_name))
     results = []
-    for line in c.fetchall():
+    for line in index.get_lines(ranks, site, only_null):
         string_line = line[1].split("(")[0].strip()
         split_line = re.split(r'[ .\-,]', string_line)
         split_line2 = " ".join([string for string in split_line if (len(string) > 2
@@ -486,54 +857,35 @@ def get_close_name3(name, sport, site, only_null=True):
             init_first_name = split_name[0]
             last_name = split_name[1].strip()
             reg_exp = r'{}[a-z]+\s{}'.format(init_first_name, last_name)
-            conn = sqlite3.connect(sb.PATH_DB)
-            c = conn.cursor()
-            if only_null:
-                c.execute("""
-                SELECT id, name FROM names WHERE sport='{}' AND name_{} IS NULL
-                """.format(sport, site))
-            else:
-                c.execute("""
-                SELECT id, name FROM names WHERE sport='{}'
-                """.format(sport))
-            for line in c.fetchall():
+            index = NAME_INDEX.get(sport)
+            ranks = index.get_initials(init_first_name, last_name)
+            for line in index.get_lines(ranks, site, only_null):
                 if re.match(reg_exp, line[1]):
                     results.append(line)
     return results
 
 
 def get_close_name4(name, sport, site, only_null=True):
-    results = set()
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    for bookmaker in sb.BOOKMAKERS:
-        if bookmaker in ["barrierebet", "vbet"]:
-            continue
-        if only_null:
-            c.execute("""
-            SELECT id, name FROM names WHERE sport='{}' AND name_{}="{}" AND name_{} IS NULL
-            """.format(sport, bookmaker, name, site))
-        else:
-            c.execute("""
-            SELECT id, name FROM names WHERE sport='{}' AND name_{}="{}"
-            """.format(sport, bookmaker, name))
-        for line in c.fetchall():
-            results.add(line)
-    return list(results)
+    """
+    Cherche un nom identique sur un autre site grâce à la table d'alias names_v2
+    """
+    columns = [site_column("name", bookmaker) for bookmaker in sb.DB_BOOKMAKERS]
+    condition_alias = " OR ".join("{} = ?".format(column) for column in columns)
+    condition_null = "AND {} IS NULL".format(site_column("name", site)) if only_null else ""
+    c = execute("""
+    SELECT DISTINCT id, name FROM names
+    WHERE id IN (SELECT id FROM names_v2 WHERE sport = ? AND name_site = ?)
+    AND sport = ? AND ({}) {}
+    """.format(condition_alias, condition_null), (sport, name, sport) + (name,) * len(columns))
+    return c.fetchall()
 
 
 def get_id_by_site(name, sport, site):
     """
     Retourne l'id d'une équipe/joueur sur un site donné
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT id FROM names WHERE name_{}="{}" AND sport='{}'
-    """.format(site, name, sport))
-    _id = c.fetchone()
-    if _id:
-        return _id[0]
+    for line in RESOLVER.get_names(name, sport, site):
+        return line[0]
     return 0
 
 
@@ -642,11 +994,9 @@ def get_category(id_team):
     """
     Retourne la catégorie d'une équipe
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT category FROM names WHERE id={}
-    """.format(id_team))
+    c = execute("""
+    SELECT category FROM names WHERE id = ?
+    """, (id_team,))
     category = c.fetchone()
     if category:
         return category[0]
@@ -717,17 +1067,8 @@ def get_double_team_tennis(team, sport, site, only_null=False):
         elif site in ["pinnacle"]:
             players = list(map(lambda x: x.split(" ")[0] if len(x.split(" ")[0]) > 1 else x.split(" ")[1], complete_names))
         players = list(map(lambda x: x.strip(), players))
-        conn = sqlite3.connect(sb.PATH_DB)
-        c = conn.cursor()
-        if only_null:
-            c.execute("""
-            SELECT id, name FROM names WHERE sport='tennis' AND name LIKE '% & %' AND name_{} IS NULL
-            """.format(site))
-        else:
-            c.execute("""
-            SELECT id, name FROM names WHERE sport='tennis' AND name LIKE '% & %'
-            """)
-        for line in c.fetchall():
+        index = NAME_INDEX.get("tennis")
+        for line in index.get_lines(index.get_doubles(players), site, only_null):
             compared_players = unidecode.unidecode(line[1]).lower().split(" & ")
             if are_same_double(players, compared_players):
                 results.append(line)
@@ -738,11 +1079,9 @@ def get_all_competitions(sport):
     """
     Retourne toutes les compétitions d'un sport donné
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT competition FROM competitions WHERE sport='{0}' AND competition<>'Tout le {0}'
-    """.format(sport))
+    c = execute("""
+    SELECT competition FROM competitions WHERE sport = ? AND competition <> ?
+    """, (sport, "Tout le " + sport))
     return ["Tout le "+sport]+sorted(list(map(lambda x: x[0], c.fetchall())))
 
 
@@ -750,9 +1089,7 @@ def get_all_sports():
     """
     Retourne tous les sports disponibles dans la db
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
+    c = execute("""
     SELECT sport FROM competitions
     """)
     return sorted(list(set(map(lambda x: x[0], c.fetchall()))))
@@ -762,11 +1099,9 @@ def get_competition_name_by_id(_id):
     """
     Retourne l'url d'une competition donnée sur un site donné
     """
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT competition FROM competitions WHERE id='{}'
-    """.format(_id))
+    c = execute("""
+    SELECT competition FROM competitions WHERE id = ?
+    """, (_id,))
     try:
         return c.fetchone()[0]
     except TypeError:
@@ -788,14 +1123,11 @@ def get_all_current_competitions(sport):
                                         .format(league_name))
                     ans = sb.QUEUE_FROM_GUI.get(True)
                     if ans == "Yes":
-                        conn = sqlite3.connect(sb.PATH_DB)
-                        c = conn.cursor()
-                        c.execute("""
-                        INSERT INTO competitions (id, sport, competition)
-                        VALUES ({}, "{}", "{}")
-                        """.format(id_league, sport, league_name))
-                        conn.commit()
-                        c.close()
+                        with transaction() as conn:
+                            conn.execute("""
+                            INSERT INTO competitions (id, sport, competition)
+                            VALUES (?, ?, ?)
+                            """, (id_league, sport, league_name))
                         leagues.append(league_name)
             else:
                 leagues.append(league)
@@ -828,14 +1160,11 @@ def get_main_competitions(sport):
                                                 .format(league_name))
                             ans = sb.QUEUE_FROM_GUI.get(True)
                             if ans == "Yes":
-                                conn = sqlite3.connect(sb.PATH_DB)
-                                c = conn.cursor()
-                                c.execute("""
-                                INSERT INTO competitions (id, sport, competition)
-                                VALUES ({}, "{}", "{}")
-                                """.format(id_league, sport, league_name))
-                                conn.commit()
-                                c.close()
+                                with transaction() as conn:
+                                    conn.execute("""
+                                    INSERT INTO competitions (id, sport, competition)
+                                    VALUES (?, ?, ?)
+                                    """, (id_league, sport, league_name))
                                 leagues.append(league_name)
                     else:
                         leagues.append(league)
@@ -845,48 +1174,39 @@ def get_main_competitions(sport):
 
 
 def get_all_names_from_id(_id):
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT * FROM names WHERE id="{}"
-    """.format(_id))
+    c = execute("""
+    SELECT * FROM names WHERE id = ?
+    """, (_id,))
     results = c.fetchall()
     sport, name = results[0][1:3]
-    names_site = set(item for sublist in results for item in sublist[3:] if item)
+    names_site = set(item for sublist in results for item in sublist[4:] if item)
     for name_site in names_site:
         yield sport, name, name_site
 
 
 def add_id_to_new_db(_id):
-    conn = sqlite3.connect(sb.PATH_DB)
-    for sport, name, name_site in get_all_names_from_id(_id):
-        c = conn.cursor()
-        c.execute("""
-        INSERT INTO names_v2 (id, sport, name, name_site)
-        VALUES ({}, "{}", "{}", "{}")
-        """.format(_id, sport, name, name_site))
-    conn.commit()
+    with transaction() as conn:
+        conn.executemany("""
+        INSERT OR IGNORE INTO names_v2 (id, sport, name, name_site)
+        VALUES (?, ?, ?, ?)
+        """, [(_id, sport, name, name_site)
+              for sport, name, name_site in get_all_names_from_id(_id)])
 
 def get_all_ids():
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
+    c = execute("""
     SELECT id FROM names
     """)
     for id_ in sorted(list(set(map(lambda x: x[0], c.fetchall())))):
         yield id_
 
 def create_new_db():
-    for _id in get_all_ids():
-        if _id>133300:
-            add_id_to_new_db(_id)
+    with transaction() as conn:
+        fill_names_v2(conn)
 
 def is_id_consistent(_id):
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    select * from names where id={} order by _rowid_
-    """.format(_id))
+    c = execute("""
+    select * from names where id = ? order by _rowid_
+    """, (_id,))
     results = c.fetchall()
     n = len(results)
     list_sites = sb.DB_BOOKMAKERS
@@ -915,42 +1235,38 @@ def is_id_consistent(_id):
 
 
 def is_player_in_db(player):
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT name FROM players WHERE name="{}"
-    """.format(player))
-    if c.fetchall():
-        return True
-    return False
+    return RESOLVER.is_player(player)
 
 def is_player_added_in_db(player, site):
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    SELECT name FROM players WHERE name_{}="{}"
-    """.format(site, player))
-    ref_player = c.fetchone()
-    if ref_player:
-        return ref_player[0]
-    return None
+    return RESOLVER.get_player(player, site)
 
 def add_player_to_db(player, site):
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    UPDATE players
-    SET name_{0} = "{1}"
-    WHERE _rowid_ = (
-        SELECT _rowid_
-        FROM players
-        WHERE name = "{1}"
-        ORDER BY _rowid_
-        LIMIT 1
-    )
-    """.format(site, player))
-    c.close()
-    conn.commit()
+    update_player_name(player, player, site)
+
+
+def update_player_name(player, player_ref, site):
+    """
+    Associe le nom d'un joueur sur un site au joueur de référence player_ref
+    """
+    column = site_column("name", site)
+    with transaction() as conn:
+        previous_name = conn.execute("""
+        SELECT {} FROM players WHERE name = ? ORDER BY _rowid_ LIMIT 1
+        """.format(column), (player_ref,)).fetchone()
+        conn.execute("""
+        UPDATE players
+        SET {0} = ?
+        WHERE _rowid_ = (
+            SELECT _rowid_
+            FROM players
+            WHERE name = ?
+            ORDER BY _rowid_
+            LIMIT 1
+        )
+        """.format(column), (player, player_ref))
+        RESOLVER.refresh_player(conn, player, site)
+        if previous_name and previous_name[0]:
+            RESOLVER.refresh_player(conn, previous_name[0], site)
 
 def get_close_player_name(name, site):
     """
@@ -968,11 +1284,9 @@ def get_close_player_name(name, site):
         init_first_name = split_name[0]
         last_name = split_name[1].strip()
         reg_exp = r'{}[a-zA-Z\-\']+\s{}'.format(init_first_name, last_name)
-        conn = sqlite3.connect(sb.PATH_DB)
-        c = conn.cursor()
-        c.execute("""
-        SELECT name FROM players WHERE name_{} IS NULL
-        """.format(site))
+        c = execute("""
+        SELECT name FROM players WHERE {} IS NULL
+        """.format(site_column("name", site)))
         for line in c.fetchall():
             if re.match(reg_exp, line[0]):
                 results.append(line[0])
@@ -983,30 +1297,14 @@ def add_close_player_to_db(player, site):
     if len(set(close_players)) != 1:
         return False
     player_ref = close_players[0]
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    UPDATE players
-    SET name_{} = "{}"
-    WHERE _rowid_ = (
-        SELECT _rowid_
-        FROM players
-        WHERE name = "{}"
-        ORDER BY _rowid_
-        LIMIT 1
-    )
-    """.format(site, player, player_ref))
-    c.close()
-    conn.commit()
+    update_player_name(player, player_ref, site)
     return player_ref
 
 def add_new_player_to_db(player):
-    conn = sqlite3.connect(sb.PATH_DB)
-    c = conn.cursor()
-    c.execute("""
-    INSERT INTO players (name)
-    VALUES ("{}")
-    """.format(player))
-    conn.commit()
-    c.close()
+    with transaction() as conn:
+        conn.execute("""
+        INSERT INTO players (name)
+        VALUES (?)
+        """, (player,))
+    RESOLVER.add_player(player)
     
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Historique des cotes : chaque récupération des cotes d'un sport est ajoutée (sans jamais modifier
+les enregistrements précédents) à une base SQLite, ce qui permet de suivre l'évolution des cotes
+d'un match et de retrouver les surebets d'une période
+"""
+
+import atexit
+import copy
+import datetime
+import itertools
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import traceback
+
+import sportsbetting as sb
+from sportsbetting.auxiliary_functions import trj_match
+from sportsbetting.odds_store import date_to_epoch, epoch_to_date
+
+HISTORY_QUEUE = queue.Queue()
+WRITER_LOCK = threading.Lock()
+WRITER = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS odds_history (
+    timestamp INTEGER NOT NULL,
+    sport TEXT NOT NULL,
+    match TEXT NOT NULL,
+    bookmaker TEXT NOT NULL,
+    odds TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS odds_history_match ON odds_history (sport, match, timestamp);
+CREATE INDEX IF NOT EXISTS odds_history_timestamp ON odds_history (sport, timestamp, match);
+"""
+
+
+def connect(path=None):
+    """
+    Ouvre la base de l'historique (sb.PATH_HISTORY par défaut) en créant la table si besoin
+    """
+    conn = sqlite3.connect(path or sb.PATH_HISTORY)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def history_rows(sport, odds, timestamp):
+    """
+    Lignes (timestamp, sport, match, bookmaker, cotes) des cotes d'un sport
+    """
+    for match, odds_match in odds.items():
+        for bookmaker, odds_site in odds_match["odds"].items():
+            yield timestamp, sport, match, bookmaker, json.dumps(odds_site)
+
+
+def write_history():
+    """
+    Boucle du thread d'écriture : chaque récupération est insérée en une seule transaction
+    """
+    conn, conn_path = None, None
+    while True:
+        path, sport, odds, timestamp = HISTORY_QUEUE.get()
+        try:
+            if conn is None or conn_path != path:
+                if conn is not None:
+                    conn.close()
+                conn, conn_path = connect(path), path
+            with conn:
+                conn.executemany("INSERT INTO odds_history VALUES (?, ?, ?, ?, ?)",
+                                 history_rows(sport, odds, timestamp))
+        except Exception:
+            print(traceback.format_exc(), file=sys.stderr)
+        finally:
+            HISTORY_QUEUE.task_done()
+
+
+def record_odds(sport, odds, timestamp=None, path=None):
+    """
+    Ajoute les cotes d'un sport à l'historique. L'écriture est faite par un thread dédié afin de
+    ne pas ralentir la récupération des cotes
+    """
+    global WRITER
+    with WRITER_LOCK:
+        if WRITER is None:
+            WRITER = threading.Thread(target=write_history, daemon=True)
+            WRITER.start()
+            atexit.register(flush_history)
+    timestamp = date_to_epoch(timestamp or datetime.datetime.now())
+    HISTORY_QUEUE.put((path or sb.PATH_HISTORY, sport, copy.copy(odds), timestamp))
+
+
+def flush_history():
+    """
+    Attend la fin des écritures en cours
+    """
+    HISTORY_QUEUE.join()
+
+
+def get_odds_history(match, sport="football", site=None, path=None):
+    """
+    Évolution des cotes d'un match : {bookmaker: [(date, cotes)]} par date croissante
+    """
+    flush_history()
+    query = "SELECT timestamp, bookmaker, odds FROM odds_history WHERE sport = ? AND match = ?"
+    parameters = [sport, match]
+    if site:
+        query += " AND bookmaker = ?"
+        parameters.append(site)
+    history = {}
+    conn = connect(path)
+    try:
+        for timestamp, bookmaker, odds in conn.execute(query + " ORDER BY timestamp, rowid", parameters):
+            history.setdefault(bookmaker, []).append((epoch_to_date(timestamp), json.loads(odds)))
+    finally:
+        conn.close()
+    return history
+
+
+def get_surebets_history(datetime_min, datetime_max, sport="football", trj_min=1, path=None):
+    """
+    Surebets relevées entre datetime_min et datetime_max : liste de (date, match, TRJ,
+    bookmakers, cotes) par date croissante
+    """
+    flush_history()
+    surebets = []
+    conn = connect(path)
+    try:
+        rows = conn.execute("SELECT timestamp, match, bookmaker, odds FROM odds_history "
+                            "WHERE sport = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp, match, rowid",
+                            (sport, date_to_epoch(datetime_min), date_to_epoch(datetime_max)))
+        for (timestamp, match), rows_match in itertools.groupby(rows, lambda row: row[:2]):
+            odds_match = {"odds": {bookmaker: json.loads(odds) for _, _, bookmaker, odds in rows_match}}
+            trj, bookmakers, best_odds = trj_match(odds_match)
+            if trj >= trj_min:
+                surebets.append((epoch_to_date(timestamp), match, trj, bookmakers, best_odds))
+    finally:
+        conn.close()
+    return surebets
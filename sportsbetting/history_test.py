@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tests de l'historique des cotes
+"""
+
+import datetime
+import os
+import tempfile
+
+import sportsbetting as sb
+from sportsbetting.auxiliary_functions import load_odds, trj_match
+from sportsbetting.history_functions import get_odds_history, get_surebets_history, record_odds
+from sportsbetting.odds_store import OddsStore
+
+PATH_DATA_TEST = os.path.dirname(sb.__file__) + "/resources/data_test.json"
+
+
+def test_history():
+    odds = OddsStore(load_odds(PATH_DATA_TEST)["football"])
+    match = next(iter(odds))
+    dates = [datetime.datetime(2020, 11, 21, hour) for hour in [10, 11, 12]]
+    with tempfile.TemporaryDirectory() as directory:
+        path = directory + "/history.db"
+        record_odds("football", odds, dates[0], path)
+        odds[match]["odds"]["betclic"] = [100] * len(odds[match]["odds"]["winamax"])
+        record_odds("football", odds, dates[1], path)
+        del odds[match]
+        record_odds("football", odds, dates[2], path)
+        history = get_odds_history(match, "football", path=path)
+        assert [date for date, _ in history["winamax"]] == dates[:2]
+        assert [odds_site[0] for _, odds_site in history["betclic"]][-1] == 100
+        surebets = get_surebets_history(dates[1], dates[2], "football", path=path)
+        assert [(date, name) for date, name, *_ in surebets if name == match] == [(dates[1], match)]
+        assert ([name for date, name, *_ in surebets if date == dates[2]]
+                == sorted(name for name in odds if trj_match(odds[name])[0] >= 1))
@@ -0,0 +1,303 @@
+"""
+Couche d'accès HTTP partagée par les bookmakers : sessions persistantes par hôte, limites de
+concurrence et de débit par site, timeouts et nouvelles tentatives, et cache sur le disque des
+pages déjà analysées
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import os
+import pickle
+import threading
+import time
+import urllib.parse
+
+import requests
+import requests.adapters
+
+import sportsbetting as sb
+from sportsbetting.odds_store import atomic_write
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Nombre maximal de pages en cache et durée (en secondes) pendant laquelle le résultat de
+# l'analyse d'une page inchangée est réutilisé
+CACHE_MAX_ENTRIES = 512
+CACHE_MAX_AGE = 3600
+
+# Nombre maximal de requêtes simultanées et nombre maximal de requêtes par seconde
+DEFAULT_SITE_LIMITS = {"concurrency": 4, "rate": None}
+SITE_LIMITS = {
+    "winamax": {"concurrency": 2, "rate": 2},
+    "betfair": {"concurrency": 2, "rate": None},
+    "netbet": {"concurrency": 2, "rate": 4},
+    "pmu": {"concurrency": 3, "rate": 5},
+    "zebet": {"concurrency": 3, "rate": 5},
+    "joa": {"concurrency": 1, "rate": None},
+}
+
+
+class SiteLimiter:
+    """
+    Limite le nombre de requêtes simultanées et le débit des requêtes vers un site
+    """
+
+    def __init__(self, concurrency, rate=None):
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.interval = 1 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_time = 0
+
+    def wait(self):
+        """
+        Attend que la prochaine requête puisse être envoyée sans dépasser le débit autorisé
+        """
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        time.sleep(start - now)
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        self.wait()
+        return self
+
+    def __exit__(self, *args):
+        self.semaphore.release()
+
+
+class HttpClient:
+    """
+    Client HTTP partagé réutilisant une session (et donc les connexions keep-alive) par hôte
+    """
+
+    def __init__(self, site_limits=None, max_workers=16):
+        self.site_limits = SITE_LIMITS if site_limits is None else site_limits
+        self.sessions = {}
+        self.limiters = {}
+        self.lock = threading.Lock()
+        self.max_workers = max_workers
+        self.executor = None
+
+    def get_session(self, url):
+        """
+        Retourne la session associée à l'hôte d'une url
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            if host not in self.sessions:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                        pool_maxsize=self.max_workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[host] = session
+            return self.sessions[host]
+
+    def get_limiter(self, site):
+        """
+        Retourne le limiteur de concurrence et de débit d'un site
+        """
+        with self.lock:
+            if site not in self.limiters:
+                limits = dict(DEFAULT_SITE_LIMITS, **self.site_limits.get(site, {}))
+                self.limiters[site] = SiteLimiter(limits["concurrency"], limits["rate"])
+            return self.limiters[site]
+
+    def get(self, url, site=None, headers=None, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+            backoff=DEFAULT_BACKOFF, raise_for_status=True, **kwargs):
+        """
+        Requête GET avec nouvelles tentatives (délai exponentiel) en cas d'erreur réseau ou de
+        réponse 429/5xx. Lève une requests.exceptions.RequestException en cas d'échec
+        """
+        session = self.get_session(url)
+        limiter = self.get_limiter(site)
+        for attempt in range(retries + 1):
+            delay = backoff * 2 ** attempt
+            try:
+                with limiter:
+                    response = session.get(url, headers=headers, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS or attempt == retries:
+                    if raise_for_status:
+                        response.raise_for_status()
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+            time.sleep(delay)
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(self.max_workers)
+            return self.executor
+
+    async def fetch(self, url, site=None, **kwargs):
+        """
+        Version asynchrone de get
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.get_executor(),
+                                          functools.partial(self.get, url, site, **kwargs))
+
+    async def fetch_all(self, urls, site=None, return_exceptions=False, **kwargs):
+        """
+        Récupère plusieurs urls simultanément (dans la limite fixée pour le site) et retourne les
+        réponses dans l'ordre des urls. Si return_exceptions vaut True, les échecs sont remplacés
+        par l'exception levée au lieu d'être propagés
+        """
+        return await asyncio.gather(*(self.fetch(url, site, **kwargs) for url in urls),
+                                    return_exceptions=return_exceptions)
+
+    def get_all(self, urls, site=None, return_exceptions=False, **kwargs):
+        """
+        Version synchrone de fetch_all
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.fetch_all(urls, site, return_exceptions, **kwargs))
+        finally:
+            loop.close()
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+
+
+CLIENT = HttpClient()
+
+
+def get(url, site=None, **kwargs):
+    """
+    Requête GET via le client partagé
+    """
+    return CLIENT.get(url, site, **kwargs)
+
+
+def get_all(urls, site=None, return_exceptions=False, **kwargs):
+    """
+    Requêtes GET simultanées via le client partagé
+    """
+    return CLIENT.get_all(urls, site, return_exceptions, **kwargs)
+
+
+class ResponseCache:
+    """
+    Cache sur le disque (un fichier par url et fonction d'analyse dans path) des réponses déjà
+    analysées : ETag et Last-Modified de la réponse, empreinte de son contenu et résultat de son
+    analyse. Au-delà de max_entries pages, les moins récemment utilisées sont supprimées
+    """
+
+    def __init__(self, path=None, max_entries=CACHE_MAX_ENTRIES, max_age=CACHE_MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def get_path(self):
+        return self.path or sb.PATH_HTTP_CACHE
+
+    def get_file(self, key):
+        return os.path.join(self.get_path(), hashlib.sha1(key.encode()).hexdigest() + ".pickle")
+
+    def load(self):
+        """
+        Fichiers du cache, du moins récemment utilisé au plus récent
+        """
+        os.makedirs(self.get_path(), exist_ok=True)
+        files = [os.path.join(self.get_path(), name) for name in os.listdir(self.get_path())
+                 if name.endswith(".pickle")]
+        self.entries = collections.OrderedDict((file, None) for file in sorted(files, key=os.path.getmtime))
+
+    def get(self, key):
+        """
+        Entrée du cache (None si absente ou illisible)
+        """
+        file = self.get_file(key)
+        with self.lock:
+            if self.entries is None:
+                self.load()
+            if file not in self.entries:
+                return None
+            self.entries.move_to_end(file)
+        try:
+            with open(file, "rb") as cache_file:
+                entry = pickle.load(cache_file)
+            os.utime(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        return entry if entry.get("key") == key else None
+
+    def put(self, key, entry):
+        file = self.get_file(key)
+        with self.lock:
+            if self.entries is None:
+                self.load()
+            with atomic_write(file, "wb") as cache_file:
+                pickle.dump(dict(entry, key=key), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.entries[file] = None
+            self.entries.move_to_end(file)
+            while len(self.entries) > self.max_entries:
+                old_file, _ = self.entries.popitem(last=False)
+                try:
+                    os.remove(old_file)
+                except OSError:
+                    pass
+
+    def get_parsed(self, url, site, parse, **kwargs):
+        """
+        Résultat de parse(response) pour la page url. Si la page n'a pas changé depuis la
+        dernière analyse par la même fonction (réponse 304 à une requête conditionnelle ou contenu
+        identique), le résultat précédent est retourné sans nouvelle analyse
+        """
+        parse_function = getattr(parse, "func", parse)
+        key = " ".join([url, parse_function.__module__ + "." + parse_function.__qualname__,
+                        repr(getattr(parse, "args", ()))])
+        entry = self.get(key)
+        if entry and time.time() - entry["time"] > self.max_age:
+            entry = None
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = CLIENT.get(url, site, headers=headers, **kwargs)
+        if entry and response.status_code == 304:
+            return entry["parsed"]
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if entry and entry["hash"] == content_hash:
+            parsed = entry["parsed"]
+        else:
+            parsed = parse(response)
+        self.put(key, {"time": entry["time"] if entry and parsed is entry["parsed"] else time.time(),
+                       "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+                       "hash": content_hash, "parsed": parsed})
+        return parsed
+
+
+CACHE = ResponseCache()
+
+
+def get_parsed(url, site, parse, **kwargs):
+    """
+    Page url analysée par parse via le cache partagé (voir ResponseCache.get_parsed)
+    """
+    return CACHE.get_parsed(url, site, parse, **kwargs)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Tests de la couche HTTP partagée, sur un serveur local servant des pages enregistrées
+"""
+
+import collections
+import datetime
+import http.server
+import json
+import socketserver
+import threading
+import time
+import urllib.parse
+
+import pytest
+import requests
+
+from sportsbetting import http_functions
+from sportsbetting.bookmakers import betfair
+from sportsbetting.bookmakers.winamax import parse_winamax
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+def get_winamax_page():
+    """
+    Page winamax enregistrée (réduite à un match)
+    """
+    match_start = int((datetime.datetime.today() + datetime.timedelta(days=2)).timestamp())
+    state = {
+        "matches": {"1": {"matchId": 1, "title": "Marseille - Paris SG", "tournamentId": 4,
+                          "competitor1Id": 10, "sportId": 1, "matchStart": match_start,
+                          "mainBetId": 100}},
+        "bets": {"100": {"outcomes": [1001, 1002, 1003]}},
+        "odds": {"1001": 2.9, "1002": 3.3, "1003": 2.35},
+        "tournaments": {"4": {"tournamentName": "Ligue 1"}}
+    }
+    return ("<html><body><script>var PRELOADED_STATE = {};var BETTING_CONFIGURATION = {{}};"
+            "</script></body></html>".format(json.dumps(state)))
+
+
+def get_betfair_response(path):
+    """
+    Réponse de l'API betfair pour les événements ou marchés demandés (deux marchés par événement,
+    l'événement n ayant les marchés 2n et 2n+1, sauf à partir de 100 où le marché lay n'est pas
+    encore ouvert). Plus de 10 événements par requête sont refusés
+    """
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(path).query)
+    if "eventIds" in query:
+        event_ids = query["eventIds"][0].split(",")
+        if len(event_ids) > 10:
+            return None
+        markets = {event_id: [str(2 * int(event_id)), str(2 * int(event_id) + 1)][:1 if int(event_id) >= 100 else 2]
+                   for event_id in event_ids}
+    else:
+        markets = {}
+        for market_id in query["marketIds"][0].split(","):
+            markets.setdefault(str(int(market_id) // 2), []).append(market_id)
+    event_nodes = []
+    for event_id, market_ids in markets.items():
+        market_nodes = []
+        for market_id in market_ids:
+            lay = int(market_id) % 2
+            runners = [{"description": {"runnerName": name},
+                        "exchange": {"availableToBack": [{"price": 2 + int(event_id) / 100}],
+                                     "availableToLay": [{"price": 2.5}]}}
+                       for name in (["Home or Away", "A or Draw", "B or Draw"] if lay else ["A", "Match Nul", "B"])]
+            market_nodes.append({"marketId": market_id, "runners": runners,
+                                 "description": {"marketType": "DOUBLE_CHANCE" if lay else "MATCH_ODDS"}})
+        event_nodes.append({"eventId": int(event_id), "marketNodes": market_nodes,
+                            "event": {"eventName": "A{0} v B{0}".format(event_id),
+                                      "openDate": "2030-01-01T18:00:00.000Z"}})
+    return json.dumps({"eventTypes": [{"eventNodes": event_nodes}]})
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body, status=200):
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.clients.add(self.client_address)
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+        if self.path.startswith("/www/sports/exchange/readonly/v1/"):
+            body = get_betfair_response(self.path)
+            self.send_body(body or "too many events", 200 if body else 400)
+        elif self.path.startswith("/paris-sportifs/sports/"):
+            self.send_body(get_winamax_page())
+        elif self.path.startswith("/etag"):
+            if self.headers.get("If-None-Match") == server.etag:
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                body = server.etag.encode("utf-8")
+                self.send_response(200)
+                self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        elif self.path == "/flaky":
+            self.send_body("ok" if hits > 2 else "unavailable", 200 if hits > 2 else 503)
+        elif self.path == "/timeout":
+            time.sleep(1)
+            self.send_body("late")
+        elif self.path.startswith("/slow"):
+            with server.lock:
+                server.running += 1
+                server.max_running = max(server.max_running, server.running)
+            time.sleep(0.1)
+            with server.lock:
+                server.running -= 1
+            self.send_body(self.path)
+        else:
+            self.send_body(self.path)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.clients = set()
+    httpd.hits = {}
+    httpd.running = 0
+    httpd.max_running = 0
+    httpd.etag = "v1"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = "http://127.0.0.1:{}".format(httpd.server_address[1])
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_keep_alive(server):
+    client = http_functions.HttpClient()
+    for i in range(5):
+        assert client.get(server.url + "/page/" + str(i)).text == "/page/" + str(i)
+    assert len(server.clients) == 1
+    client.close()
+
+
+def test_retries(server):
+    client = http_functions.HttpClient()
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get(server.url + "/flaky", retries=0)
+    assert client.get(server.url + "/flaky", retries=2, backoff=0.01).text == "ok"
+    assert server.hits["/flaky"] == 3
+    client.close()
+
+
+def test_timeout(server):
+    client = http_functions.HttpClient()
+    with pytest.raises(requests.exceptions.Timeout):
+        client.get(server.url + "/timeout", timeout=0.2, retries=0)
+    client.close()
+
+
+def test_site_concurrency(server):
+    client = http_functions.HttpClient({"test": {"concurrency": 2}})
+    urls = [server.url + "/slow/" + str(i) for i in range(6)]
+    responses = client.get_all(urls, "test")
+    assert [response.text for response in responses] == ["/slow/" + str(i) for i in range(6)]
+    assert server.max_running == 2
+    client.close()
+
+
+def test_site_rate(server):
+    client = http_functions.HttpClient({"test": {"concurrency": 4, "rate": 20}})
+    start = time.monotonic()
+    client.get_all([server.url + "/page/" + str(i) for i in range(5)], "test")
+    assert time.monotonic() - start >= 0.2
+    client.close()
+
+
+def test_get_all_exceptions(server):
+    client = http_functions.HttpClient()
+    responses = client.get_all([server.url + "/page/1", server.url + "/flaky"], retries=0,
+                               return_exceptions=True)
+    assert responses[0].text == "/page/1"
+    assert isinstance(responses[1], requests.exceptions.HTTPError)
+    client.close()
+
+
+def test_response_cache(server, tmp_path):
+    cache = http_functions.ResponseCache(str(tmp_path), max_entries=2)
+    parsed = []
+
+    def parse(response):
+        parsed.append(response.text)
+        return {"page": response.text}
+    assert cache.get_parsed(server.url + "/etag", "test", parse) == {"page": "v1"}
+    assert cache.get_parsed(server.url + "/etag", "test", parse) == {"page": "v1"}
+    assert cache.get_parsed(server.url + "/page/1", "test", parse) == {"page": "/page/1"}
+    assert cache.get_parsed(server.url + "/page/1", "test", parse) == {"page": "/page/1"}
+    assert parsed == ["v1", "/page/1"] and server.hits["/etag"] == 2
+    server.etag = "v2"
+    assert http_functions.ResponseCache(str(tmp_path)).get_parsed(server.url + "/etag", "test", parse) == {"page": "v2"}
+    assert parsed == ["v1", "/page/1", "v2"]
+    cache.get_parsed(server.url + "/page/2", "test", parse)
+    assert len(list(tmp_path.iterdir())) == 2
+    cache.get_parsed(server.url + "/page/1", "test", parse)
+    assert parsed[-1] == "/page/2"
+    cache.get_parsed(server.url + "/etag", "test", parse)
+    assert parsed[-1] == "v2"
+
+
+def test_parse_winamax_recorded_page(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_functions, "CACHE", http_functions.ResponseCache(str(tmp_path)))
+    odds = parse_winamax(server.url + "/paris-sportifs/sports/1/7/4")
+    assert odds["Marseille - Paris SG"]["odds"] == {"winamax": [2.9, 3.3, 2.35]}
+    assert odds["Marseille - Paris SG"]["competition"] == "Ligue 1"
+
+
+def test_betfair_chunks(server, monkeypatch):
+    def get_all_stub(urls, site, raise_for_status=True):
+        urls = [url.replace("https://ero.betfair.com", server.url) for url in urls]
+        return http_functions.get_all(urls, site, raise_for_status=raise_for_status)
+    monkeypatch.setattr(betfair, "get_all_with_token", get_all_stub)
+    monkeypatch.setattr(betfair, "BACK_LAY_MARKETS", collections.OrderedDict())
+    monkeypatch.setattr(betfair, "MARKETS_PER_REQUEST", 10)
+    event_ids = [str(i) for i in range(1, 24)]
+    odds = betfair.get_odds_from_back_lay_market_ids(betfair.get_back_lay_markets(event_ids))
+    assert len(odds) == 23
+    assert odds["A1 - B1"]["odds"]["betfair"] == [1.98, 1.98, 1.98]
+    assert odds["A1 - B1"]["id"] == {"betfair": "1"}
+    byevent = [path for path in server.hits if "byevent" in path]
+    bymarket = [path for path in server.hits if "bymarket" in path]
+    assert len(byevent) == 7 and len(bymarket) == 5
+    assert odds == betfair.get_odds_from_back_lay_market_ids(betfair.get_back_lay_markets(event_ids))
+    assert len([path for path in server.hits if "byevent" in path]) == 7
+    assert betfair.get_back_lay_markets(["100"]) == [{"back": "200", "lay": None}]
+    assert betfair.get_back_lay_markets(["100"]) == [{"back": "200", "lay": None}]
+    assert [count for path, count in server.hits.items() if "eventIds=100&" in path] == [2]
+    monkeypatch.setattr(betfair, "MAX_BACK_LAY_MARKETS", 20)
+    betfair.get_back_lay_markets(["1"] + [str(i) for i in range(24, 30)])
+    assert len(betfair.BACK_LAY_MARKETS) == 20 and list(betfair.BACK_LAY_MARKETS)[-7] == "1"
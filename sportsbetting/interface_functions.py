@@ -16,15 +16,17 @@ import PySimpleGUI as sg
 import webbrowser
 
 import sportsbetting as sb
-from sportsbetting.auxiliary_functions import get_nb_outcomes, copy_to_clipboard, calculator
+from sportsbetting.auxiliary_functions import get_nb_outcomes, copy_to_clipboard, calculator, get_values
 from sportsbetting.database_functions import get_all_current_competitions, get_all_competitions
 from sportsbetting.user_functions import (best_match_under_conditions, best_match_under_conditions2,
                                           best_match_freebet, best_stakes_match,
                                           best_matches_freebet, best_matches_combine, best_matches_combine3,
                                           best_match_cashback, best_match_stakes_to_bet,
                                           best_match_pari_gagnant, odds_match, best_matches_combine_cashback,
-                                          best_combine_booste, trj_match, best_matches_freebet_one_site, get_values,
-                                          best_matches_freebet2, best_match_defi_rembourse_ou_gagnant, best_combine_booste_progressif)
+                                          best_combine_booste, trj_match, best_matches_freebet_one_site,
+                                          best_matches_freebet2, best_match_defi_rembourse_ou_gagnant, best_combine_booste_progressif,
+                                          get_sports_with_surebet)
+from sportsbetting.odds_index import get_odds_index
 from sportsbetting.performances import get_surebets_players_nba
 from sportsbetting.basic_functions import gain, mises, mises2
 
@@ -724,13 +726,9 @@ def best_combine_reduit_interface(window, values, visible_combi_opt):
 
 
 def find_surebets_interface(window, values):
-    matches = []
     sport = values["SPORT_SUREBETS"][0]
     trj_min = float(values["TRJ_SUREBETS"])/100
-    for match in sb.ODDS[sport]:
-        if trj_match(sb.ODDS[sport][match])[0] >= trj_min:
-            matches.append(match)
-    matches.sort(key=lambda x :trj_match(sb.ODDS[sport][x])[0], reverse=True)
+    matches = get_odds_index(sport).surebets(trj_min)
     window["MATCHES_SUREBETS"].update(matches)
     if not matches:
         window["MESSAGE_SUREBETS"].update("Aucun surebet trouvé")
@@ -738,6 +736,33 @@ def find_surebets_interface(window, values):
         window["MESSAGE_SUREBETS"].update("")
 
 
+def odds_changes_interface(window, values, changes):
+    """
+    :param window: Fenêtre principale PySimpleGUI
+    :param values: Valeurs de la fenêtre principale
+    :param changes: Modifications des cotes (OddsChange) reçues en mode suivi
+    :return: Met à jour l'indicateur de surebet et les listes des surebets et des values affichées
+    """
+    sports_with_surebet = get_sports_with_surebet()
+    if sports_with_surebet:
+        window['SUREBET_PARSING'].update("Surebet disponible ({})".format(", ".join(sports_with_surebet)), text_color="red", visible=sb.BETA)
+    else:
+        window['SUREBET_PARSING'].update("Aucun surebet", text_color="black", visible=sb.BETA)
+    if not values:
+        return
+    sports = {change.sport for change in changes}
+    if values.get("SPORT_SUREBETS") and values["SPORT_SUREBETS"][0] in sports:
+        try:
+            find_surebets_interface(window, values)
+        except ValueError:
+            pass
+    if values.get("SPORT_VALUES") and values["SPORT_VALUES"][0] in sports:
+        try:
+            find_values_interface(window, values)
+        except ValueError:
+            pass
+
+
 def odds_match_surebets_interface(window, values):
     """
     :param window: Fenêtre principale PySimpleGUI
@@ -775,16 +800,12 @@ def odds_match_surebets_interface(window, values):
 
 
 def find_values_interface(window, values):
-    matches = []
     if not (values["SPORT_VALUES"] and values["RATE_VALUES"] and values["TRJ_VALUES"]):
         return
     sport = values["SPORT_VALUES"][0]
     rate_min = float(values["RATE_VALUES"])/100
     trj_min = float(values["TRJ_VALUES"])/100
-    for match in sb.ODDS[sport]:
-        if get_values(sb.ODDS[sport][match], rate_min)[0] >= rate_min and trj_match(sb.ODDS[sport][match])[0] >= trj_min:
-            matches.append(match)
-    matches.sort(key=lambda x :get_values(sb.ODDS[sport][x], rate_min)[0], reverse=True)
+    matches = get_odds_index(sport).values(rate_min, trj_min)
     window["MATCHES_VALUES"].update(matches)
     if not matches:
         window["MESSAGE_VALUES"].update("Aucune value trouvée")
@@ -1044,11 +1065,7 @@ def best_match_miles_interface(window, values):
 def get_best_conversion_rates_freebet(window):
     conversion_rates = {}
     high_conversion_rates = []
-    with open(sb.PATH_FREEBETS, "r") as file:
-        lines = file.readlines()
-        for line in lines:
-            bookmaker, rate = line.split()
-            sb.FREEBETS_RATES[bookmaker] = float(rate)
+    sb.FREEBETS_RATES.update(sb.load_freebets_rates())
     for sport in sb.ODDS:
         if sb.SEEN_SUREBET[sport]:
             continue
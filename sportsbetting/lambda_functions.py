@@ -1,4 +1,8 @@
+import numpy as np
+
 from sportsbetting.basic_functions import gain, gain2
+from sportsbetting.vectorized_functions import (odds_to_check_tensor, diagonal, gain_vectorized,
+                                                gain2_vectorized)
 
 
 def get_best_odds(one_site):
@@ -15,3 +19,27 @@ def get_profit(stake, one_site):
             return gain(odds_to_check, stake) - stake
         return gain2(odds_to_check, i, stake)
     return aux
+
+
+def get_best_odds_vectorized(one_site):
+    def aux(best_odds, odds_site):
+        if one_site:
+            return np.repeat(odds_site[:, None, :], odds_site.shape[-1], axis=1)
+        return odds_to_check_tensor(best_odds, odds_site)
+    return aux
+
+
+def get_profit_vectorized(stake, one_site):
+    def aux(odds_to_check):
+        if one_site:
+            return gain_vectorized(odds_to_check, stake) - stake
+        return gain2_vectorized(odds_to_check, stake)
+    return aux
+
+
+def get_minimum_odd_criteria_vectorized(minimum_odd, one_site):
+    def aux(odds_to_check):
+        if one_site:
+            return np.all(odds_to_check >= minimum_odd, axis=-1)
+        return diagonal(odds_to_check) >= minimum_odd
+    return aux
@@ -1,9 +1,21 @@
 import difflib
+import io
 import os
 import sportsbetting as sb
 import sys
-from sportsbetting.auxiliary_functions import load_odds
-from sportsbetting.user_functions import best_match_under_conditions, best_match_under_conditions2
+from itertools import combinations, permutations
+import numpy as np
+from sportsbetting.auxiliary_functions import (load_odds, best_match_base, cotes_combine_all_sites,
+                                               filter_dict_dates, filter_dict_minimum_odd, best_defined_bets,
+                                               defined_bets)
+from sportsbetting.basic_functions import mises, mises2
+from sportsbetting.lambda_functions import (get_best_odds, get_profit, get_best_odds_vectorized,
+                                            get_profit_vectorized, get_minimum_odd_criteria_vectorized)
+from sportsbetting import user_functions
+from sportsbetting.user_functions import (best_match_under_conditions, best_match_under_conditions2,
+                                          best_matches_combine, best_match_freebet, best_match_cashback,
+                                          best_match_defi_rembourse_ou_gagnant, best_match_gain_cote,
+                                          best_match_pari_gagnant)
 
 def are_identical_files(filename1, filename2):
     lines1 = []
@@ -87,3 +99,96 @@ def test_under_condition_same_site():
         best_match_under_conditions2("pmu", 2.6, 10, date_min="24/11/2020", date_max="29/11/2020")
     sys.stdout = original_stdout
     assert(are_identical_files(expected, reached))
+
+
+def test_vectorized_engine():
+    PATH_DATA_TEST = os.path.dirname(sb.__file__) + "/resources/data_test.json"
+    sb.ODDS = load_odds(PATH_DATA_TEST)
+    original_stdout = sys.stdout
+    outputs = []
+    for vectorized_functions in [(get_best_odds_vectorized(False), get_minimum_odd_criteria_vectorized(1.7, False),
+                                  get_profit_vectorized(10, False)), None]:
+        sys.stdout = io.StringIO()
+        for sport in sb.ODDS:
+            for site in sb.BOOKMAKERS:
+                best_match_base(get_best_odds(False), get_profit(10, False),
+                                lambda odds_to_check, i: odds_to_check[i] >= 1.7,
+                                lambda x, i: mises2(x, 10, i, True), lambda x, i: mises2(x, 10, i, False),
+                                site, sport, vectorized_functions=vectorized_functions)
+        outputs.append(sys.stdout.getvalue())
+        sys.stdout = original_stdout
+    assert outputs[0] == outputs[1]
+
+
+def test_vectorized_modes(monkeypatch):
+    PATH_DATA_TEST = os.path.dirname(sb.__file__) + "/resources/data_test.json"
+    sb.ODDS = load_odds(PATH_DATA_TEST)
+    sites = ["betclic", "winamax", "unibet", "pmu", "parionssport"]
+    modes = [lambda site, sport: best_match_under_conditions(site, 1.7, 10, sport),
+             lambda site, sport: best_match_under_conditions(site, 1.1, 10, sport, one_site=True),
+             lambda site, sport: best_match_freebet(site, 10, sport),
+             lambda site, sport: best_match_cashback(site, 1.7, 10, sport),
+             lambda site, sport: best_match_cashback(site, 1.5, 10, sport, freebet=False, rate_cashback=0.8),
+             lambda site, sport: best_match_defi_rembourse_ou_gagnant(site, 1.7, 10, sport),
+             lambda site, sport: best_match_gain_cote(site, 10, sport),
+             lambda site, sport: best_match_pari_gagnant(site, 1.7, 10, sport)]
+    original_stdout = sys.stdout
+    outputs = []
+    for vectorized in [True, False]:
+        if not vectorized:
+            monkeypatch.setattr(user_functions, "best_match_base",
+                                lambda *args, vectorized_functions=None, **kwargs: best_match_base(*args, **kwargs))
+        sys.stdout = io.StringIO()
+        for mode in modes:
+            for site in sites:
+                for sport in sb.ODDS:
+                    mode(site, sport)
+        outputs.append(sys.stdout.getvalue())
+        sys.stdout = original_stdout
+    assert outputs[0] == outputs[1]
+
+
+def test_best_matches_combine():
+    PATH_DATA_TEST = os.path.dirname(sb.__file__) + "/resources/data_test.json"
+    sb.ODDS = load_odds(PATH_DATA_TEST)
+    original_stdout = sys.stdout
+    for site, minimum_odd, one_site in [("parionssport", 1.7, False), ("pmu", 2.5, False), ("betclic", 1.1, True)]:
+        outputs = []
+        sys.stdout = io.StringIO()
+        best_matches_combine(site, minimum_odd, 10, "football", 2, one_site, date_max="22/11/2020", time_max="23h")
+        outputs.append(sys.stdout.getvalue())
+        sys.stdout = io.StringIO()
+        all_odds = filter_dict_dates(sb.ODDS["football"], date_max="22/11/2020", time_max="23h")
+        all_odds = filter_dict_minimum_odd(all_odds, 1.01, site)
+        sb.ALL_ODDS_COMBINE = {" / ".join(match[0] for match in combine): cotes_combine_all_sites(
+            *[match[1] for match in combine]) for combine in combinations(all_odds.items(), 2)}
+        criteria = lambda odds_to_check, i: ((not one_site and odds_to_check[i] >= minimum_odd)
+                                             or (one_site and all(odd >= minimum_odd for odd in odds_to_check)))
+        result_function = lambda x, i: mises2(x, 10, i, False) if not one_site else mises(x, 10, False)
+        best_match_base(get_best_odds(one_site), get_profit(10, one_site), criteria, None, result_function,
+                        site, "football", combine=True, nb_matches_combine=2, one_site=one_site, combine_opt=True)
+        outputs.append(sys.stdout.getvalue())
+        sys.stdout = original_stdout
+        assert outputs[0] == outputs[1]
+
+
+def test_best_defined_bets():
+    PATH_DATA_TEST = os.path.dirname(sb.__file__) + "/resources/data_test.json"
+    all_odds = filter_dict_dates(load_odds(PATH_DATA_TEST)["football"], date_max="22/11/2020", time_max="16h")
+    stakes = [[10, "winamax", 2], [5, "winamax", 1.5], [7, "winamax", 3]]
+    for combine in list(combinations(all_odds.values(), 2))[:20]:
+        odds_combine = cotes_combine_all_sites(*combine)["odds"]
+        main_sites = [max(odds_combine, key=lambda site: odds_combine[site][i]) for i in range(9)]
+        odds_main = [odds_combine[site][i] for i, site in enumerate(main_sites)]
+        best_profit = -sum(stake[0] for stake in stakes)
+        expected = None
+        for perm in permutations(range(9), len(stakes)):
+            if any(odds_combine[stake[1]][perm[j]] < stake[2] for j, stake in enumerate(stakes)):
+                continue
+            bets = defined_bets(odds_main, odds_combine, main_sites,
+                                [[perm[j], stake[0], stake[1]] for j, stake in enumerate(stakes)])
+            if bets[0] - np.sum(bets[1]) > best_profit:
+                best_profit = bets[0] - np.sum(bets[1])
+                expected = best_profit, bets
+        result = best_defined_bets(odds_main, odds_combine, main_sites, stakes, -sum(stake[0] for stake in stakes))
+        assert repr(result) == repr(expected)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Index des TRJ et des values des matches d'un sport, triés par ordre décroissant.
+L'index est mis à jour à chaque modification des cotes d'un match d'un OddsStore, si bien que
+les surebets et les values se listent sans recalculer les cotes de tous les matches
+"""
+
+import bisect
+import itertools
+import threading
+
+import sportsbetting as sb
+from sportsbetting.auxiliary_functions import get_values, trj_match
+from sportsbetting.odds_store import OddsStore
+
+INDEXES = {}
+# Sérialise les remplacements des cotes d'un sport dans sb.ODDS (parsing complet, suivi des cotes)
+ODDS_LOCK = threading.RLock()
+
+
+class OddsIndex:
+    """
+    TRJ et meilleure value de chaque match de odds, dans deux listes triées de
+    (-valeur, rang, match). Le rang, attribué dans l'ordre de parcours de odds, départage les
+    égalités comme le ferait un tri stable. on_surebet(match) est appelée lorsqu'une modification
+    des cotes fait d'un match une surebet
+    """
+
+    def __init__(self, odds, on_surebet=None):
+        self.odds = odds
+        self.on_surebet = on_surebet
+        self.entries = {}
+        self.counter = itertools.count()
+        self.by_trj = []
+        self.by_value = []
+        for match, odds_match in odds.items():
+            trj, value = self.compute(odds_match)
+            rank = next(self.counter)
+            self.entries[match] = (trj, value, rank)
+            self.by_trj.append((-trj, rank, match))
+            self.by_value.append((-value, rank, match))
+        self.by_trj.sort()
+        self.by_value.sort()
+        if isinstance(odds, OddsStore):
+            odds.listeners.append(self.update)
+
+    def copy(self, odds):
+        """
+        Copie de l'index pour odds, copie des cotes indexées dont elle suit ensuite les
+        modifications (l'index d'origine reste inchangé)
+        """
+        index = OddsIndex.__new__(OddsIndex)
+        index.__dict__.update(self.__dict__)
+        index.odds = odds
+        index.entries = dict(self.entries)
+        index.by_trj = list(self.by_trj)
+        index.by_value = list(self.by_value)
+        if isinstance(odds, OddsStore):
+            odds.listeners.append(index.update)
+        return index
+
+    @staticmethod
+    def compute(odds_match):
+        """
+        TRJ et meilleure value d'un match
+        """
+        return trj_match(odds_match)[0], get_values(odds_match, float("-inf"))[0]
+
+    def update(self, match):
+        """
+        Recalcule le TRJ et la value de match après une modification de ses cotes
+        """
+        entry = self.entries.pop(match, None)
+        if entry:
+            trj, value, rank = entry
+            del self.by_trj[bisect.bisect_left(self.by_trj, (-trj, rank, match))]
+            del self.by_value[bisect.bisect_left(self.by_value, (-value, rank, match))]
+        if match not in self.odds:
+            return
+        rank = entry[2] if entry else next(self.counter)
+        new_trj, new_value = self.compute(self.odds[match])
+        self.entries[match] = (new_trj, new_value, rank)
+        bisect.insort(self.by_trj, (-new_trj, rank, match))
+        bisect.insort(self.by_value, (-new_value, rank, match))
+        if self.on_surebet and new_trj >= 1 and not (entry and entry[0] >= 1):
+            self.on_surebet(match)
+
+    def trj(self, match):
+        return self.entries[match][0]
+
+    def best_trj(self):
+        """
+        Meilleur TRJ parmi les matches indexés (0 si aucun match)
+        """
+        return -self.by_trj[0][0] if self.by_trj else 0
+
+    def best_trj_matches(self, nb_matches):
+        """
+        Les nb_matches matches de meilleur TRJ
+        """
+        return [match for _, _, match in self.by_trj[:nb_matches]]
+
+    def surebets(self, trj_min=1):
+        """
+        Matches dont le TRJ dépasse trj_min, par TRJ décroissant
+        """
+        return [match for _, _, match in itertools.takewhile(lambda x: -x[0] >= trj_min, self.by_trj)]
+
+    def values(self, rate_min, trj_min=0):
+        """
+        Matches dont la value dépasse rate_min et le TRJ trj_min, par value décroissante
+        """
+        return [match for _, _, match in itertools.takewhile(lambda x: -x[0] >= rate_min, self.by_value)
+                if self.entries[match][0] >= trj_min]
+
+
+def get_odds_index(sport):
+    """
+    Index des cotes de sport. L'index d'un OddsStore est conservé et suit ses modifications ;
+    celui d'un dictionnaire de cotes est recalculé à chaque appel
+    """
+    odds = sb.ODDS.get(sport, {})
+    index = INDEXES.get(sport)
+    if index is not None and index.odds is odds:
+        return index
+    index = OddsIndex(odds, lambda match: sb.SEEN_SUREBET.__setitem__(sport, False))
+    if isinstance(odds, OddsStore):
+        INDEXES[sport] = index
+    else:
+        INDEXES.pop(sport, None)
+    return index
+
+
+def publish_odds(sport, odds, index):
+    """
+    Remplace les cotes de sport par odds, dont index est l'index. Les lecteurs ayant obtenu
+    l'ancien OddsStore continuent de travailler sur des cotes cohérentes
+    """
+    sb.ODDS[sport] = odds
+    INDEXES[sport] = index
@@ -0,0 +1,657 @@
+"""
+Stockage compact des cotes d'un sport : noms de matches et de bookmakers convertis en entiers,
+cotes dans un tableau numpy (matches × bookmakers × issues) accompagné d'un masque de présence
+et dates en microsecondes depuis l'epoch (int64).
+Un OddsStore se manipule comme le dictionnaire {match: {"odds": {site: [cotes]}, "date", "id",
+"competition"}} qu'il remplace, tandis que les moteurs vectorisés travaillent directement sur les
+tableaux. Les tableaux de plusieurs sports se sauvegardent dans un même fichier .npz, chargé
+sport par sport
+"""
+
+import collections.abc
+import contextlib
+import copy
+import datetime
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+
+EPOCH = datetime.datetime(1970, 1, 1)
+NO_DATE = np.iinfo(np.int64).min
+NO_COMPETITION = -1
+MISSING = -2
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def date_to_epoch(date):
+    """
+    Convertit une date en microsecondes depuis l'epoch (NO_DATE si la date n'est pas définie)
+    """
+    if not isinstance(date, datetime.datetime):
+        return NO_DATE
+    if date.tzinfo:
+        date = date.astimezone().replace(tzinfo=None)
+    return (date - EPOCH) // MICROSECOND
+
+
+def epoch_to_date(epoch):
+    """
+    Réciproque de date_to_epoch
+    """
+    if epoch == NO_DATE:
+        return None
+    return EPOCH + datetime.timedelta(microseconds=int(epoch))
+
+
+class OddsStore(collections.abc.MutableMapping):
+    """
+    Cotes d'un sport stockées dans des tableaux numpy. Les cotes d'un match sont exposées par un
+    MatchOdds (et celles-ci par un SiteOdds) dont les modifications sont répercutées dans le
+    stockage. Comme pour un dictionnaire, les bookmakers d'un match sont parcourus dans leur
+    ordre d'insertion. Chaque fonction de listeners est appelée avec le nom du match dont les
+    cotes viennent d'être modifiées (ou supprimées)
+    """
+
+    def __init__(self, odds=None, nb_outcomes=3, capacity=64):
+        self.match_ids = {}
+        self.match_names = []
+        self.bookmaker_ids = {}
+        self.bookmakers = []
+        self.competition_ids = {}
+        self.competitions = []
+        self.odds = np.full((capacity, 0, nb_outcomes), np.nan)
+        self.mask = np.zeros((capacity, 0), dtype=bool)
+        self.sizes = np.zeros((capacity, 0), dtype=np.int8)
+        # Bits des issues dont la cote a été fournie sous forme d'entier (restituée telle quelle)
+        self.integers = np.zeros((capacity, 0), dtype=np.uint32)
+        # Ordre d'insertion des bookmakers de chaque match
+        self.ranks = np.zeros((capacity, 0), dtype=np.int16)
+        self.dates = np.full(capacity, NO_DATE, dtype=np.int64)
+        self.competition_rows = np.full(capacity, -1, dtype=np.int32)
+        self.ids = []
+        self.extras = {}
+        self.nb_rows = 0
+        self.listeners = []
+        if odds:
+            self.update(odds)
+
+    def __getitem__(self, match):
+        if match not in self.match_ids:
+            raise KeyError(match)
+        return MatchOdds(self, match)
+
+    def __setitem__(self, match, odds_match):
+        row = self.match_ids.get(match)
+        if row is None:
+            row = self.add_row(match)
+        else:
+            self.mask[row] = False
+        self.set_site_odds_all(row, odds_match.get("odds") or {})
+        self.dates[row] = date_to_epoch(odds_match.get("date"))
+        if "competition" in odds_match:
+            self.set_competition(row, odds_match["competition"])
+        else:
+            self.competition_rows[row] = MISSING
+        self.ids[row] = dict(odds_match["id"] or {}) if "id" in odds_match else None
+        extras = {key: value for key, value in odds_match.items()
+                  if key not in MatchOdds.FIELDS}
+        if extras:
+            self.extras[row] = extras
+        else:
+            self.extras.pop(row, None)
+        self.odds_changed(match)
+
+    def __delitem__(self, match):
+        row = self.match_ids.pop(match)
+        self.match_names[row] = None
+        self.mask[row] = False
+        self.ids[row] = None
+        self.extras.pop(row, None)
+        self.odds_changed(match)
+
+    def __iter__(self):
+        return iter(self.match_ids)
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def __contains__(self, match):
+        return match in self.match_ids
+
+    def __repr__(self):
+        return "OddsStore({!r})".format(self.to_dict())
+
+    def __copy__(self):
+        return self.select(self.rows())
+
+    def __deepcopy__(self, memo):
+        new_store = self.select(self.rows())
+        new_store.ids = copy.deepcopy(new_store.ids, memo)
+        new_store.extras = copy.deepcopy(new_store.extras, memo)
+        return new_store
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["listeners"] = []
+        return state
+
+    def odds_changed(self, match):
+        """
+        Prévient les listeners d'une modification des cotes de match
+        """
+        for listener in self.listeners:
+            listener(match)
+
+    def add_row(self, match):
+        """
+        Ajoute une ligne (vide) pour un nouveau match
+        """
+        if self.nb_rows == len(self.dates):
+            if 2 * len(self.match_ids) <= self.nb_rows:
+                self.compact()
+            if self.nb_rows == len(self.dates):
+                self.resize(max(2 * self.nb_rows, 64))
+        row = self.nb_rows
+        self.nb_rows += 1
+        self.match_ids[match] = row
+        self.match_names.append(match)
+        self.ids.append(None)
+        return row
+
+    def resize(self, capacity):
+        """
+        Change le nombre de lignes allouées
+        """
+        nb_rows = min(capacity, self.nb_rows)
+        odds = np.full((capacity,) + self.odds.shape[1:], np.nan)
+        odds[:nb_rows] = self.odds[:nb_rows]
+        mask = np.zeros((capacity, self.mask.shape[1]), dtype=bool)
+        mask[:nb_rows] = self.mask[:nb_rows]
+        sizes = np.zeros((capacity, self.sizes.shape[1]), dtype=np.int8)
+        sizes[:nb_rows] = self.sizes[:nb_rows]
+        integers = np.zeros((capacity, self.integers.shape[1]), dtype=np.uint32)
+        integers[:nb_rows] = self.integers[:nb_rows]
+        ranks = np.zeros((capacity, self.ranks.shape[1]), dtype=np.int16)
+        ranks[:nb_rows] = self.ranks[:nb_rows]
+        dates = np.full(capacity, NO_DATE, dtype=np.int64)
+        dates[:nb_rows] = self.dates[:nb_rows]
+        competition_rows = np.full(capacity, -1, dtype=np.int32)
+        competition_rows[:nb_rows] = self.competition_rows[:nb_rows]
+        self.odds, self.mask, self.sizes, self.integers = odds, mask, sizes, integers
+        self.ranks = ranks
+        self.dates, self.competition_rows = dates, competition_rows
+
+    def compact(self):
+        """
+        Supprime les lignes des matches effacés
+        """
+        rows = self.rows()
+        self.odds[:len(rows)] = self.odds[rows]
+        self.mask[:len(rows)] = self.mask[rows]
+        self.sizes[:len(rows)] = self.sizes[rows]
+        self.integers[:len(rows)] = self.integers[rows]
+        self.ranks[:len(rows)] = self.ranks[rows]
+        self.dates[:len(rows)] = self.dates[rows]
+        self.competition_rows[:len(rows)] = self.competition_rows[rows]
+        self.mask[len(rows):] = False
+        self.ids = [self.ids[row] for row in rows]
+        self.extras = {new_row: self.extras[row] for new_row, row in enumerate(rows)
+                       if row in self.extras}
+        self.match_names = list(self.match_ids)
+        self.match_ids = {match: row for row, match in enumerate(self.match_names)}
+        self.nb_rows = len(rows)
+
+    def get_bookmaker_id(self, site):
+        """
+        Retourne l'identifiant d'un bookmaker, en ajoutant une colonne s'il est inconnu
+        """
+        j = self.bookmaker_ids.get(site)
+        if j is None:
+            j = len(self.bookmakers)
+            self.bookmaker_ids[site] = j
+            self.bookmakers.append(site)
+            capacity, nb_outcomes = len(self.dates), self.odds.shape[2]
+            self.odds = np.concatenate([self.odds, np.full((capacity, 1, nb_outcomes), np.nan)], axis=1)
+            self.mask = np.concatenate([self.mask, np.zeros((capacity, 1), dtype=bool)], axis=1)
+            self.sizes = np.concatenate([self.sizes, np.zeros((capacity, 1), dtype=np.int8)], axis=1)
+            self.integers = np.concatenate([self.integers, np.zeros((capacity, 1), dtype=np.uint32)], axis=1)
+            self.ranks = np.concatenate([self.ranks, np.zeros((capacity, 1), dtype=np.int16)], axis=1)
+        return j
+
+    def set_site_odds_all(self, row, odds):
+        for site, odds_site in odds.items():
+            self.set_site_odds(row, site, odds_site)
+
+    def set_site_odds(self, row, site, odds_site):
+        """
+        Enregistre les cotes d'un bookmaker pour un match
+        """
+        j = self.get_bookmaker_id(site)
+        if len(odds_site) > self.odds.shape[2]:
+            extra_outcomes = len(odds_site) - self.odds.shape[2]
+            self.odds = np.concatenate([self.odds, np.full(self.odds.shape[:2] + (extra_outcomes,), np.nan)],
+                                       axis=2)
+        if not self.mask[row, j]:
+            present = self.mask[row]
+            self.ranks[row, j] = self.ranks[row, present].max() + 1 if present.any() else 0
+        self.odds[row, j] = np.nan
+        self.odds[row, j, :len(odds_site)] = odds_site
+        self.sizes[row, j] = len(odds_site)
+        self.integers[row, j] = sum(1 << i for i, odd in enumerate(odds_site[:32]) if type(odd) is int)
+        self.mask[row, j] = True
+
+    def set_competition(self, row, competition):
+        if competition is None:
+            self.competition_rows[row] = NO_COMPETITION
+            return
+        if competition not in self.competition_ids:
+            self.competition_ids[competition] = len(self.competitions)
+            self.competitions.append(competition)
+        self.competition_rows[row] = self.competition_ids[competition]
+
+    def rows(self):
+        """
+        Lignes des matches, dans l'ordre d'insertion
+        """
+        return np.fromiter(self.match_ids.values(), dtype=np.intp, count=len(self.match_ids))
+
+    def select(self, rows):
+        """
+        Nouveau stockage limité aux lignes rows (les identifiants des matches sont partagés)
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        new_store = OddsStore(nb_outcomes=self.odds.shape[2], capacity=max(len(rows), 1))
+        new_store.bookmaker_ids = dict(self.bookmaker_ids)
+        new_store.bookmakers = list(self.bookmakers)
+        new_store.competition_ids = dict(self.competition_ids)
+        new_store.competitions = list(self.competitions)
+        new_store.odds = self.odds[rows]
+        new_store.mask = self.mask[rows]
+        new_store.sizes = self.sizes[rows]
+        new_store.integers = self.integers[rows]
+        new_store.ranks = self.ranks[rows]
+        new_store.dates = self.dates[rows]
+        new_store.competition_rows = self.competition_rows[rows]
+        new_store.match_names = [self.match_names[row] for row in rows]
+        new_store.match_ids = {match: row for row, match in enumerate(new_store.match_names)}
+        new_store.ids = [self.ids[row] for row in rows]
+        new_store.extras = {new_row: self.extras[row] for new_row, row in enumerate(rows)
+                            if row in self.extras}
+        new_store.nb_rows = len(rows)
+        if new_store.nb_rows == 0:
+            new_store.resize(64)
+        return new_store
+
+    def filter_dates(self, datetime_min=None, datetime_max=None):
+        """
+        Nouveau stockage limité aux matches compris entre deux dates
+        """
+        rows = self.rows()
+        if not (datetime_min or datetime_max):
+            return self.select(rows)
+        dates = self.dates[rows]
+        keep = dates != NO_DATE
+        if datetime_min:
+            keep &= dates >= date_to_epoch(datetime_min)
+        if datetime_max:
+            keep &= dates <= date_to_epoch(datetime_max)
+        return self.select(rows[keep])
+
+    def filter_minimum_odd(self, minimum_odd, site):
+        """
+        Nouveau stockage limité aux matches dont toutes les cotes sur site dépassent minimum_odd
+        """
+        rows = self.rows()
+        j_site = self.bookmaker_ids.get(site)
+        if j_site is None:
+            return self.select(rows[:0])
+        rows = rows[self.mask[rows, j_site]]
+        outcomes = np.arange(self.odds.shape[2]) < self.sizes[rows, j_site][:, None]
+        keep = np.all(~outcomes | (self.odds[rows, j_site] >= minimum_odd), axis=1)
+        return self.select(rows[keep])
+
+    def pack(self, site, n):
+        """
+        Équivalent de vectorized_functions.pack_odds calculé directement sur les tableaux
+        """
+        j_site = self.bookmaker_ids.get(site)
+        rows = self.rows()
+        if j_site is not None:
+            rows = rows[self.mask[rows, j_site]]
+        else:
+            rows = rows[:0]
+        mask = self.mask[rows]
+        columns = [j for j in np.flatnonzero(mask.any(axis=0))]
+        columns.sort(key=lambda j: self.bookmakers[j])
+        bookmakers = [self.bookmakers[j] for j in columns]
+        valid = mask[:, columns] & (self.sizes[rows][:, columns] >= n)
+        # Rang du bookmaker parmi les bookmakers du match, dans l'ordre d'insertion
+        insertion_ranks = self.ranks[rows]
+        positions = ((insertion_ranks[:, :, None] > insertion_ranks[:, None, :])
+                     & mask[:, None, :]).sum(axis=2)
+        ranks = np.where(valid, positions[:, columns], len(columns))
+        odds = np.ones((len(rows), len(columns), n))
+        nb_outcomes = min(n, self.odds.shape[2])
+        odds[:, :, :nb_outcomes] = np.where(valid[:, :, None], self.odds[rows][:, columns, :nb_outcomes], 1)
+        matches = [self.match_names[row] for row in rows]
+        return matches, bookmakers, odds, valid, ranks
+
+    def to_dict(self):
+        """
+        Conversion en dictionnaire de cotes classique
+        """
+        return {match: MatchOdds(self, match).to_dict() for match in self.match_ids}
+
+    def to_arrays(self):
+        """
+        Tableaux des matches présents, les noms étant stockés dans des tables de chaînes et les
+        identifiants et champs supplémentaires en JSON
+        """
+        rows = self.rows()
+        return {
+            "odds": self.odds[rows], "mask": self.mask[rows], "sizes": self.sizes[rows],
+            "integers": self.integers[rows], "ranks": self.ranks[rows], "dates": self.dates[rows],
+            "competition_rows": self.competition_rows[rows],
+            "match_names": np.array([self.match_names[row] for row in rows], dtype=str),
+            "bookmakers": np.array(self.bookmakers, dtype=str),
+            "competitions": np.array(self.competitions, dtype=str),
+            "json": np.array(json.dumps({
+                "ids": [self.ids[row] for row in rows],
+                "extras": [self.extras.get(row) for row in rows]
+            }))
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Réciproque de to_arrays
+        """
+        store = cls(nb_outcomes=arrays["odds"].shape[2], capacity=0)
+        for key in ["odds", "mask", "sizes", "integers", "ranks", "dates", "competition_rows"]:
+            setattr(store, key, np.array(arrays[key]))
+        fields = json.loads(str(arrays["json"]))
+        store.match_names = arrays["match_names"].tolist()
+        store.match_ids = {match: row for row, match in enumerate(store.match_names)}
+        store.bookmakers = arrays["bookmakers"].tolist()
+        store.bookmaker_ids = {site: j for j, site in enumerate(store.bookmakers)}
+        store.competitions = arrays["competitions"].tolist()
+        store.competition_ids = {competition: i for i, competition in enumerate(store.competitions)}
+        store.ids = fields["ids"]
+        store.extras = {row: extras for row, extras in enumerate(fields["extras"]) if extras}
+        store.nb_rows = len(store.match_names)
+        if store.nb_rows == 0:
+            store.resize(64)
+        return store
+
+
+class MatchOdds(collections.abc.MutableMapping):
+    """
+    Vue (modifiable) sur les informations d'un match d'un OddsStore. La ligne du match est
+    recherchée à chaque accès, la vue restant donc valide après un compactage du stockage
+    """
+    FIELDS = ("odds", "id", "date", "competition")
+
+    def __init__(self, store, match):
+        self.store = store
+        self.match = match
+
+    @property
+    def row(self):
+        return self.store.match_ids[self.match]
+
+    def __getitem__(self, key):
+        store, row = self.store, self.row
+        if key == "odds":
+            return SiteOdds(store, self.match)
+        if key == "date":
+            return epoch_to_date(store.dates[row])
+        if key == "id" and store.ids[row] is not None:
+            return store.ids[row]
+        if key == "competition" and store.competition_rows[row] != MISSING:
+            i_competition = store.competition_rows[row]
+            return store.competitions[i_competition] if i_competition >= 0 else None
+        return store.extras.get(row, {})[key]
+
+    def __setitem__(self, key, value):
+        store, row = self.store, self.row
+        if key == "odds":
+            store.mask[row] = False
+            store.set_site_odds_all(row, value)
+            store.odds_changed(self.match)
+        elif key == "date":
+            store.dates[row] = date_to_epoch(value)
+        elif key == "id":
+            store.ids[row] = value
+        elif key == "competition":
+            store.set_competition(row, value)
+        else:
+            store.extras.setdefault(row, {})[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key == "id":
+            self.store.ids[self.row] = None
+        elif key == "competition":
+            self.store.competition_rows[self.row] = MISSING
+        elif key in self.FIELDS:
+            raise KeyError(key)
+        else:
+            del self.store.extras[self.row][key]
+
+    def __iter__(self):
+        store, row = self.store, self.row
+        yield "odds"
+        if store.ids[row] is not None:
+            yield "id"
+        yield "date"
+        if store.competition_rows[row] != MISSING:
+            yield "competition"
+        yield from store.extras.get(row, {})
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.to_dict(), memo)
+
+    def to_dict(self):
+        odds_match = dict(self)
+        odds_match["odds"] = odds_match["odds"].to_dict()
+        return odds_match
+
+
+class SiteOdds(collections.abc.MutableMapping):
+    """
+    Vue (modifiable) sur les cotes des bookmakers d'un match d'un OddsStore
+    """
+
+    def __init__(self, store, match):
+        self.store = store
+        self.match = match
+
+    @property
+    def row(self):
+        return self.store.match_ids[self.match]
+
+    def __getitem__(self, site):
+        store, row = self.store, self.row
+        j = store.bookmaker_ids.get(site)
+        if j is None or not store.mask[row, j]:
+            raise KeyError(site)
+        odds_site = store.odds[row, j, :store.sizes[row, j]].tolist()
+        integers = int(store.integers[row, j])
+        if integers:
+            odds_site = [int(odd) if integers >> i & 1 else odd for i, odd in enumerate(odds_site)]
+        return OutcomeOdds(self, site, odds_site)
+
+    def __setitem__(self, site, odds_site):
+        self.store.set_site_odds(self.row, site, list(odds_site))
+        self.store.odds_changed(self.match)
+
+    def __delitem__(self, site):
+        store, row = self.store, self.row
+        j = store.bookmaker_ids.get(site)
+        if j is None or not store.mask[row, j]:
+            raise KeyError(site)
+        store.mask[row, j] = False
+        store.odds_changed(self.match)
+
+    def __iter__(self):
+        store, row = self.store, self.row
+        present = np.flatnonzero(store.mask[row])
+        return iter([store.bookmakers[j] for j in present[np.argsort(store.ranks[row, present], kind="stable")]])
+
+    def __len__(self):
+        return int(self.store.mask[self.row].sum())
+
+    def __contains__(self, site):
+        j = self.store.bookmaker_ids.get(site)
+        return j is not None and bool(self.store.mask[self.row, j])
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def __copy__(self):
+        return self.to_dict()
+
+    def __deepcopy__(self, memo):
+        return self.to_dict()
+
+    def to_dict(self):
+        return {site: list(odds_site) for site, odds_site in self.items()}
+
+
+class OutcomeOdds(list):
+    """
+    Cotes d'un bookmaker pour un match (liste) dont les modifications sont répercutées dans
+    l'OddsStore, comme pour store[match]["odds"][site][0] = cote. Les copies sont des listes
+    classiques
+    """
+
+    def __init__(self, site_odds, site, odds_site):
+        super().__init__(odds_site)
+        self.site_odds = site_odds
+        self.site = site
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(list(self), memo)
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def write_through(method):
+    def write_through_method(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.site_odds[self.site] = list(self)
+        return result
+    return write_through_method
+
+
+for name in ["__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend", "insert", "pop",
+             "remove", "clear", "sort", "reverse"]:
+    setattr(OutcomeOdds, name, write_through(getattr(list, name)))
+
+
+def as_dict(odds):
+    """
+    Convertit un OddsStore ou l'une de ses vues en dictionnaire classique (pour l'affichage
+    notamment), les autres objets étant retournés tels quels
+    """
+    if isinstance(odds, (OddsStore, MatchOdds, SiteOdds)):
+        return odds.to_dict()
+    return odds
+
+
+class OddsSnapshot(collections.abc.MutableMapping):
+    """
+    Cotes {sport: OddsStore} d'un fichier .npz, dont les sports ne sont lus qu'au premier accès
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.loaded = {}
+        self.sports = arrays["sports"].tolist()
+
+    def __getitem__(self, sport):
+        if sport not in self.loaded:
+            if sport not in self.sports:
+                raise KeyError(sport)
+            prefix = sport + "/"
+            self.loaded[sport] = OddsStore.from_arrays({key[len(prefix):]: self.arrays[key]
+                                                        for key in self.arrays.files
+                                                        if key.startswith(prefix)})
+        return self.loaded[sport]
+
+    def __setitem__(self, sport, odds):
+        if sport not in self.sports:
+            self.sports.append(sport)
+        self.loaded[sport] = odds
+
+    def __delitem__(self, sport):
+        self.sports.remove(sport)
+        self.loaded.pop(sport, None)
+
+    def __iter__(self):
+        return iter(list(self.sports))
+
+    def __len__(self):
+        return len(self.sports)
+
+    def __contains__(self, sport):
+        return sport in self.sports
+
+    def __repr__(self):
+        return "OddsSnapshot({!r})".format(self.sports)
+
+
+def save_snapshot(odds, path):
+    """
+    Sauvegarde les cotes {sport: cotes} au format .npz. Le fichier est écrit à côté de path
+    puis renommé, si bien qu'une sauvegarde interrompue ne corrompt pas la précédente
+    """
+    arrays = {"sports": np.array(list(odds), dtype=str)}
+    for sport, odds_sport in odds.items():
+        if not isinstance(odds_sport, OddsStore):
+            odds_sport = OddsStore(odds_sport)
+        for key, array in odds_sport.to_arrays().items():
+            arrays[sport + "/" + key] = array
+    with atomic_write(path, "wb") as file:
+        np.savez(file, **arrays)
+
+
+def load_snapshot(path):
+    """
+    Charge des cotes sauvegardées par save_snapshot. Le fichier est lu en mémoire (et peut donc
+    être remplacé aussitôt), mais les tableaux d'un sport ne sont décodés qu'à son premier accès
+    """
+    with open(path, "rb") as file:
+        return OddsSnapshot(np.load(io.BytesIO(file.read()), allow_pickle=False))
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="w"):
+    """
+    Fichier temporaire renommé en path à la sortie du bloc with (et supprimé en cas d'erreur)
+    """
+    descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, mode) as file:
+            yield file
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
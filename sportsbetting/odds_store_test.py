@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests du stockage compact des cotes
+"""
+
+import copy
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+import sportsbetting as sb
+from sportsbetting.auxiliary_functions import load_odds, save_odds, filter_dict_dates, get_values
+from sportsbetting.odds_index import get_odds_index
+from sportsbetting.odds_store import OddsSnapshot, OddsStore
+from sportsbetting.user_functions import best_match_under_conditions, odds_match, trj_match
+from sportsbetting.vectorized_functions import pack_odds
+
+PATH_DATA_TEST = os.path.dirname(sb.__file__) + "/resources/data_test.json"
+
+
+def test_dict_view():
+    odds = load_odds(PATH_DATA_TEST)["football"]
+    store = OddsStore(odds)
+    assert list(store) == list(odds)
+    assert store.to_dict() == odds
+    match = next(iter(odds))
+    assert store[match] == odds[match]
+    assert trj_match(store[match]) == trj_match(odds[match])
+    assert copy.deepcopy(store[match]) == odds[match]
+    site = next(iter(odds[match]["odds"]))
+    del store[match]["odds"][site]
+    assert site not in store[match]["odds"]
+    store[match]["odds"][site] = [2, 3, 4]
+    assert store[match]["odds"][site] == [2, 3, 4]
+    del store[match]
+    assert match not in store and len(store) == len(odds) - 1
+    store[match] = odds[match]
+    assert list(store)[-1] == match
+
+
+def test_views_after_compact():
+    store = OddsStore({"A - B": {"odds": {"betclic": [2, 3, 4]}, "date": None}}, capacity=2)
+    store["C - D"] = {"odds": {"betclic": [1.5, 4, 6]}, "date": None}
+    match_odds, site_odds = store["C - D"], store["C - D"]["odds"]
+    del store["A - B"]
+    store["E - F"] = {"odds": {"betclic": [3, 3, 2.5]}, "date": None}
+    assert store.match_ids["C - D"] == 0
+    assert match_odds["odds"]["betclic"] == site_odds["betclic"] == [1.5, 4, 6]
+    site_odds["winamax"] = [1.6, 4, 5]
+    assert store["C - D"]["odds"]["winamax"] == [1.6, 4, 5]
+    assert "winamax" not in store["E - F"]["odds"]
+    store["C - D"]["odds"]["betclic"][0] = 1.55
+    match_odds["odds"]["winamax"].append(10)
+    assert store.to_dict()["C - D"]["odds"] == {"betclic": [1.55, 4, 6], "winamax": [1.6, 4, 5, 10]}
+    assert type(copy.deepcopy(store["C - D"])["odds"]["betclic"]) is list
+
+
+def test_pack_and_filter():
+    odds = load_odds(PATH_DATA_TEST)["football"]
+    store = OddsStore(odds)
+    for site in ["pmu", "betclic", "unibet_boost"]:
+        packed_store, packed_dict = pack_odds(store, site, 3), pack_odds(odds, site, 3)
+        assert packed_store[:2] == packed_dict[:2]
+        for array_store, array_dict in zip(packed_store[2:], packed_dict[2:]):
+            np.testing.assert_array_equal(array_store, array_dict)
+    filtered = filter_dict_dates(store, date_min="24/11/2020", date_max="29/11/2020")
+    assert isinstance(filtered, OddsStore)
+    assert list(filtered) == list(filter_dict_dates(odds, date_min="24/11/2020", date_max="29/11/2020"))
+
+
+def test_under_condition_store():
+    sb.ODDS = load_odds(PATH_DATA_TEST)
+    outputs = []
+    for _ in range(2):
+        original_stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        best_match_under_conditions("parionssport", 1.7, 10)
+        best_match_under_conditions("parionssport", 1.7, 10, date_min="23/11/2020", date_max="29/11/2020")
+        outputs.append(sys.stdout.getvalue())
+        sys.stdout = original_stdout
+        sb.ODDS = {sport: OddsStore(odds_sport) for sport, odds_sport in sb.ODDS.items()}
+    assert outputs[0] == outputs[1]
+    match = next(iter(sb.ODDS["football"]))
+    _, odds = odds_match(match)
+    assert odds == sb.ODDS["football"][match] and isinstance(odds["odds"], dict)
+
+
+def test_odds_index():
+    odds = load_odds(PATH_DATA_TEST)["football"]
+    sb.ODDS = {"football": OddsStore(odds)}
+    index = get_odds_index("football")
+    trj = lambda match: trj_match(odds[match])[0]
+    assert index.surebets(0.95) == sorted([x for x in odds if trj(x) >= 0.95], key=trj, reverse=True)
+    value = lambda match: get_values(odds[match], 0.05)[0]
+    assert index.values(0.05) == sorted([x for x in odds if value(x) >= 0.05], key=value, reverse=True)
+    sb.SEEN_SUREBET["football"] = True
+    match = index.best_trj_matches(1)[0]
+    sb.ODDS["football"][match]["odds"]["betclic"] = [100] * len(odds[match]["odds"]["winamax"])
+    assert index.surebets()[0] == match and not sb.SEEN_SUREBET["football"]
+    del sb.ODDS["football"][match]
+    assert match not in index.surebets(0)
+
+
+def test_snapshot():
+    odds = load_odds(PATH_DATA_TEST)
+    odds["football"] = OddsStore(odds["football"])
+    del odds["football"][next(iter(odds["football"]))]
+    with tempfile.TemporaryDirectory() as directory:
+        for path in [directory + "/data.npz", directory + "/data.json"]:
+            save_odds(odds, path)
+            save_odds(odds, path)
+            loaded = load_odds(path)
+            assert list(loaded) == list(odds)
+            for sport in odds:
+                assert dict(loaded[sport]) == dict(odds[sport])
+        assert isinstance(loaded, dict) and isinstance(load_odds(directory + "/data.npz"), OddsSnapshot)
+        assert sorted(os.listdir(directory)) == ["data.json", "data.npz"]
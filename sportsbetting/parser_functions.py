@@ -2,12 +2,10 @@
 Fonctions de parsing
 """
 
+import importlib
 import locale
 import sys
 
-from sportsbetting.bookmakers import (betclic, betfair, betway, bwin, france_pari, joa, netbet, parionssport,
-                                      pasinobet, pinnacle, pmu, pokerstars, unibet, winamax, zebet)
-
 
 if sys.platform.startswith("win"):
     locale.setlocale(locale.LC_TIME, "fr")
@@ -16,28 +14,63 @@ elif sys.platform.startswith("linux"):
 else:  # sys.platform.startswith("darwin") # (Mac OS)
     locale.setlocale(locale.LC_TIME, "fr_FR.UTF-8")
 
+# Module, fonction et arguments supplémentaires de parsing de chaque site. Les modules des
+# bookmakers (et selenium, seleniumwire, websockets...) ne sont importés qu'à leur premier parsing
+PARSE_FUNCTIONS = {
+    "betclic" : ("betclic", "parse_betclic", {}),
+    "barrierebet": ("pasinobet", "parse_pasinobet", {"barrierebet": True}),
+    "betfair" : ("betfair", "parse_betfair", {}),
+    "betway" : ("betway", "parse_betway", {}),
+    "pokerstars" : ("pokerstars", "parse_pokerstars", {}),
+    "bwin" : ("bwin", "parse_bwin", {}),
+    "france_pari" : ("france_pari", "parse_france_pari", {}),
+    "joa" : ("joa", "parse_joa", {}),
+    "netbet" : ("netbet", "parse_netbet", {}),
+    "parionssport" : ("parionssport", "parse_parionssport", {}),
+    "pasinobet" : ("pasinobet", "parse_pasinobet", {}),
+    "pinnacle" : ("pinnacle", "parse_pinnacle", {}),
+    "pmu" : ("pmu", "parse_pmu", {}),
+    "unibet" : ("unibet", "parse_unibet", {}),
+    "unibet_boost" : ("unibet", "parse_unibet", {"boost": True}),
+    "vbet": ("pasinobet", "parse_pasinobet", {"vbet": True}),
+    "winamax" : ("winamax", "parse_winamax", {}),
+    "zebet" : ("zebet", "parse_zebet", {})
+}
+
+# Sites dont l'API demande un token, récupéré avec un driver seleniumwire
+TOKEN_SITES = {"betfair", "bwin", "parionssport", "pinnacle"}
+
+
+def get_module(site):
+    """
+    Module du bookmaker d'un site (importé au premier appel)
+    """
+    return importlib.import_module("sportsbetting.bookmakers." + PARSE_FUNCTIONS[site][0])
+
+
 def parse(site, url=""):
     """
     Retourne les cotes d'un site donné
     """
-    parse_functions = {
-        "betclic" : betclic.parse_betclic,
-        "barrierebet": lambda x: pasinobet.parse_pasinobet(x, barrierebet=True),
-        "betfair" : betfair.parse_betfair,
-        "betway" : betway.parse_betway,
-        "pokerstars" : pokerstars.parse_pokerstars,
-        "bwin" : bwin.parse_bwin,
-        "france_pari" : france_pari.parse_france_pari,
-        "joa" : joa.parse_joa,
-        "netbet" : netbet.parse_netbet,
-        "parionssport" : parionssport.parse_parionssport,
-        "pasinobet" : pasinobet.parse_pasinobet,
-        "pinnacle" : pinnacle.parse_pinnacle,
-        "pmu" : pmu.parse_pmu,
-        "unibet" : unibet.parse_unibet,
-        "unibet_boost" :lambda x: unibet.parse_unibet(x, True),
-        "vbet": lambda x: pasinobet.parse_pasinobet(x, vbet=True),
-        "winamax" : winamax.parse_winamax,
-        "zebet" : zebet.parse_zebet
-    }
-    return parse_functions[site](url)
+    _, function, kwargs = PARSE_FUNCTIONS[site]
+    parse_function = getattr(get_module(site), function)
+    return parse_function(url, **kwargs)
+
+# Sites dont les cotes peuvent être suivies par abonnement : module, fonctions d'abonnement et de
+# désabonnement et arguments supplémentaires
+SUBSCRIBE_FUNCTIONS = {
+    "barrierebet": ("pasinobet", "subscribe_pasinobet", "unsubscribe_pasinobet", {"barrierebet": True}),
+    "pasinobet": ("pasinobet", "subscribe_pasinobet", "unsubscribe_pasinobet", {}),
+    "vbet": ("pasinobet", "subscribe_pasinobet", "unsubscribe_pasinobet", {"vbet": True}),
+}
+
+
+def subscribe(site, url, callback):
+    """
+    Abonnement aux cotes d'une compétition : callback(cotes) est appelée à chaque mise à jour.
+    Retourne la fonction mettant fin à l'abonnement
+    """
+    module, function, unsubscribe_function, kwargs = SUBSCRIBE_FUNCTIONS[site]
+    module = importlib.import_module("sportsbetting.bookmakers." + module)
+    subid = getattr(module, function)(url, callback, **kwargs)
+    return lambda: getattr(module, unsubscribe_function)(subid, **kwargs)
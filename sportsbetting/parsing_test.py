@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests de l'ordonnancement du parsing des compétitions
+"""
+
+import datetime
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import sportsbetting as sb
+from sportsbetting import user_functions
+from sportsbetting.parser_functions import PARSE_FUNCTIONS
+
+
+class FakeParser:
+    """
+    Remplace parse_competition en mesurant le nombre de parsings simultanés
+    """
+
+    def __init__(self, unavailable=None):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.unavailable = unavailable
+
+    def __call__(self, competition, sport, site):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        if competition == self.unavailable:
+            raise sb.UnavailableSiteException
+        date = datetime.datetime(2030, 1, 1)
+        return {competition + " - B": {"odds": {site: [2, 2]}, "date": date, "id": {site: competition},
+                                       "competition": competition}}
+
+
+@pytest.fixture
+def parser(monkeypatch):
+    fake_parser = FakeParser()
+    monkeypatch.setattr(user_functions, "parse_competition", fake_parser)
+    sb.PROGRESS = 0
+    sb.SUB_PROGRESS_LIMIT = 1
+    return fake_parser
+
+
+def test_parallel_site(parser):
+    competitions = ["C{}".format(i) for i in range(10)]
+    odds = user_functions.parse_competitions_site(competitions, "football", "pinnacle")
+    assert sorted(odds) == sorted(competition + " - B" for competition in competitions)
+    assert 1 < parser.max_running <= user_functions.get_site_parallelism("pinnacle")
+    assert sb.PROGRESS == pytest.approx(100)
+    assert sb.SITE_PROGRESS["pinnacle"] == pytest.approx(100)
+
+
+def test_serialized_selenium_site(parser):
+    competitions = ["C{}".format(i) for i in range(4)]
+    odds = user_functions.parse_competitions_site(competitions, "football", "joa")
+    assert len(odds) == 4
+    assert parser.max_running == 1
+
+
+def test_unavailable_site(parser):
+    parser.unavailable = "C0"
+    odds = user_functions.parse_competitions_site(["C0", "C1", "C2"], "football", "betclic")
+    assert odds == {}
+    assert sb.SITE_PROGRESS["betclic"] == 100
+
+
+def test_lazy_import():
+    assert set(PARSE_FUNCTIONS) == set(sb.BOOKMAKERS_BOOST)
+    code = ("import sys, sportsbetting; "
+            "print(sorted({'chromedriver_autoinstaller', 'fake_useragent', 'selenium'} & set(sys.modules)))")
+    assert subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, universal_newlines=True,
+                          check=True).stdout.strip() == "[]"
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Répartition de calculs sur plusieurs processus
+"""
+
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import sys
+
+import numpy as np
+
+import sportsbetting as sb
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8 : les tableaux sont copiés dans chaque processus
+    shared_memory = None
+
+SNAPSHOT = {}
+SHARED_BLOCKS = []
+
+
+def get_context():
+    """
+    Contexte multiprocessing des processus de calcul. Sous Linux, fork évite de réimporter le
+    script principal dans chaque processus ; ailleurs (macOS notamment), forker un processus
+    comportant plusieurs threads n'est pas sûr et la méthode par défaut est conservée
+    """
+    if sys.platform.startswith("linux"):
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def get_nb_processes(processes=None):
+    """
+    Nombre de processus à utiliser (par défaut, le nombre de cœurs). Sans fork, l'interface,
+    dont le script n'est pas protégé par if __name__ == "__main__", reste sur un seul processus
+    """
+    if sys.version_info < (3, 7):  # ProcessPoolExecutor sans initializer
+        return 1
+    if sb.INTERFACE and get_context().get_start_method() != "fork":
+        return 1
+    return max(1, processes or os.cpu_count() or 1)
+
+
+def share_arrays(snapshot):
+    """
+    Place les tableaux numpy du snapshot en mémoire partagée. Retourne le snapshot à transmettre
+    aux processus et les blocs de mémoire partagée à libérer
+    """
+    if shared_memory is None:
+        return snapshot, []
+    shared_snapshot = {}
+    blocks = []
+    for key, value in snapshot.items():
+        if not isinstance(value, np.ndarray) or not value.nbytes:
+            shared_snapshot[key] = value
+            continue
+        block = shared_memory.SharedMemory(create=True, size=value.nbytes)
+        blocks.append(block)
+        np.ndarray(value.shape, value.dtype, buffer=block.buf)[...] = value
+        shared_snapshot[key] = SharedArray(block.name, value.shape, value.dtype.str)
+    return shared_snapshot, blocks
+
+
+class SharedArray:
+    """
+    Référence vers un tableau numpy placé en mémoire partagée
+    """
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def attach(self):
+        """
+        Retourne le tableau en lecture seule, sans copie
+        """
+        block = shared_memory.SharedMemory(name=self.name)
+        SHARED_BLOCKS.append(block)
+        array = np.ndarray(self.shape, self.dtype, buffer=block.buf)
+        array.flags.writeable = False
+        return array
+
+
+def init_process(snapshot, progress_queue):
+    """
+    Initialise le snapshot d'un processus de calcul, complété de la file de progression
+    """
+    global SNAPSHOT
+    SNAPSHOT = {key: value.attach() if isinstance(value, SharedArray) else value
+                for key, value in snapshot.items()}
+    SNAPSHOT["progress_queue"] = progress_queue
+
+
+def report_progress(snapshot, value):
+    """
+    Signale une avancée du calcul au processus principal, via la file de progression du snapshot
+    reçu par la tâche
+    """
+    snapshot["progress_queue"].put(value)
+
+
+def run_task(function, task):
+    """
+    Exécute une tâche sur le snapshot du processus de calcul
+    """
+    return function(SNAPSHOT, task)
+
+
+def drain_progress(progress_queue, progress):
+    """
+    Transmet à progress les avancées signalées par les processus
+    """
+    while True:
+        try:
+            value = progress_queue.get_nowait()
+        except queue.Empty:
+            return
+        if progress:
+            progress(value)
+
+
+def map_processes(function, tasks, snapshot=None, progress=None, processes=None):
+    """
+    Applique function(snapshot, task) à chaque tâche et renvoie les résultats au fur et à mesure
+    qu'ils sont disponibles. Les tâches sont consommées au fur et à mesure des résultats, ce qui
+    permet de construire une tâche à partir des résultats précédents. function doit être définie
+    au niveau d'un module, et peut appeler report_progress(snapshot, valeur) pour faire avancer
+    progress dans le processus principal. Sans processus supplémentaire, aucun état global n'est
+    modifié, si bien que plusieurs appels peuvent avoir lieu en même temps
+    """
+    snapshot = snapshot or {}
+    processes = get_nb_processes(processes)
+    tasks = iter(tasks)
+    if processes == 1:
+        progress_queue = queue.Queue()
+        snapshot = dict(snapshot, progress_queue=progress_queue)
+        for task in tasks:
+            result = function(snapshot, task)
+            drain_progress(progress_queue, progress)
+            yield result
+        return
+    context = get_context()
+    progress_queue = context.Queue()
+    shared_snapshot, blocks = share_arrays(snapshot)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(processes, context, init_process,
+                                                    (shared_snapshot, progress_queue)) as executor:
+            pending = set()
+            for task in tasks:
+                pending.add(executor.submit(run_task, function, task))
+                while len(pending) >= 2 * processes:
+                    done, pending = concurrent.futures.wait(pending, 0.1, concurrent.futures.FIRST_COMPLETED)
+                    drain_progress(progress_queue, progress)
+                    for future in done:
+                        yield future.result()
+            while pending:
+                done, pending = concurrent.futures.wait(pending, 0.1, concurrent.futures.FIRST_COMPLETED)
+                drain_progress(progress_queue, progress)
+                for future in done:
+                    yield future.result()
+        drain_progress(progress_queue, progress)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests de la répartition des calculs sur plusieurs processus
+"""
+
+import threading
+
+from sportsbetting.auxiliary_functions import merge_dict_odds
+from sportsbetting.benchmarks import generate_dict_odds
+from sportsbetting.odds_store import OddsStore
+from sportsbetting.process_functions import map_processes, report_progress
+from sportsbetting.vectorized_functions import best_combinations
+
+
+def square(snapshot, task):
+    report_progress(snapshot, task)
+    return snapshot["offset"] + task ** 2
+
+
+def slow_square(snapshot, task):
+    snapshot["started"].wait(5)
+    return square(snapshot, task)
+
+
+def test_map_processes():
+    for processes in [1, 2]:
+        progress = []
+        results = map_processes(square, range(10), {"offset": 1}, progress.append, processes)
+        assert sorted(results) == [1 + i ** 2 for i in range(10)]
+        assert sorted(progress) == list(range(10))
+
+
+
+def test_concurrent_sequential_calls():
+    started = threading.Barrier(2)
+    progresses = [[], []]
+    results = [None, None]
+
+    def run(i):
+        snapshot = {"offset": i, "started": started}
+        results[i] = list(map_processes(slow_square, range(3), snapshot, progresses[i].append, 1))
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [[0, 1, 4], [1, 2, 5]]
+    assert progresses == [[0, 1, 2], [0, 1, 2]]
+
+def test_best_combinations_processes():
+    odds = OddsStore(merge_dict_odds(generate_dict_odds(nb_sites=8, nb_matches=120)))
+    site = next(iter(odds.bookmakers))
+    for one_site in [False, True]:
+        results = []
+        for processes in [1, 2]:
+            progress = []
+            results.append(best_combinations(odds, site, 3, 3, 10, 1.5, one_site, progress=progress.append,
+                                             processes=processes))
+            results.append(sum(progress))
+        assert results[0] and results[:2] == results[2:]
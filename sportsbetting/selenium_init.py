@@ -2,6 +2,11 @@
 Initialisation de selenium
 """
 
+import atexit
+import concurrent.futures
+import contextlib
+import threading
+
 import colorama
 import selenium
 import selenium.webdriver
@@ -12,13 +17,14 @@ import termcolor
 import sportsbetting as sb
 
 DRIVER = {}
+POOLS = {}
+POOLS_LOCK = threading.Lock()
 
 
-def start_selenium_aux(site):
+def get_options(options):
     """
-    Lancement d'un driver selenium
+    Options communes des drivers headless
     """
-    options = selenium.webdriver.ChromeOptions()
     prefs = {'profile.managed_default_content_settings.images': 2,
              'disk-cache-size': 4096}
     options.add_argument('log-level=3')
@@ -26,6 +32,14 @@ def start_selenium_aux(site):
     options.add_experimental_option('excludeSwitches', ['enable-logging'])
     options.add_argument("--headless")
     options.add_argument("--disable-extensions")
+    return options
+
+
+def start_selenium_aux(site):
+    """
+    Lancement d'un driver selenium
+    """
+    options = get_options(selenium.webdriver.ChromeOptions())
     try:
         if site in DRIVER:
             return True
@@ -60,3 +74,176 @@ def start_driver(site):
                                 .format(colorama.Style.RESET_ALL),
                                 'yellow'))
         colorama.deinit()
+
+
+def start_drivers(sites):
+    """
+    Lance en parallèle les drivers de plusieurs sites et renvoie chaque site dès que son driver
+    est prêt
+    """
+    sites = list(sites)
+    if not sites:
+        return
+    with concurrent.futures.ThreadPoolExecutor(len(sites)) as executor:
+        futures = {executor.submit(start_driver, site): site for site in sites}
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+            yield futures[future]
+
+
+def start_seleniumwire_driver():
+    """
+    Lancement d'un driver seleniumwire, qui enregistre les requêtes effectuées par les pages
+    """
+    import seleniumwire.webdriver
+    return seleniumwire.webdriver.Chrome(sb.PATH_DRIVER, options=get_options(seleniumwire.webdriver.ChromeOptions()))
+
+
+def clear_requests(driver):
+    """
+    Oublie les requêtes enregistrées par un driver seleniumwire
+    """
+    try:
+        del driver.requests
+    except AttributeError:
+        pass
+
+
+class DriverPool:
+    """
+    Pool de drivers prêts à l'emploi, démarrés en parallèle par factory. Un driver est vérifié
+    avant d'être prêté (et remplacé s'il ne répond plus), remis à zéro par reset lorsqu'il est
+    rendu, et remplacé après max_loads prêts (une page chargée par prêt)
+    """
+
+    def __init__(self, factory, size=2, max_loads=20, reset=None):
+        self.factory = factory
+        self.size = size
+        self.max_loads = max_loads
+        self.reset = reset
+        self.idle = []
+        self.loads = {}
+        self.nb_drivers = 0
+        self.condition = threading.Condition()
+        self.executor = concurrent.futures.ThreadPoolExecutor(size)
+
+    def start(self):
+        """
+        Démarre un driver et le met à disposition
+        """
+        try:
+            driver = self.factory()
+        except Exception:
+            with self.condition:
+                self.nb_drivers -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.loads[driver] = 0
+            self.idle.append(driver)
+            self.condition.notify()
+        return driver
+
+    def warm_up(self, nb_drivers=None):
+        """
+        Démarre en parallèle (en arrière-plan) des drivers jusqu'à en avoir nb_drivers (size par
+        défaut). Retourne les futures des démarrages
+        """
+        futures = []
+        with self.condition:
+            while self.nb_drivers < min(nb_drivers or self.size, self.size):
+                self.nb_drivers += 1
+                futures.append(self.executor.submit(self.start))
+        return futures
+
+    @staticmethod
+    def is_alive(driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def discard(self, driver):
+        """
+        Ferme un driver et l'enlève du pool
+        """
+        with self.condition:
+            self.loads.pop(driver, None)
+            self.nb_drivers -= 1
+            self.condition.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """
+        Emprunte un driver en état de marche, en le démarrant si besoin
+        """
+        while True:
+            with self.condition:
+                while not self.idle and self.nb_drivers >= self.size:
+                    self.condition.wait()
+                if self.idle:
+                    driver = self.idle.pop()
+                else:
+                    self.nb_drivers += 1
+                    driver = None
+            if driver is None:
+                self.start()
+                continue
+            if self.is_alive(driver):
+                return driver
+            self.discard(driver)
+
+    def release(self, driver):
+        """
+        Rend un driver emprunté, qui est remplacé en arrière-plan s'il a atteint max_loads
+        """
+        with self.condition:
+            self.loads[driver] += 1
+            recycle = self.loads[driver] >= self.max_loads
+            if recycle:
+                del self.loads[driver]
+                self.executor.submit(self.start)
+        if recycle:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            return
+        if self.reset:
+            self.reset(driver)
+        with self.condition:
+            self.idle.append(driver)
+            self.condition.notify()
+
+    @contextlib.contextmanager
+    def borrow(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """
+        Ferme les drivers disponibles, après la fin des démarrages en cours
+        """
+        self.executor.shutdown(wait=True)
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for driver in idle:
+            self.discard(driver)
+
+
+def get_pool(name="seleniumwire"):
+    """
+    Pool de drivers seleniumwire partagé par les récupérations de tokens
+    """
+    with POOLS_LOCK:
+        if name not in POOLS:
+            POOLS[name] = DriverPool(start_seleniumwire_driver, reset=clear_requests)
+            atexit.register(POOLS[name].close)
+        return POOLS[name]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests du pool de drivers, sur une page statique servie localement
+"""
+
+import http.server
+import os
+import socketserver
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from sportsbetting.selenium_init import DriverPool
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class FakeDriver:
+    """
+    Remplace un driver selenium : les pages sont récupérées avec urllib. Le nombre maximal de
+    démarrages simultanés est conservé dans max_starting
+    """
+    started = 0
+    starting = 0
+    max_starting = 0
+    lock = threading.Lock()
+
+    def __init__(self):
+        with FakeDriver.lock:
+            FakeDriver.starting += 1
+            FakeDriver.max_starting = max(FakeDriver.max_starting, FakeDriver.starting)
+        time.sleep(0.2)
+        with FakeDriver.lock:
+            FakeDriver.starting -= 1
+            FakeDriver.started += 1
+        self.alive = True
+        self.page_source = ""
+        self.current_url_value = "about:blank"
+        self.requests = []
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise ConnectionError
+        return self.current_url_value
+
+    def get(self, url):
+        with urllib.request.urlopen(url) as response:
+            self.page_source = response.read().decode()
+        self.current_url_value = url
+        self.requests.append(url)
+
+    def quit(self):
+        self.alive = False
+
+
+@pytest.fixture
+def page(tmp_path):
+    (tmp_path / "index.html").write_text("<html><body>Cotes</body></html>")
+    class PageHandler(http.server.SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            return os.path.join(str(tmp_path), os.path.relpath(super().translate_path(path), os.getcwd()))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:{}/index.html".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_driver_pool(page):
+    pool = DriverPool(FakeDriver, size=3, max_loads=2, reset=lambda driver: driver.requests.clear())
+    for future in pool.warm_up():
+        future.result()
+    assert FakeDriver.max_starting == 3 and len(pool.idle) == 3
+    with pool.borrow() as driver:
+        driver.get(page)
+        assert "Cotes" in driver.page_source and driver.requests == [page]
+    assert not driver.requests
+    with pool.borrow() as same_driver:
+        assert same_driver is driver
+    assert not driver.alive
+    for future in pool.warm_up():
+        future.result()
+    with pool.borrow() as new_driver:
+        assert new_driver is not driver
+        new_driver.quit()
+    with pool.borrow() as healthy_driver:
+        assert healthy_driver.alive
+    drivers = [pool.acquire() for _ in range(3)]
+    assert len(set(drivers)) == 3
+    for driver in drivers:
+        pool.release(driver)
+    pool.close()
+    assert not pool.idle and all(not driver.alive for driver in drivers)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Gestion des tokens d'accès aux API des bookmakers : tokens gardés en mémoire avec leur date
+d'expiration, renouvelés lorsqu'une API les refuse (401/403) ou peu avant leur expiration, et
+sauvegardés dans sb.PATH_TOKENS
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+
+import sportsbetting as sb
+from sportsbetting import http_functions
+from sportsbetting.odds_store import atomic_write
+
+DEFAULT_LIFETIME = 24 * 3600
+REFRESH_MARGIN = 0.1
+UNAUTHORIZED_STATUS = {401, 403}
+
+
+class TokenManager:
+    """
+    Tokens {site: (token, expiration)}. Chaque site enregistre la fonction qui récupère un nouveau
+    token ; un seul renouvellement par site est lancé à la fois, les autres demandeurs attendant
+    son résultat. Un token dont il reste moins de REFRESH_MARGIN de la durée de vie est encore
+    utilisé pendant qu'un nouveau est récupéré en arrière-plan
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.fetchers = {}
+        self.lifetimes = {}
+        self.tokens = {}
+        self.refreshing = {}
+        self.lock = threading.Lock()
+        self.loaded = False
+
+    def register(self, site, fetcher, lifetime=DEFAULT_LIFETIME):
+        self.fetchers[site] = fetcher
+        self.lifetimes[site] = lifetime
+
+    def get_path(self):
+        return self.path or sb.PATH_TOKENS
+
+    def load(self):
+        """
+        Lit les tokens sauvegardés (lignes "site token [expiration]", les tokens sans expiration
+        restant valides jusqu'à leur refus par l'API)
+        """
+        self.loaded = True
+        if not os.path.exists(self.get_path()):
+            return
+        with open(self.get_path(), "r") as file:
+            for line in file:
+                fields = line.split()
+                if len(fields) >= 2:
+                    expiration = float(fields[2]) if len(fields) > 2 else float("inf")
+                    self.tokens[fields[0]] = (fields[1], expiration)
+
+    def save(self):
+        with atomic_write(self.get_path()) as file:
+            for site, (token, expiration) in self.tokens.items():
+                file.write("{} {} {}\n".format(site, token, expiration))
+
+    def get(self, site):
+        """
+        Token valide d'un site, récupéré si besoin
+        """
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            token, expiration = self.tokens.get(site, (None, 0))
+            remaining = expiration - time.time()
+        if remaining <= 0:
+            return self.refresh(site)
+        if remaining < REFRESH_MARGIN * self.lifetimes.get(site, DEFAULT_LIFETIME):
+            threading.Thread(target=self.refresh, args=(site, token), daemon=True).start()
+        return token
+
+    def refresh(self, site, invalid_token=None):
+        """
+        Récupère un nouveau token. Si invalid_token est donné et qu'un autre token valide a déjà
+        remplacé celui-ci, il est retourné directement
+        """
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            token, expiration = self.tokens.get(site, (None, 0))
+            if invalid_token is not None and token != invalid_token and expiration > time.time():
+                return token
+            future = self.refreshing.get(site)
+            fetch = future is None
+            if fetch:
+                future = self.refreshing[site] = concurrent.futures.Future()
+        if not fetch:
+            return future.result()
+        try:
+            token = self.fetchers[site]()
+        except BaseException as exception:
+            with self.lock:
+                del self.refreshing[site]
+            future.set_exception(exception)
+            raise
+        with self.lock:
+            del self.refreshing[site]
+            if token:
+                self.tokens[site] = (token, time.time() + self.lifetimes.get(site, DEFAULT_LIFETIME))
+                self.save()
+        future.set_result(token)
+        return token
+
+    def missing(self, sites):
+        """
+        Sites parmi sites dont le token doit être récupéré (absent ou expiré)
+        """
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            now = time.time()
+            return [site for site in sites if site in self.fetchers and self.tokens.get(site, (None, 0))[1] <= now]
+
+    def invalidate(self, site):
+        with self.lock:
+            self.tokens.pop(site, None)
+
+
+TOKENS = TokenManager()
+
+
+def get_all_with_token(urls, site, header=None, raise_for_status=True, tokens=None, **kwargs):
+    """
+    Requêtes GET authentifiées par le token de site, placé dans l'en-tête header et/ou à la place
+    de {token} dans les urls. Les requêtes refusées (401/403) sont relancées une fois avec un
+    nouveau token
+    """
+    tokens = tokens or TOKENS
+    responses = [None] * len(urls)
+    pending = list(range(len(urls)))
+    headers = dict(kwargs.pop("headers", None) or {})
+    for attempt in range(2):
+        token = tokens.get(site)
+        if header:
+            headers[header] = token
+        urls_token = [urls[i].replace("{token}", str(token)) for i in pending]
+        if len(urls_token) == 1:
+            fetched = [http_functions.get(urls_token[0], site, headers=headers, raise_for_status=False, **kwargs)]
+        else:
+            fetched = http_functions.get_all(urls_token, site, headers=headers, raise_for_status=False, **kwargs)
+        for i, response in zip(pending, fetched):
+            responses[i] = response
+        pending = [i for i in pending if responses[i].status_code in UNAUTHORIZED_STATUS]
+        if not pending or attempt:
+            break
+        tokens.refresh(site, token)
+    if raise_for_status:
+        for response in responses:
+            response.raise_for_status()
+    return responses
+
+
+def get_with_token(url, site, header=None, raise_for_status=True, tokens=None, **kwargs):
+    """
+    Requête GET authentifiée (voir get_all_with_token)
+    """
+    return get_all_with_token([url], site, header, raise_for_status, tokens, **kwargs)[0]
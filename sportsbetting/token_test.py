@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests de la gestion des tokens, sur une API locale dont le token change à la demande
+"""
+
+import concurrent.futures
+import http.server
+import socketserver
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from sportsbetting.token_functions import TokenManager, get_with_token
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class FakeApiHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/token":
+            with server.lock:
+                server.token_requests += 1
+            time.sleep(0.2)
+            body, status = server.token, 200
+        else:
+            authorized = self.headers.get("X-Token") == server.token or self.path.endswith("=" + server.token)
+            body, status = ("odds", 200) if authorized else ("unauthorized", 401)
+        body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeApiHandler)
+    server.lock = threading.Lock()
+    server.token = "token1"
+    server.token_requests = 0
+    server.url = "http://127.0.0.1:{}".format(server.server_address[1])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def fetch_token(api):
+    with urllib.request.urlopen(api.url + "/token") as response:
+        return response.read().decode()
+
+
+def test_token_manager(api, tmp_path):
+    path = str(tmp_path / "tokens.txt")
+    tokens = TokenManager(path)
+    tokens.register("fake", lambda: fetch_token(api))
+    assert get_with_token(api.url + "/odds", "fake", "X-Token", tokens=tokens).text == "odds"
+    assert get_with_token(api.url + "/odds?key={token}", "fake", tokens=tokens).text == "odds"
+    assert api.token_requests == 1
+    api.token = "token2"
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        responses = list(executor.map(lambda _: get_with_token(api.url + "/odds", "fake", "X-Token", tokens=tokens),
+                                      range(8)))
+    assert all(response.text == "odds" for response in responses)
+    assert api.token_requests == 2
+    with open(path) as file:
+        assert file.read().split()[:2] == ["fake", "token2"]
+    saved_tokens = TokenManager(path)
+    saved_tokens.register("fake", lambda: fetch_token(api))
+    assert saved_tokens.get("fake") == "token2" and api.token_requests == 2
+    saved_tokens.register("other", lambda: fetch_token(api))
+    assert saved_tokens.missing(["fake", "other", "unibet"]) == ["other"]
+
+
+def test_token_expiration(api, tmp_path):
+    tokens = TokenManager(str(tmp_path / "tokens.txt"))
+    tokens.register("fake", lambda: fetch_token(api), lifetime=1)
+    assert tokens.get("fake") == "token1"
+    api.token = "token2"
+    time.sleep(0.95)
+    assert tokens.get("fake") == "token1"
+    time.sleep(0.4)
+    assert api.token_requests == 2 and tokens.get("fake") == "token2"
+    api.token = "token3"
+    time.sleep(1.1)
+    assert tokens.get("fake") == "token3"
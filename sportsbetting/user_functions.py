@@ -3,10 +3,13 @@
 Fonctions principales d'assistant de paris
 """
 
+import concurrent.futures
 import copy
 import datetime
+import math
 import socket
 import sys
+import threading
 import traceback
 import urllib
 import urllib.error
@@ -17,25 +20,38 @@ from multiprocessing.pool import ThreadPool
 from pprint import pprint
 
 import numpy as np
+import requests
 import selenium
 import selenium.common
 import tabulate
 
 import sportsbetting as sb
-from sportsbetting import selenium_init
+from sportsbetting import http_functions, selenium_init
 from sportsbetting.database_functions import (get_id_from_competition_name, get_competition_by_id, import_teams_by_url,
                                               import_teams_by_sport, import_teams_by_competition_id_thesportsdb)
-from sportsbetting.parser_functions import parse
-from sportsbetting.auxiliary_functions import (valid_odds, format_team_names, merge_dict_odds, afficher_mises_combine,
+from sportsbetting.history_functions import record_odds
+from sportsbetting.odds_index import ODDS_LOCK, get_odds_index
+from sportsbetting.odds_store import OddsStore, as_dict
+from sportsbetting.parser_functions import TOKEN_SITES, get_module, parse
+from sportsbetting.process_functions import map_processes, report_progress
+from sportsbetting.token_functions import TOKENS
+from sportsbetting.auxiliary_functions import (best_defined_bets, valid_odds, format_team_names, merge_dict_odds, afficher_mises_combine,
+                                               copy_match_odds,
                                                cotes_combine_all_sites, defined_bets, binomial, best_match_base,
                                                filter_dict_dates, get_nb_outcomes, best_combine_reduit,
-                                               filter_dict_minimum_odd, cotes_combine_reduit_all_sites, copy_to_clipboard)
+                                               filter_dict_minimum_odd, cotes_combine_reduit_all_sites, copy_to_clipboard,
+                                               trj_match)
 from sportsbetting.basic_functions import (gain2, mises2, gain, mises, mises_freebet, cotes_freebet,
                                            gain_pari_rembourse_si_perdant, gain_freebet2, mises_freebet2,
                                            mises_pari_rembourse_si_perdant, gain_promo_gain_cote, mises_promo_gain_cote,
                                            gain_gains_nets_boostes, mises_gains_nets_boostes, gain3, mises3, cotes_combine_optimise,
                                            gain_defi_rembourse_ou_gagnant, mises_defi_rembourse_ou_gagnant)
-from sportsbetting.lambda_functions import get_best_odds, get_profit
+from sportsbetting.lambda_functions import (get_best_odds, get_profit, get_best_odds_vectorized,
+                                            get_profit_vectorized, get_minimum_odd_criteria_vectorized)
+from sportsbetting.vectorized_functions import (best_combinations, odds_to_check_tensor, diagonal, gain2_vectorized,
+                                                gain_pari_rembourse_si_perdant_vectorized,
+                                                gain_promo_gain_cote_vectorized,
+                                                gain_defi_rembourse_ou_gagnant_vectorized)
 
 
 def parse_competition(competition, sport, *sites):
@@ -67,6 +83,8 @@ def parse_competition(competition, sport, *sites):
                 print("Pas d'url en base pour {} sur {}".format(competition, site))
         except urllib.error.URLError:
             print("{} non accessible sur {} (délai écoulé)".format(competition, site))
+        except requests.exceptions.RequestException:
+            print("{} non accessible sur {}".format(competition, site))
         except KeyboardInterrupt:
             res_parsing[site] = {}
         except selenium.common.exceptions.TimeoutException:
@@ -79,21 +97,80 @@ def parse_competition(competition, sport, *sites):
             print("StaleElement non trouvé par selenium ({} sur {})".format(competition, site))
         except selenium.common.exceptions.WebDriverException:
             print("Connection closed ({} sur {})".format(competition, site))
+    return format_competition_odds(res_parsing, sport, competition)
+
+
+def format_competition_odds(res_parsing, sport, competition):
+    """
+    Cotes {site: cotes} d'une compétition fusionnées, avec les noms d'équipes uniformisés
+    """
     res = format_team_names(res_parsing, sport, competition)
-    out = valid_odds(merge_dict_odds(res), sport)
-    return out
+    return valid_odds(merge_dict_odds(res), sport)
+
+
+MAX_PARALLEL_COMPETITIONS = 12
+PARSING_SEMAPHORE = threading.BoundedSemaphore(MAX_PARALLEL_COMPETITIONS)
+PROGRESS_LOCK = threading.Lock()
+# Répartition des recherches de combinaisons sur plusieurs processus
+MIN_COMBINATIONS_PROCESSES = 10 ** 6
+COMBINATIONS_PER_TASK = 10000
+STAKES_COMBINATIONS_PER_TASK = 10
+# Nombre de répartitions des mises à évaluer à partir duquel plusieurs processus sont utilisés
+MIN_STAKES_EVALUATIONS_PROCESSES = 10 ** 4
+
+
+def get_site_parallelism(site):
+    """
+    Retourne le nombre de compétitions pouvant être récupérées simultanément sur un site
+    """
+    if site in sb.SELENIUM_SITES or sb.DB_MANAGEMENT:
+        return 1
+    database_site = site if site not in ["barrierebet", "vbet"] else "pasinobet"
+    limits = http_functions.SITE_LIMITS.get(database_site, http_functions.DEFAULT_SITE_LIMITS)
+    return limits.get("concurrency", 1)
+
+
+def update_progress(site, nb_competitions):
+    """
+    Met à jour la progression globale et celle d'un site après le parsing d'une compétition
+    """
+    with PROGRESS_LOCK:
+        sb.PROGRESS += 100 / (nb_competitions * sb.SUB_PROGRESS_LIMIT)
+        sb.SITE_PROGRESS[site] += 100 / nb_competitions
 
 
 def parse_competitions_site(competitions, sport, site):
+    """
+    Retourne les cotes de plusieurs compétitions sur un site. La première compétition est
+    récupérée seule (initialisation des tokens et des sessions), les suivantes en parallèle dans
+    la limite fixée pour le site et de MAX_PARALLEL_COMPETITIONS pour l'ensemble des sites
+    """
     list_odds = []
     if len(competitions) > 40 and site == "winamax":  # to avoid being blocked by winamax
         competitions = competitions[:40]
     sb.SITE_PROGRESS[site] = 0
+    interrupted = threading.Event()
+
+    def parse_competition_site(competition):
+        with PARSING_SEMAPHORE:
+            if interrupted.is_set():
+                return None
+            try:
+                odds = parse_competition(competition, sport, site)
+            except (sb.UnavailableSiteException, sb.AbortException):
+                interrupted.set()
+                raise
+        update_progress(site, len(competitions))
+        return odds
+
     try:
-        for competition in competitions:
-            list_odds.append(parse_competition(competition, sport, site))
-            sb.PROGRESS += 100 / (len(competitions) * sb.SUB_PROGRESS_LIMIT)
-            sb.SITE_PROGRESS[site] += 100 / len(competitions)
+        if competitions:
+            list_odds.append(parse_competition_site(competitions[0]))
+        with concurrent.futures.ThreadPoolExecutor(get_site_parallelism(site)) as executor:
+            futures = [executor.submit(parse_competition_site, competition)
+                       for competition in competitions[1:]]
+        for future in futures:
+            list_odds.append(future.result())
     except sb.UnavailableSiteException:
         print("{} non accessible".format(site))
         sb.SITE_PROGRESS[site] = 100
@@ -102,6 +179,21 @@ def parse_competitions_site(competitions, sport, site):
     return merge_dict_odds(list_odds)
 
 
+def warm_up_token_drivers(sites):
+    """
+    Démarre en arrière-plan les drivers du pool seleniumwire nécessaires à la récupération des
+    tokens manquants des sites, pour ne pas attendre le démarrage de Chrome au premier token
+    """
+    try:
+        for site in TOKEN_SITES.intersection(sites):
+            get_module(site)  # enregistre la récupération du token du site
+        token_sites = TOKENS.missing(sites)
+        if token_sites:
+            selenium_init.get_pool().warm_up(len(token_sites))
+    except Exception:
+        print(traceback.format_exc(), file=sys.stderr)
+
+
 def parse_competitions(competitions, sport, *sites):
     sites_order = ['betfair', 'joa', 'betway', 'pmu', 'barrierebet', 'pasinobet', 'vbet', 'france_pari', 'netbet', 'zebet',
                    'winamax', 'pinnacle', 'betclic', 'pokerstars', 'unibet', 'unibet_boost', 'bwin', 'parionssport']
@@ -111,9 +203,9 @@ def parse_competitions(competitions, sport, *sites):
     sites = [site for site in sites_order if site in sites]
     sb.PROGRESS = 0
     selenium_sites = sb.SELENIUM_SITES.intersection(sites)
-    for site in selenium_sites:
-        selenium_init.start_driver(site)
+    for _ in selenium_init.start_drivers(selenium_sites):
         sb.PROGRESS += 100/len(selenium_sites)
+    warm_up_token_drivers(sites)
     sb.PROGRESS = 0
     sb.SUB_PROGRESS_LIMIT = len(sites)
     if sb.DB_MANAGEMENT:
@@ -130,8 +222,14 @@ def parse_competitions(competitions, sport, *sites):
     list_odds = []
     try:
         sb.IS_PARSING = True
-        list_odds = ThreadPool(3).map(lambda x: parse_competitions_site(competitions, sport, x), sites)
-        sb.ODDS[sport] = merge_dict_odds(list_odds)
+        with ThreadPool(max(1, len(sites))) as pool:
+            list_odds = pool.map(lambda x: parse_competitions_site(competitions, sport, x), sites)
+        odds = OddsStore(merge_dict_odds(list_odds), get_nb_outcomes(sport))
+        with ODDS_LOCK:  # une mise à jour du suivi des cotes ne peut pas écraser ces cotes
+            sb.ODDS[sport] = odds
+            get_odds_index(sport)
+        if sb.HISTORY:
+            record_odds(sport, sb.ODDS[sport])
     except Exception:
         print(traceback.format_exc(), file=sys.stderr)
     sb.IS_PARSING = False
@@ -146,7 +244,7 @@ def odds_match(match, sport="football"):
     """
     odds_match = sb.ODDS[sport].get(match)
     if odds_match:
-        return match, copy.deepcopy(odds_match)
+        return match, copy_match_odds(odds_match)
     return None, None
 
 
@@ -216,9 +314,11 @@ def best_match_under_conditions(site, minimum_odd, bet, sport="football", date_m
                                                                    best_rank, False) if not one_site
                                                             else mises(best_overall_odds, bet,
                                                                        False))
+    vectorized_functions = (get_best_odds_vectorized(one_site), get_minimum_odd_criteria_vectorized(minimum_odd, one_site),
+                            get_profit_vectorized(bet, one_site))
     best_match_base(odds_function, profit_function, criteria, display_function,
                     result_function, site, sport, date_max, time_max, date_min,
-                    time_min, one_site=one_site)
+                    time_min, one_site=one_site, vectorized_functions=vectorized_functions)
 
 def best_match_under_conditions2(site, minimum_odd, stake, sport="football", date_max=None,
                                  time_max=None, date_min=None, time_min=None, miles=False, rate_eur_miles=0, multiplicator=1):
@@ -255,7 +355,7 @@ def best_match_under_conditions2(site, minimum_odd, stake, sport="football", dat
                     sites = [site if i in best_indices else best_sites[i] for i in range(n)]
     if best_match:
         print(best_match)
-        pprint(all_odds[best_match])
+        pprint(as_dict(all_odds[best_match]))
         mises3(best_odds_site, best_best_odds, stake, minimum_odd, True, miles, rate_eur_miles, multiplicator)
         afficher_mises_combine([best_match], [sites], [stakes],
                                all_odds[best_match]["odds"], sport, profit=best_profit)
@@ -290,9 +390,12 @@ def best_match_freebet(site, freebet, sport="football", live=False, date_max=Non
     criteria = lambda odds_to_check, i: True
     display_function = lambda x, i: mises_freebet(x[:i] + [x[i] + 1] + x[i + 1:], freebet, i, True)
     result_function = lambda x, i: mises_freebet(x[:i] + [x[i] + 1] + x[i + 1:], freebet, i, False)
+    vectorized_functions = (lambda best_odds, odds_site: odds_to_check_tensor(best_odds, odds_site * fact_live - 1),
+                            lambda odds_to_check: np.ones(odds_to_check.shape[:-1], dtype=bool),
+                            lambda odds_to_check: gain2_vectorized(odds_to_check) + 1)
     best_match_base(odds_function, profit_function, criteria, display_function,
                     result_function, site, sport, date_max, time_max, date_min,
-                    time_min, freebet=True)
+                    time_min, freebet=True, vectorized_functions=vectorized_functions)
 
 
 def best_match_freebet2(site, freebet, sport="football", live=False, date_max=None, time_max=None,
@@ -334,9 +437,15 @@ def best_match_cashback(site, minimum_odd, bet, sport="football", freebet=True,
                                                                     rate_cashback, True)
     result_function = lambda x, i: mises_pari_rembourse_si_perdant(x, bet, i, freebet,
                                                                    rate_cashback, False)
+    vectorized_functions = (lambda best_odds, odds_site: odds_to_check_tensor(best_odds,
+                                                                              combi_odd * odds_site
+                                                                              * (1 + combi_max) - combi_max),
+                            lambda odds_to_check: (diagonal(odds_to_check) + combi_max) / (1 + combi_max) >= minimum_odd,
+                            lambda odds_to_check: gain_pari_rembourse_si_perdant_vectorized(odds_to_check, bet, freebet,
+                                                                                            rate_cashback))
     best_match_base(odds_function, profit_function, criteria, display_function,
                     result_function, site, sport, date_max, time_max, date_min,
-                    time_min)
+                    time_min, vectorized_functions=vectorized_functions)
 
 
 def best_matches_combine(site, minimum_odd, bet, sport="football", nb_matches=2, one_site=False,
@@ -348,21 +457,22 @@ def best_matches_combine(site, minimum_odd, bet, sport="football", nb_matches=2,
     """
     all_odds = filter_dict_dates(sb.ODDS[sport], date_max, time_max, date_min, time_min)
     all_odds = filter_dict_minimum_odd(all_odds, minimum_odd_selection, site)
-    sb.ALL_ODDS_COMBINE = {}
     nb_combine = binomial(len(all_odds), nb_matches)
     sb.PROGRESS = 0
 
-    def compute_all_odds_combine(nb_combine, combine):
-        sb.PROGRESS += 100/nb_combine
-        try:
-            sb.ALL_ODDS_COMBINE[" / ".join([match[0] for match in combine])] = cotes_combine_all_sites(
-                *[match[1] for match in combine]
-            )
-        except KeyError:
-            pass
-    ThreadPool(4).map(lambda x: compute_all_odds_combine(nb_combine, x),
-                      combinations(all_odds.items(), nb_matches))
+    def update_progress(nb_combinations):
+        sb.PROGRESS += 100 * nb_combinations / nb_combine
+    # Seules les meilleures combinaisons sont conservées et départagées par best_match_base
+    processes = None if nb_combine >= MIN_COMBINATIONS_PROCESSES else 1
+    best_combinations_matches = best_combinations(all_odds, site, get_nb_outcomes(sport), nb_matches, bet,
+                                                  minimum_odd, one_site, progress=update_progress,
+                                                  processes=processes)
+    sb.ALL_ODDS_COMBINE = {" / ".join(combine): cotes_combine_all_sites(*[all_odds[match] for match in combine])
+                           for combine in best_combinations_matches}
     sb.PROGRESS = 0
+    if not sb.ALL_ODDS_COMBINE:
+        print("No match found")
+        return
     odds_function = get_best_odds(one_site)
     profit_function = get_profit(bet, one_site)
     criteria = lambda odds_to_check, i: ((not one_site and odds_to_check[i] >= minimum_odd)
@@ -449,7 +559,6 @@ def best_match_stakes_to_bet(stakes, nb_matches=1, sport="football", date_max=No
     all_odds = filter_dict_dates(sb.ODDS[sport], date_max, time_max)
     best_profit = -sum(stake[0] for stake in stakes)
     n = get_nb_outcomes(sport) ** nb_matches
-    nb_stakes = len(stakes)
     all_odds_combine = {}
     combis = list(combinations(all_odds.items(), nb_matches))
     nb_combis = len(combis)
@@ -461,50 +570,34 @@ def best_match_stakes_to_bet(stakes, nb_matches=1, sport="football", date_max=No
     for i, combine in enumerate(combis):
         sb.PROGRESS += 100 / nb_combis
         match_combine = " / ".join([match[0] for match in combine])
-        all_odds_combine[match_combine] = cotes_combine_all_sites(*[match[1] for match in combine])
+        odds_combine = cotes_combine_all_sites(*[match[1] for match in combine])
         for main0 in main_sites:
             try:
                 main_sites_distribution = [main0 for _ in range(n)]
-                main_site_odds = copy.deepcopy(all_odds_combine[match_combine]["odds"][main0])
+                main_site_odds = copy.deepcopy(odds_combine["odds"][main0])
                 break
             except KeyError:
                 pass
         for main in main_sites[:i] + main_sites[i + 1:]:
             try:
-                potential_odds = all_odds_combine[match_combine]["odds"][main]
+                potential_odds = odds_combine["odds"][main]
                 for j, odd in enumerate(potential_odds):
                     if odd > main_site_odds[j]:
                         main_site_odds[j] = odd
                         main_sites_distribution[j] = main
             except KeyError:
                 pass
-        second_odds = {second_site: all_odds_combine[match_combine]["odds"][second_site]
-                       for second_site in second_sites if second_site in all_odds_combine[match_combine]["odds"]}
+        second_odds = {second_site: odds_combine["odds"][second_site]
+                       for second_site in second_sites if second_site in odds_combine["odds"]}
         if not second_odds:
             continue
-        dict_combine_odds = copy.deepcopy(second_odds)
-        for perm in permutations(range(n), nb_stakes):
-            valid_perm = True
-            defined_second_sites = [[perm[j], stake[0], stake[1]]
-                                    for j, stake in enumerate(stakes)]
-            for j, stake in enumerate(stakes):
-                if dict_combine_odds[defined_second_sites[j][2]][defined_second_sites[j][0]] < stake[2]:
-                    valid_perm = False
-                    break
-            if not valid_perm:
-                if identical_stakes:
-                    break
-                continue
-            defined_bets_temp = defined_bets(main_site_odds, dict_combine_odds,
-                                             main_sites_distribution,
-                                             defined_second_sites)
-            profit = defined_bets_temp[0] - np.sum(defined_bets_temp[1])
-            if profit > best_profit:
-                best_profit = profit
-                best_combine = combine
-                best_bets = defined_bets_temp
-            if identical_stakes:
-                break
+        # Les meilleures cotes principales de la combinaison servent à toutes les affectations
+        best_combine_bets = best_defined_bets(main_site_odds, second_odds, main_sites_distribution, stakes,
+                                              best_profit, identical_stakes)
+        if best_combine_bets:
+            best_profit, best_bets = best_combine_bets
+            best_combine = combine
+            all_odds_combine = {match_combine: odds_combine}
     if best_combine:
         best_match_combine = " / ".join([match[0] for match in best_combine])
         odds_best_match = copy.deepcopy(all_odds_combine[best_match_combine])
@@ -634,8 +727,12 @@ def best_match_gain_cote(site, bet, sport="football", date_max=None, time_max=No
     result_function = lambda best_overall_odds, best_rank: mises_promo_gain_cote(best_overall_odds,
                                                                                  bet, best_rank,
                                                                                  False)
+    vectorized_functions = (get_best_odds_vectorized(False),
+                            lambda odds_to_check: np.ones(odds_to_check.shape[:-1], dtype=bool),
+                            lambda odds_to_check: gain_promo_gain_cote_vectorized(odds_to_check, bet))
     best_match_base(odds_function, profit_function, criteria, display_function, result_function,
-                    site, sport, date_max, time_max, date_min, time_min)
+                    site, sport, date_max, time_max, date_min, time_min,
+                    vectorized_functions=vectorized_functions)
 
 
 def best_match_cotes_boostees(site, gain_max, sport="football", date_max=None, time_max=None,
@@ -704,70 +801,21 @@ def best_combine_booste_progressif(matches, combinaison_boostee, site_combinaiso
     
 
 
-def trj_match(match_odds):
-    odds = []
-    bookmakers = []
-    for bookmaker in match_odds["odds"]:
-        if bookmaker == "unibet_boost":
-            continue
-        tmp_odds = match_odds["odds"][bookmaker]
-        tmp_bookmakers = [bookmaker for _ in tmp_odds]
-        if not odds:
-            odds = copy.deepcopy(tmp_odds)
-            bookmakers = copy.deepcopy(tmp_bookmakers)
-            continue
-        for i, tmp_odd in enumerate(tmp_odds):
-            if not odds[i]:
-                odds[i] = 1.01
-            if not tmp_odd:
-                continue
-            try:
-                if tmp_odd > odds[i]:
-                    odds[i] = tmp_odd
-                    bookmakers[i] = bookmaker
-            except TypeError:
-                print(match_odds, tmp_odd, odds[i])
-    if not odds or 1.01 in odds:
-        return 0, bookmakers, odds
-    return gain(odds), bookmakers, odds
-
-def get_values(match_odds, rate):
-    odds = []
-    bookmakers = []
-    sums = []
-    for bookmaker in match_odds["odds"]:
-        if bookmaker == "unibet_boost":
-            continue
-        tmp_odds = match_odds["odds"][bookmaker]
-        tmp_bookmakers = [bookmaker for _ in tmp_odds]
-        if not odds:
-            odds = copy.deepcopy(tmp_odds)
-            sums = copy.deepcopy(tmp_odds)
-            bookmakers = copy.deepcopy(tmp_bookmakers)
-            continue
-        for i, tmp_odd in enumerate(tmp_odds):
-            sums[i] += tmp_odd
-            if tmp_odd > odds[i]:
-                odds[i] = tmp_odd
-                bookmakers[i] = bookmaker
-    values = []
-    best_rate = rate-1
-    n = len(match_odds["odds"])
-    i = 0
-    has_pinnacle = "pinnacle" in match_odds["odds"]
-    for odd, sum, bookmaker in zip(odds, sums, bookmakers):
-        if odd < 1.1:
-            return 0, []
-        ref = sum/n if not has_pinnacle else match_odds["odds"]["pinnacle"][i]
-        if ref < 1.1:
-            return 0, []
-        rate_tmp = odd/ref-1
-        if rate_tmp >= rate:
-            best_rate = max(best_rate, rate_tmp)
-        value = [odd, rate_tmp, bookmaker]
-        values.append(value)
-        i += 1
-    return best_rate, values
+def combine_reduit_chunk(snapshot, task):
+    """
+    Calcule les cotes combinées d'un paquet (indice, combinaisons de noms de matches) sur les
+    matches du snapshot. Les combinaisons sans site commun sont ignorées
+    """
+    index, matches_combine = task
+    odds_combine = []
+    for combine in matches_combine:
+        try:
+            odds_combine.append((" / ".join(combine),
+                                 cotes_combine_reduit_all_sites(*[snapshot["odds"][match] for match in combine])))
+        except KeyError:
+            pass
+    report_progress(snapshot, len(matches_combine))
+    return index, odds_combine
 
 
 def best_matches_combine2(site, minimum_odd, bet, sport, minimum_odd_selection, date_max=None, time_max=None,
@@ -780,19 +828,19 @@ def best_matches_combine2(site, minimum_odd, bet, sport, minimum_odd_selection,
     sb.PROGRESS = 0
     combis = cotes_combine_optimise([[1 for _ in range(3)] for i in range(nb_matches)])[1]
     print(combis)
-    def compute_all_odds_combine_optimise(nb_combine, combine, odds_combine_opt):
-        sb.PROGRESS += 100/nb_combine
-        try:
-            cotes_combination = cotes_combine_reduit_all_sites(
-                *[match[1] for match in combine]
-            )
-            for i in range(6):
-                odds_combine_opt[i][" / ".join([match[0] for match in combine])] = cotes_combination[i]
-#                 combis[i] = cotes_combination[i][1]
-        except KeyError:
-            pass
-    ThreadPool(4).map(lambda x: compute_all_odds_combine_optimise(nb_combine, x, odds_combine_opt),
-                      combinations(all_odds.items(), nb_matches))
+
+    def update_progress(nb_combinations):
+        sb.PROGRESS += 100 * nb_combinations / nb_combine
+    matches_combine = list(combinations(all_odds, nb_matches))
+    chunks = [(i, matches_combine[i:i + COMBINATIONS_PER_TASK])
+              for i in range(0, len(matches_combine), COMBINATIONS_PER_TASK)]
+    processes = None if nb_combine >= MIN_COMBINATIONS_PROCESSES else 1
+    # Les résultats sont rangés dans l'ordre des combinaisons, quel que soit l'ordre de calcul
+    results = dict(map_processes(combine_reduit_chunk, chunks, {"odds": all_odds}, update_progress, processes))
+    for i, _ in chunks:
+        for match_combine, cotes_combination in results[i]:
+            for j in range(6):
+                odds_combine_opt[j][match_combine] = cotes_combination[j]
     sb.PROGRESS = 0
     odds_function = get_best_odds(False)
     profit_function = get_profit(bet, False)
@@ -831,50 +879,42 @@ def convert_indices_to_opponents(combination_indices, matches, sport):
         combination_opponents.append(tuple(opponents))
     return combination_opponents
 
-def best_match_stakes_to_bet2(stakes, nb_matches=2, sport="football", date_max=None, time_max=None, identical_stakes=False):
-    second_sites = {stake[1] for stake in stakes if stake[1] != "unibet_boost"}
-    main_sites = sb.BOOKMAKERS
-    all_odds = get_matches_with_best_trj(sport, 20)
-    all_odds = filter_dict_dates(all_odds, date_max, time_max)
-    best_profit = -sum(stake[0] for stake in stakes)
-    n = 5#get_nb_outcomes(sport) ** nb_matches
+def best_stakes_chunk(snapshot, task):
+    """
+    Meilleure répartition des mises du snapshot sur un paquet (indice de la première combinaison,
+    combinaisons de noms de matches). Retourne le meilleur résultat du paquet sous la forme
+    ((profit, -numéro de la combinaison réduite, -indice), combinaison, mises), ou None
+    """
+    start, matches_combine = task
+    stakes, second_sites, main_sites, n, identical_stakes = (
+        snapshot[key] for key in ["stakes", "second_sites", "main_sites", "n", "identical_stakes"])
     nb_stakes = len(stakes)
-    all_odds_combine = [{} for _ in range(6)]
-    combis = list(combinations(all_odds.items(), nb_matches))
-    nb_combis = len(combis)
-    best_combine = None
-    best_bets = None
+    best = None
+    best_profit = -sum(stake[0] for stake in stakes)
     main_site_odds = []
     main_sites_distribution = []
-    sb.PROGRESS = 0
-    list_combinations = cotes_combine_optimise([[1 for _ in range(3)] for i in range(nb_matches)])[1]
-    for k in range(6):
-        for i, combine in enumerate(combis):
-            sb.PROGRESS += 100 / nb_combis
-            match_combine = " / ".join([match[0] for match in combine])
-            cotes_combination = cotes_combine_reduit_all_sites(
-                *[match[1] for match in combine]
-            )
-#             print(cotes_combination[k])
-            all_odds_combine[k][match_combine] = cotes_combination[k]
+    for i, combine in enumerate(matches_combine, start):
+        cotes_combination = cotes_combine_reduit_all_sites(*[snapshot["odds"][match] for match in combine])
+        for k in range(6):
+            odds_combine = cotes_combination[k]["odds"]
             for main0 in main_sites:
                 try:
                     main_sites_distribution = [main0 for _ in range(n)]
-                    main_site_odds = copy.deepcopy(all_odds_combine[k][match_combine]["odds"][main0])
+                    main_site_odds = copy.deepcopy(odds_combine[main0])
                     break
                 except KeyError:
                     pass
             for main in main_sites[:i] + main_sites[i + 1:]:
                 try:
-                    potential_odds = all_odds_combine[k][match_combine]["odds"][main]
+                    potential_odds = odds_combine[main]
                     for j, odd in enumerate(potential_odds):
                         if odd > main_site_odds[j]:
                             main_site_odds[j] = odd
                             main_sites_distribution[j] = main
                 except KeyError:
                     pass
-            second_odds = {second_site: all_odds_combine[k][match_combine]["odds"][second_site]
-                        for second_site in second_sites if second_site in all_odds_combine[k][match_combine]["odds"]}
+            second_odds = {second_site: odds_combine[second_site]
+                           for second_site in second_sites if second_site in odds_combine}
             if not second_odds:
                 continue
             dict_combine_odds = copy.deepcopy(second_odds)
@@ -891,16 +931,54 @@ def best_match_stakes_to_bet2(stakes, nb_matches=2, sport="football", date_max=N
                         break
                     continue
                 defined_bets_temp = defined_bets(main_site_odds, dict_combine_odds,
-                                                main_sites_distribution,
-                                                defined_second_sites)
+                                                 main_sites_distribution,
+                                                 defined_second_sites)
                 profit = defined_bets_temp[0] - np.sum(defined_bets_temp[1])
-                if profit > best_profit:
+                # À profit égal, la première combinaison réduite puis la première combinaison de
+                # matches l'emportent, comme dans un parcours séquentiel
+                key = (profit, -k, -i)
+                if profit > best_profit or (best and profit == best_profit and key > best[0]):
                     best_profit = profit
-                    best_combine = combine
-                    best_bets = defined_bets_temp
-                    best_combination = k
+                    best = key, combine, defined_bets_temp
                 if identical_stakes:
                     break
+    report_progress(snapshot, 6 * len(matches_combine))
+    return best
+
+
+def best_match_stakes_to_bet2(stakes, nb_matches=2, sport="football", date_max=None, time_max=None, identical_stakes=False):
+    second_sites = {stake[1] for stake in stakes if stake[1] != "unibet_boost"}
+    main_sites = sb.BOOKMAKERS
+    all_odds = get_matches_with_best_trj(sport, 20)
+    all_odds = filter_dict_dates(all_odds, date_max, time_max)
+    n = 5#get_nb_outcomes(sport) ** nb_matches
+    combis = list(combinations(all_odds, nb_matches))
+    nb_combis = len(combis)
+    best_combine = None
+    best_bets = None
+    sb.PROGRESS = 0
+    list_combinations = cotes_combine_optimise([[1 for _ in range(3)] for i in range(nb_matches)])[1]
+
+    def update_progress(nb_combinations):
+        sb.PROGRESS += 100 * nb_combinations / (6 * nb_combis)
+    snapshot = {"odds": {match: as_dict(odds) for match, odds in all_odds.items()}, "stakes": stakes,
+                "second_sites": second_sites, "main_sites": main_sites, "n": n,
+                "identical_stakes": identical_stakes}
+    chunks = [(i, combis[i:i + STAKES_COMBINATIONS_PER_TASK])
+              for i in range(0, nb_combis, STAKES_COMBINATIONS_PER_TASK)]
+    nb_permutations = 1 if identical_stakes else math.factorial(n) // math.factorial(max(n - len(stakes), 0))
+    nb_evaluations = 6 * nb_combis * nb_permutations
+    processes = None if nb_evaluations >= MIN_STAKES_EVALUATIONS_PROCESSES else 1
+    best = None
+    for result in map_processes(best_stakes_chunk, chunks, snapshot, update_progress, processes):
+        if result and (not best or result[0] > best[0]):
+            best = result
+    if best:
+        (best_profit, best_combination, _), best_match_names, best_bets = best
+        best_combination = -best_combination
+        best_combine = [(match, all_odds[match]) for match in best_match_names]
+        all_odds_combine = {best_combination: {" / ".join(best_match_names): cotes_combine_reduit_all_sites(
+            *[all_odds[match] for match in best_match_names])[best_combination]}}
     if best_combine:
         best_match_combine = " / ".join([match[0] for match in best_combine])
         odds_best_match = copy.deepcopy(all_odds_combine[best_combination][best_match_combine])
@@ -947,8 +1025,7 @@ def best_matches_freebet2(site, freebet, sport, nb_matches=2):
     best_combine_reduit(best_matches, best_choice, site, freebet, sport, best_odd-1, freebet=True)
 
 def get_matches_with_best_trj(sport, nb_matches):
-    matches = sorted(sb.ODDS[sport].items(), key=lambda x:trj_match(x[1])[0], reverse=True)[:nb_matches]
-    return {match:odds for match, odds in matches}
+    return {match: sb.ODDS[sport][match] for match in get_odds_index(sport).best_trj_matches(nb_matches)}
     
 
 def best_match_defi_rembourse_ou_gagnant(site, minimum_odd, stake, sport, date_max=None,
@@ -959,9 +1036,11 @@ def best_match_defi_rembourse_ou_gagnant(site, minimum_odd, stake, sport, date_m
     criteria = lambda odds_to_check, i: odds_to_check[i] >= minimum_odd
     display_function = lambda best_overall_odds, best_rank: mises_defi_rembourse_ou_gagnant(best_overall_odds, stake, best_rank, True)
     result_function = lambda best_overall_odds, best_rank: mises_defi_rembourse_ou_gagnant(best_overall_odds, stake, best_rank, False)
+    vectorized_functions = (get_best_odds_vectorized(False), get_minimum_odd_criteria_vectorized(minimum_odd, False),
+                            lambda odds_to_check: gain_defi_rembourse_ou_gagnant_vectorized(odds_to_check, stake))
     best_match_base(odds_function, profit_function, criteria, display_function,
                     result_function, site, sport, date_max, time_max, date_min,
-                    time_min)
+                    time_min, vectorized_functions=vectorized_functions)
 
 def get_sports_with_surebet():
     sports_with_surebet = []
@@ -970,9 +1049,7 @@ def get_sports_with_surebet():
             continue
         if sport not in sb.ODDS:
             continue
-        for match in sb.ODDS[sport]:
-            if trj_match(sb.ODDS[sport][match])[0]>=1:
-                sports_with_surebet.append(sport)
-                break
+        if get_odds_index(sport).best_trj() >= 1:
+            sports_with_surebet.append(sport)
     return sports_with_surebet
     
\ No newline at end of file
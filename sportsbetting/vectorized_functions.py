@@ -0,0 +1,418 @@
+"""
+Fonctions de calcul vectorisées (numpy) utilisées par le moteur de recherche du meilleur match
+"""
+
+import heapq
+import itertools
+import math
+
+import numpy as np
+
+from sportsbetting.odds_store import OddsStore
+from sportsbetting.process_functions import get_nb_processes, map_processes, report_progress
+
+
+def pack_odds(all_odds, site, n):
+    """
+    Regroupe les cotes des matches disponibles sur site dans un tenseur
+    (matches × bookmakers × issues), accompagné d'un masque de validité et du rang
+    de chaque bookmaker dans le dictionnaire des cotes du match
+    """
+    if isinstance(all_odds, OddsStore):
+        return all_odds.pack(site, n)
+    matches = [match for match in all_odds if site in all_odds[match]["odds"]]
+    bookmakers = sorted({bookmaker for match in matches for bookmaker in all_odds[match]["odds"]})
+    index = {bookmaker: j for j, bookmaker in enumerate(bookmakers)}
+    odds = np.ones((len(matches), len(bookmakers), n))
+    mask = np.zeros((len(matches), len(bookmakers)), dtype=bool)
+    ranks = np.full((len(matches), len(bookmakers)), len(bookmakers))
+    for k, match in enumerate(matches):
+        for rank, (bookmaker, odds_bookmaker) in enumerate(all_odds[match]["odds"].items()):
+            if len(odds_bookmaker) < n:
+                continue
+            j = index[bookmaker]
+            odds[k, j] = odds_bookmaker[:n]
+            mask[k, j] = True
+            ranks[k, j] = rank
+    return matches, bookmakers, odds, mask, ranks
+
+
+def best_odds_arrays(bookmakers, odds, mask, ranks, site, one_site=False):
+    """
+    Calcule, pour chaque match, les meilleures cotes disponibles en partant des cotes de site,
+    l'indice du bookmaker qui les propose et la validité du match (cotes toutes supérieures à
+    1.05 sauf sur pmu)
+    """
+    j_site = bookmakers.index(site)
+    odds_site = odds[:, j_site, :]
+    if one_site:
+        best_sites = np.full(odds_site.shape, j_site)
+        valid = np.all((odds_site >= 1.05) | (site == "pmu"), axis=1)
+        return odds_site.copy(), best_sites, valid
+    is_pmu = np.array([bookmaker == "pmu" for bookmaker in bookmakers])
+    is_boost = np.array([bookmaker == "unibet_boost" for bookmaker in bookmakers])
+    eligible = (mask[:, :, None] & ~is_boost[None, :, None]
+                & ((odds >= 1.05) | is_pmu[None, :, None]))
+    candidates = np.where(eligible, odds, -np.inf)
+    max_odds = candidates.max(axis=1, initial=-np.inf)
+    improved = max_odds > odds_site
+    best_odds = np.where(improved, max_odds, odds_site)
+    # En cas d'égalité, le premier bookmaker rencontré dans le dictionnaire du match l'emporte
+    first_ranks = np.where(candidates == max_odds[:, None, :], ranks[:, :, None], np.iinfo(ranks.dtype).max)
+    best_sites = np.where(improved, first_ranks.argmin(axis=1), j_site)
+    valid = np.all(improved | (odds_site >= 1.05) | (site == "pmu"), axis=1)
+    return best_odds, best_sites, valid
+
+
+def odds_to_check_tensor(best_odds, odds_rank):
+    """
+    Construit le tenseur (matches × rang × issues) des cotes à vérifier où, pour le rang i,
+    la cote i des meilleures cotes est remplacée par odds_rank[:, i]
+    """
+    n = best_odds.shape[-1]
+    tensor = np.repeat(best_odds[:, None, :], n, axis=1)
+    tensor[:, np.arange(n), np.arange(n)] = odds_rank
+    return tensor
+
+
+def diagonal(tensor):
+    """
+    Retourne, pour chaque rang i, la cote i du tenseur des cotes à vérifier
+    """
+    return np.diagonal(tensor, axis1=-2, axis2=-1)
+
+
+def is_defined(tensor):
+    """
+    Indique les cotes à vérifier pour lesquelles le calcul scalaire ne lèverait pas de
+    ZeroDivisionError
+    """
+    return np.all(tensor != 0, axis=-1)
+
+
+def gain_vectorized(cotes, mise=1):
+    """
+    Version vectorisée de gain (somme séquentielle pour des résultats identiques)
+    """
+    inverse_sum = 0
+    for k in range(cotes.shape[-1]):
+        inverse_sum = inverse_sum + 1 / cotes[..., k]
+    return mise / inverse_sum
+
+
+def gain2_vectorized(cotes, mise=1):
+    """
+    Version vectorisée de gain2 où la mise est placée sur la cote de rang i
+    """
+    cotes_rank = diagonal(cotes)
+    gains = mise * cotes_rank
+    sum_stakes = 0
+    for k in range(cotes.shape[-1]):
+        sum_stakes = sum_stakes + gains / cotes[..., k]
+    return cotes_rank * mise - sum_stakes
+
+
+def gain_pari_rembourse_si_perdant_vectorized(cotes, mise_max, remb_freebet=False,
+                                              taux_remboursement=1):
+    """
+    Version vectorisée de gain_pari_rembourse_si_perdant
+    """
+    taux = ((not remb_freebet) + 0.77 * remb_freebet) * taux_remboursement
+    n = cotes.shape[-1]
+    gains = mise_max * diagonal(cotes)
+    sum_stakes = 0
+    for k in range(n):
+        stake = np.where(np.arange(n) == k, mise_max, (gains - mise_max * taux) / cotes[..., k])
+        sum_stakes = sum_stakes + stake
+    return gains - sum_stakes
+
+
+def gain_promo_gain_cote_vectorized(cotes, mise_minimale):
+    """
+    Version vectorisée de gain_promo_gain_cote
+    """
+    n = cotes.shape[-1]
+    cotes_rank = diagonal(cotes)
+    gains = cotes_rank * 0.77 + mise_minimale * cotes_rank
+    sum_stakes = 0
+    for k in range(n):
+        stake = np.where(np.arange(n) == k, mise_minimale, gains / cotes[..., k])
+        sum_stakes = sum_stakes + stake
+    return gains - sum_stakes
+
+
+def gain_defi_rembourse_ou_gagnant_vectorized(odds, stake):
+    """
+    Version vectorisée de gain_defi_rembourse_ou_gagnant. Les répartitions impossibles valent
+    -inf
+    """
+    n = odds.shape[-1]
+    winning_outcome = np.arange(n)
+    sum_stakes = 0
+    possible = np.ones(odds.shape[:-1], dtype=bool)
+    for i in range(n):
+        parameter = 0
+        for j in range(n):
+            if j != i:
+                parameter = parameter + np.where(winning_outcome != j, 1 / odds[..., j], 0)
+        denominator = odds[..., i] * (1 - parameter) - 1
+        possible &= (denominator != 0) | (winning_outcome == i)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            stake_i = np.where(winning_outcome == i, stake, stake / denominator)
+        possible &= stake_i >= 0
+        sum_stakes = sum_stakes + stake_i
+    return np.where(possible, stake * diagonal(odds) - sum_stakes, -np.inf)
+
+
+def best_match_engine(all_odds, site, n, one_site, odds_function, criteria, profit_function):
+    """
+    Calcule en une fois les meilleures cotes, les bookmakers associés et le profit de chaque
+    issue de chaque match. Retourne la liste des matches, la liste des bookmakers, les indices
+    des meilleurs bookmakers (matches × issues) et les profits (matches × rang), valant -inf
+    lorsque l'issue n'est pas admissible
+    """
+    matches, bookmakers, odds, mask, ranks = pack_odds(all_odds, site, n)
+    if not matches:
+        return matches, bookmakers, np.zeros((0, n), dtype=int), np.zeros((0, n))
+    best_sites, profits = evaluate_odds(bookmakers, odds, mask, ranks, site, one_site, odds_function,
+                                        criteria, profit_function)
+    return matches, bookmakers, best_sites, profits
+
+
+def evaluate_odds(bookmakers, odds, mask, ranks, site, one_site, odds_function, criteria,
+                  profit_function):
+    """
+    Calcule les indices des meilleurs bookmakers et les profits (-inf si l'issue n'est pas
+    admissible) à partir du tenseur des cotes
+    """
+    best_odds, best_sites, valid = best_odds_arrays(bookmakers, odds, mask, ranks, site, one_site)
+    odds_site = odds[:, bookmakers.index(site), :]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        odds_to_check = odds_function(best_odds, odds_site)
+        admissible = valid[:, None] & criteria(odds_to_check) & is_defined(odds_to_check)
+        profits = np.where(admissible, profit_function(odds_to_check), -np.inf)
+    profits[~np.isfinite(profits)] = -np.inf
+    return best_sites, profits
+
+
+def combine_odds_tensor(odds, mask, indices):
+    """
+    Calcule les cotes combinées (combinaisons × bookmakers × issues combinées) des combinaisons
+    de matches indices, arrondies comme par cotes_combine, ainsi que la disponibilité de chaque
+    bookmaker sur tous les matches de la combinaison
+    """
+    combined_odds = odds[indices[:, 0]]
+    available = mask[indices[:, 0]]
+    for j in range(1, indices.shape[1]):
+        odds_j = odds[indices[:, j]]
+        combined_odds = (combined_odds[..., :, None] * odds_j[..., None, :]).reshape(
+            combined_odds.shape[:2] + (-1,))
+        available = available & mask[indices[:, j]]
+    return np.round(combined_odds, 4), available
+
+
+def reduced_combined_odds(odds_matches, sites, combinations, nb_outcomes):
+    """
+    Calcule les cotes combinées (sites × combinaisons) de combinaisons d'issues (tuples,
+    float("inf") désignant un match non joué) sur les matches odds_matches, en un produit masqué
+    sur le tableau sites × matches × issues. Comme dans le calcul site par site, le produit
+    s'arrête au premier match joué que le site ne propose pas, et la cote de unibet_boost vaut 0
+    pour les combinés de moins de 3 sélections. Retourne aussi les cotes restées entières
+    """
+    nb_matches = len(odds_matches)
+    odds = np.ones((len(sites), nb_matches, nb_outcomes))
+    integers = np.ones((len(sites), nb_matches, nb_outcomes), dtype=bool)
+    available = np.zeros((len(sites), nb_matches), dtype=bool)
+    for j, site in enumerate(sites):
+        for m, odds_match in enumerate(odds_matches):
+            if site in odds_match["odds"]:
+                odds[j, m] = odds_match["odds"][site]
+                integers[j, m] = [isinstance(odd, int) for odd in odds_match["odds"][site]]
+                available[j, m] = True
+    combinations = np.array(combinations, dtype=float).reshape(-1, nb_matches)
+    played = np.isfinite(combinations)
+    outcomes = np.where(played, combinations, 0).astype(np.intp)
+    used = played[None, :, :] & np.logical_and.accumulate(~played[None, :, :] | available[:, None, :], axis=2)
+    combined = np.ones((len(sites), len(combinations)))
+    combined_integers = np.ones((len(sites), len(combinations)), dtype=bool)
+    for m in range(nb_matches):
+        # Produit dans l'ordre des matches, pour des arrondis identiques au calcul site par site
+        combined = np.where(used[:, :, m], combined * odds[:, m, outcomes[:, m]], combined)
+        combined_integers &= ~used[:, :, m] | integers[:, m, outcomes[:, m]]
+    is_boost = np.array([site == "unibet_boost" for site in sites])
+    combined[is_boost[:, None] & (played.sum(axis=1) < 3)[None, :]] = 0
+    return combined, combined_integers
+
+
+def profit_upper_bounds(inverse_sums, inverse_sums_site, max_site, min_site, bet, minimum_odd, one_site):
+    """
+    Majorant du profit atteignable par des combinaisons de matches, à partir de minorants de la
+    somme des inverses des meilleures cotes combinées (produit des sommes des inverses des
+    meilleures cotes des matches) et de celle des cotes combinées de site, et d'un encadrement
+    des cotes combinées de site. Une marge couvre l'arrondi des cotes combinées
+    """
+    margin = 1e-4
+    max_odd = max_site * (1 + margin)
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        if one_site:
+            upper_bounds = bet / (inverse_sums_site * (1 - margin)) - bet
+        else:
+            surplus = 1 - inverse_sums * (1 - margin)
+            min_odd = np.maximum(min_site * (1 - margin), minimum_odd)
+            upper_bounds = bet * np.where(surplus >= 0, max_odd, min_odd) * surplus
+    return np.where(max_odd >= minimum_odd, upper_bounds, -np.inf)
+
+
+def suffix_extremes(values, function):
+    """
+    Retourne extremes où extremes[i] est l'extremum (function valant np.minimum ou np.maximum)
+    de values[i:], complété par l'élément neutre
+    """
+    neutral = np.inf if function is np.minimum else -np.inf
+    return np.append(function.accumulate(values[::-1])[::-1], neutral)
+
+
+def expand_combinations(prefixes, nb_values):
+    """
+    Prolonge chaque préfixe de combinaison (indices croissants) par chacun des indices suivants,
+    dans l'ordre lexicographique. Retourne les nouvelles combinaisons et l'indice de leur préfixe
+    """
+    last = prefixes[:, -1]
+    counts = nb_values - 1 - last
+    parents = np.repeat(np.arange(len(prefixes)), counts)
+    starts = np.cumsum(counts) - counts
+    children = np.arange(counts.sum()) - np.repeat(starts, counts) + np.repeat(last + 1, counts)
+    return np.column_stack([prefixes[parents], children]), parents
+
+
+def push_result(heap, in_heap, item, nb_results):
+    """
+    Ajoute item (profit, combinaison) aux nb_results meilleurs résultats s'il en fait partie
+    """
+    if item[1] in in_heap:
+        return
+    if len(heap) < nb_results:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        in_heap.discard(heapq.heapreplace(heap, item)[1])
+    else:
+        return
+    in_heap.add(item[1])
+
+
+def best_combinations(all_odds, site, n, nb_matches, bet, minimum_odd, one_site=False, nb_results=10,
+                      batch_size=20000, progress=None, processes=1):
+    """
+    Retourne, dans l'ordre des combinaisons, les nb_results combinaisons (tuples) de nb_matches
+    matches offrant le meilleur profit pour une mise bet sur une cote combinée d'au moins
+    minimum_odd. Les combinaisons sont parcourues dans l'ordre lexicographique, par premier match,
+    sans jamais être toutes construites : un préfixe n'est prolongé que si le majorant du profit
+    de ses prolongements dépasse le plus faible des profits retenus. Les premiers matches sont
+    répartis sur processes processus (None pour un par cœur), qui ne renvoient que leurs
+    meilleurs résultats
+    """
+    matches, bookmakers, odds, mask, _ = pack_odds(all_odds, site, n)
+    nb_values = len(matches)
+    if nb_values < nb_matches or nb_matches < 1 or site not in bookmakers:
+        return []
+    snapshot = {"bookmakers": bookmakers, "odds": odds, "mask": mask, "site": site, "nb_matches": nb_matches,
+                "bet": bet, "minimum_odd": minimum_odd, "one_site": one_site, "nb_results": nb_results,
+                "batch_size": batch_size}
+    heap = []
+    in_heap = set()
+    # Les combinaisons des matches de meilleur TRJ fournissent un premier seuil d'élagage
+    for item in search_combinations(snapshot, (True, [], -np.inf)):
+        push_result(heap, in_heap, item, nb_results)
+    firsts = list(range(nb_values - nb_matches + 1))
+    processes = get_nb_processes(processes)
+    nb_tasks = 1 if processes == 1 else min(len(firsts), 4 * processes)
+
+    def tasks():
+        """
+        Premiers matches entrelacés (pour équilibrer les tâches) et seuil d'élagage courant
+        """
+        for i in range(nb_tasks):
+            yield False, firsts[i::nb_tasks], heap[0][0] if len(heap) == nb_results else -np.inf
+
+    for items in map_processes(search_combinations, tasks(), snapshot, progress, processes):
+        for item in items:
+            push_result(heap, in_heap, item, nb_results)
+    return [tuple(matches[-i] for i in combination)
+            for _, combination in sorted(heap, key=lambda item: tuple(-i for i in item[1]))]
+
+
+def search_combinations(snapshot, task):
+    """
+    Recherche les meilleures combinaisons commençant par l'un des premiers matches de task
+    (ou parmi les matches de meilleur TRJ). Les préfixes dont le majorant du profit est inférieur
+    au seuil de task sont élagués. Retourne les meilleurs résultats (profit, -indices)
+    """
+    seeds_only, firsts, threshold = task
+    bookmakers, odds, mask, site = (snapshot[key] for key in ["bookmakers", "odds", "mask", "site"])
+    nb_matches, bet, minimum_odd, one_site, nb_results, batch_size = (
+        snapshot[key] for key in ["nb_matches", "bet", "minimum_odd", "one_site", "nb_results", "batch_size"])
+    nb_values = len(odds)
+    j_site = bookmakers.index(site)
+    is_boost = np.array([bookmaker == "unibet_boost" for bookmaker in bookmakers])
+    odds_site = odds[:, j_site, :]
+    best_odds = np.maximum(odds_site, np.where(mask[:, :, None] & ~is_boost[None, :, None], odds, 0).max(axis=1))
+    # Grandeurs par match dont le produit sur une combinaison borne son profit
+    factors = [np.sum(1 / best_odds, axis=1), np.sum(1 / odds_site, axis=1), odds_site.max(axis=1),
+               odds_site.min(axis=1)]
+    suffixes = [suffix_extremes(factor, np.maximum if i == 2 else np.minimum)
+                for i, factor in enumerate(factors)]
+    odds_function = ((lambda best, odds_site_combine: np.repeat(odds_site_combine[:, None, :],
+                                                                odds_site_combine.shape[-1], axis=1))
+                     if one_site else odds_to_check_tensor)
+    criteria = ((lambda odds_to_check: np.all(odds_to_check >= minimum_odd, axis=-1)) if one_site
+                else (lambda odds_to_check: diagonal(odds_to_check) >= minimum_odd))
+    profit_function = ((lambda odds_to_check: gain_vectorized(odds_to_check, bet) - bet) if one_site
+                       else (lambda odds_to_check: gain2_vectorized(odds_to_check, bet)))
+    combine_ranks = np.broadcast_to(np.arange(len(bookmakers)), (batch_size, len(bookmakers)))
+    heap = []
+    in_heap = set()
+
+    def evaluate(combinations):
+        """
+        Évalue exactement des combinaisons et met à jour les meilleurs résultats
+        """
+        for start in range(0, len(combinations), batch_size):
+            indices = combinations[start:start + batch_size]
+            combined_odds, available = combine_odds_tensor(odds, mask, indices)
+            _, profits = evaluate_odds(bookmakers, combined_odds, available, combine_ranks[:len(indices)],
+                                       site, one_site, odds_function, criteria, profit_function)
+            profits[~available[:, j_site]] = -np.inf
+            best_profits = profits.max(axis=1)
+            for k in np.flatnonzero(best_profits > -np.inf):
+                # À profit égal, la première combinaison dans l'ordre lexicographique est conservée
+                push_result(heap, in_heap, (best_profits[k], tuple(-indices[k])), nb_results)
+
+    def prune(combinations, products):
+        """
+        Conserve les combinaisons (éventuellement partielles) dont un prolongement peut entrer
+        dans les meilleurs résultats
+        """
+        remaining = nb_matches - combinations.shape[1]
+        next_index = combinations[:, -1] + 1
+        bounds = [product * suffix[next_index] ** remaining for product, suffix in zip(products, suffixes)]
+        upper_bounds = profit_upper_bounds(*bounds, bet, minimum_odd, one_site)
+        keep = upper_bounds > -np.inf
+        keep &= upper_bounds >= max(threshold, heap[0][0] if len(heap) == nb_results else -np.inf)
+        return combinations[keep], [product[keep] for product in products]
+
+    if seeds_only:
+        seeds = np.sort(np.argsort(factors[1] if one_site else factors[0], kind="stable")[:nb_matches + 6])
+        evaluate(np.array(list(itertools.combinations(seeds, nb_matches)), dtype=np.intp))
+    for first in firsts:
+        combinations = np.array([[first]], dtype=np.intp)
+        products = [factor[[first]] for factor in factors]
+        combinations, products = prune(combinations, products)
+        for _ in range(nb_matches - 1):
+            combinations, parents = expand_combinations(combinations, nb_values)
+            last = combinations[:, -1]
+            products = [product[parents] * factor[last] for product, factor in zip(products, factors)]
+            combinations, products = prune(combinations, products)
+        report_progress(snapshot, math.factorial(nb_values - first - 1)
+                                  // math.factorial(nb_matches - 1) // math.factorial(nb_values - first - nb_matches))
+        evaluate(combinations)
+    return heap
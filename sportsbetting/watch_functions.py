@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Suivi en continu des cotes : chaque source (site, compétition) est soit interrogée à intervalle
+régulier, soit suivie par abonnement lorsque le site le permet, et seules les différences avec les
+cotes précédentes de la source sont appliquées. Elles le sont sur une copie de l'OddsStore du
+sport (et de son index des surebets et des values), publiée dans sb.ODDS une fois à jour : les
+lecteurs ne voient jamais de cotes à moitié modifiées. Chaque modification est signalée par un
+OddsChange envoyé dans sb.QUEUE_TO_GUI
+"""
+
+import collections
+import copy
+import queue
+import sys
+import threading
+import time
+import traceback
+
+import sportsbetting as sb
+from sportsbetting.auxiliary_functions import get_nb_outcomes
+from sportsbetting.database_functions import get_competition_by_id, get_id_from_competition_name
+from sportsbetting.history_functions import record_odds
+from sportsbetting.odds_index import ODDS_LOCK, get_odds_index, publish_odds
+from sportsbetting.odds_store import OddsStore, as_dict
+from sportsbetting.parser_functions import SUBSCRIBE_FUNCTIONS, subscribe
+from sportsbetting.user_functions import PARSING_SEMAPHORE, format_competition_odds, parse_competition
+
+# Intervalle (en secondes) entre deux récupérations des cotes d'une source, par site ou par
+# (site, compétition)
+DEFAULT_WATCH_INTERVAL = 60
+WATCH_INTERVALS = {
+    "betfair": 30,
+    "pinnacle": 30,
+    "joa": 180,
+}
+
+# Modification des cotes d'un match sur un site (odds vaut None si le match a disparu du site).
+# trj est le TRJ du match après la modification
+OddsChange = collections.namedtuple("OddsChange", ["sport", "match", "site", "previous_odds", "odds", "trj"])
+
+
+def get_store(sport):
+    """
+    OddsStore des cotes de sport, créé (ou converti) si besoin
+    """
+    odds = sb.ODDS.get(sport)
+    if not isinstance(odds, OddsStore):
+        sb.ODDS[sport] = OddsStore(as_dict(odds) if odds else None, get_nb_outcomes(sport))
+    return sb.ODDS[sport]
+
+
+class OddsWatcher:
+    """
+    Suivi des cotes de competitions sur sites. feed(site, competition) retourne les cotes
+    (au format de parse_competition) d'une source, ou None si elles sont indisponibles ; par
+    défaut les cotes sont récupérées par parse_competition, ou par abonnement pour les sites de
+    SUBSCRIBE_FUNCTIONS si subscriptions vaut True. intervals complète WATCH_INTERVALS et les
+    modifications sont envoyées dans events (sb.QUEUE_TO_GUI par défaut)
+    """
+
+    def __init__(self, competitions, sport, sites, intervals=None, feed=None, subscriptions=True,
+                 events=None):
+        self.competitions = competitions
+        self.sport = sport
+        self.sites = sites
+        self.intervals = {**WATCH_INTERVALS, **(intervals or {})}
+        self.feed = feed
+        self.subscriptions = subscriptions and feed is None
+        self.events = sb.QUEUE_TO_GUI if events is None else events
+        self.sources = {}
+        self.updates = queue.Queue()
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.unsubscribe_functions = []
+
+    def get_interval(self, site, competition):
+        return self.intervals.get((site, competition), self.intervals.get(site, DEFAULT_WATCH_INTERVAL))
+
+    def start(self):
+        for site in self.sites:
+            for competition in self.competitions:
+                if not (self.subscriptions and site in SUBSCRIBE_FUNCTIONS and self.start_subscription(site, competition)):
+                    self.start_thread(self.poll, site, competition)
+        if self.unsubscribe_functions:
+            self.start_thread(self.dispatch)
+        return self
+
+    def start_thread(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+        for unsubscribe_function in self.unsubscribe_functions:
+            try:
+                unsubscribe_function()
+            except Exception:
+                print(traceback.format_exc(), file=sys.stderr)
+        self.updates.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def get_odds(self, site, competition):
+        if self.feed is not None:
+            return self.feed(site, competition)
+        with PARSING_SEMAPHORE:
+            return parse_competition(competition, self.sport, site)
+
+    def poll(self, site, competition):
+        """
+        Récupère les cotes d'une source à intervalle régulier
+        """
+        while not self.stop_event.is_set():
+            start = time.monotonic()
+            try:
+                odds = self.get_odds(site, competition)
+                if odds is not None:
+                    self.apply_odds(site, competition, odds)
+            except Exception:
+                print(traceback.format_exc(), file=sys.stderr)
+            self.stop_event.wait(max(0, self.get_interval(site, competition) - (time.monotonic() - start)))
+
+    def start_subscription(self, site, competition):
+        """
+        Abonnement aux cotes d'une source. Retourne False si la compétition ne peut pas être
+        suivie par abonnement
+        """
+        try:
+            database_site = site if site not in ["barrierebet", "vbet"] else "pasinobet"
+            url = get_competition_by_id(get_id_from_competition_name(competition, self.sport), database_site)
+            if not url or "https://" not in url:
+                return False
+            self.unsubscribe_functions.append(
+                subscribe(site, url, lambda odds: self.updates.put((site, competition, odds))))
+        except Exception:
+            print(traceback.format_exc(), file=sys.stderr)
+            return False
+        return True
+
+    def dispatch(self):
+        """
+        Applique les cotes reçues par abonnement (hors de la boucle des websockets, les noms
+        d'équipes étant convertis via la base de données)
+        """
+        while True:
+            update = self.updates.get()
+            if update is None or self.stop_event.is_set():
+                return
+            site, competition, odds = update
+            try:
+                self.apply_odds(site, competition, format_competition_odds({site: odds}, self.sport, competition))
+            except Exception:
+                print(traceback.format_exc(), file=sys.stderr)
+
+    def apply_odds(self, site, competition, odds):
+        """
+        Applique à sb.ODDS les différences entre odds et les cotes précédentes de la source, et
+        retourne la liste des OddsChange envoyés
+        """
+        changes = []
+        with ODDS_LOCK:
+            store = get_store(self.sport)
+            # L'index est obtenu avant toute modification pour que les surebets apparues dès la
+            # première mise à jour soient signalées
+            index = get_odds_index(self.sport)
+            previous = self.sources.get((site, competition), set())
+            current = set()
+            updates = []
+            for match, odds_match in odds.items():
+                odds_site = odds_match["odds"].get(site)
+                if not odds_site:
+                    continue
+                odds_site = list(odds_site)
+                current.add(match)
+                previous_odds = store[match]["odds"].get(site) if match in store else None
+                previous_odds = list(previous_odds) if previous_odds else None
+                if previous_odds != odds_site:
+                    updates.append((match, odds_match, previous_odds, odds_site))
+            removed = [match for match in previous - current if match in store and site in store[match]["odds"]]
+            self.sources[(site, competition)] = current
+            if updates or removed:
+                store = copy.copy(store)
+                index = index.copy(store)
+                for match, odds_match, previous_odds, odds_site in updates:
+                    if match in store:
+                        match_odds = store[match]
+                        match_odds["odds"][site] = odds_site
+                        if site in odds_match.get("id", {}):
+                            match_odds["id"] = dict(match_odds.get("id") or {}, **{site: odds_match["id"][site]})
+                    else:
+                        store[match] = {"odds": {site: odds_site}, "date": odds_match.get("date"),
+                                        "id": {site: odds_match["id"][site]} if site in odds_match.get("id", {}) else {},
+                                        "competition": odds_match.get("competition")}
+                    changes.append((match, previous_odds, odds_site))
+                for match in removed:
+                    changes.append((match, list(store[match]["odds"][site]), None))
+                    del store[match]["odds"][site]
+                    if not store[match]["odds"]:
+                        del store[match]
+                publish_odds(self.sport, store, index)
+            events = [OddsChange(self.sport, match, site, previous_odds, odds_site,
+                                 index.entries[match][0] if match in index.entries else 0)
+                      for match, previous_odds, odds_site in changes]
+            if sb.HISTORY and changes:
+                record_odds(self.sport, {match: store[match].to_dict() for match, _, _ in changes if match in store})
+        for event in events:
+            self.events.put(event)
+        return events
+
+
+def watch_competitions(competitions, sport, *sites, intervals=None, **kwargs):
+    """
+    Lance le suivi des cotes de competitions sur sites (tous les bookmakers par défaut) et
+    retourne l'OddsWatcher correspondant (à arrêter avec stop)
+    """
+    return OddsWatcher(competitions, sport, sites or sb.BOOKMAKERS, intervals, **kwargs).start()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests du suivi des cotes, sur une source rejouant des cotes enregistrées
+"""
+
+import datetime
+import queue
+import threading
+
+import sportsbetting as sb
+from sportsbetting.odds_index import get_odds_index
+from sportsbetting.odds_store import OddsStore
+from sportsbetting.watch_functions import OddsWatcher
+
+
+class ReplayFeed:
+    """
+    Rejoue, pour chaque source (site, compétition), une suite de cotes enregistrées puis ne
+    renvoie plus rien (None). done est levé lorsque toutes les sources ont été rejouées
+    """
+
+    def __init__(self, recordings):
+        self.recordings = {source: list(odds) for source, odds in recordings.items()}
+        self.lock = threading.Lock()
+        self.calls = []
+        self.done = threading.Event()
+
+    def __call__(self, site, competition):
+        with self.lock:
+            self.calls.append((site, competition))
+            recording = self.recordings[(site, competition)]
+            odds = recording.pop(0) if recording else None
+            if not any(self.recordings.values()):
+                self.done.set()
+            return odds
+
+
+def get_odds(site, odds_matches):
+    date = datetime.datetime(2030, 1, 1, 20)
+    return {match: {"odds": {site: odds}, "date": date, "id": {site: match[:3]}, "competition": "Ligue 1"}
+            for match, odds in odds_matches.items()}
+
+
+def test_watch(monkeypatch):
+    monkeypatch.setattr(sb, "HISTORY", False)
+    monkeypatch.setattr(sb, "ODDS", {})
+    monkeypatch.setitem(sb.SEEN_SUREBET, "football", True)
+    sb.ODDS["football"] = OddsStore(get_odds("betclic", {"Marseille - Lyon": [2, 3.4, 3.6],
+                                                         "Lille - Nice": [1.8, 3.5, 4.5]}))
+    feed = ReplayFeed({
+        ("winamax", "Ligue 1"): [get_odds("winamax", {"Marseille - Lyon": [2, 3.3, 3.5]}),
+                                 get_odds("winamax", {"Marseille - Lyon": [2, 3.3, 3.5]}),
+                                 get_odds("winamax", {"Marseille - Lyon": [2.3, 3.6, 3.9],
+                                                      "Lille - Nice": [1.9, 3.4, 4]}),
+                                 get_odds("winamax", {"Marseille - Lyon": [2.3, 3.6, 3.9]}),
+                                 get_odds("winamax", {})],
+        ("unibet", "Ligue 1"): [get_odds("unibet", {"Rennes - Lens": [2.1, 3.2, 3.4]})]})
+    events = queue.Queue()
+    watcher = OddsWatcher(["Ligue 1"], "football", ["winamax", "unibet"], feed=feed, events=events,
+                          intervals={"winamax": 0.01, ("unibet", "Ligue 1"): 10}).start()
+    assert feed.done.wait(5)
+    watcher.stop()
+    assert feed.calls.count(("unibet", "Ligue 1")) == 1
+    changes = []
+    while not events.empty():
+        changes.append(events.get())
+    winamax_changes = [change for change in changes if change.site == "winamax"]
+    assert [(change.match, change.odds) for change in winamax_changes] == [
+        ("Marseille - Lyon", [2, 3.3, 3.5]),
+        ("Marseille - Lyon", [2.3, 3.6, 3.9]),
+        ("Lille - Nice", [1.9, 3.4, 4]),
+        ("Lille - Nice", None),
+        ("Marseille - Lyon", None)]
+    surebet = winamax_changes[1]
+    assert surebet.previous_odds == [2, 3.3, 3.5] and surebet.trj > 1
+    odds = sb.ODDS["football"]
+    assert dict(odds["Marseille - Lyon"]["odds"]) == {"betclic": [2, 3.4, 3.6]}
+    assert dict(odds["Rennes - Lens"]["odds"]) == {"unibet": [2.1, 3.2, 3.4]}
+    assert odds["Rennes - Lens"]["date"] == datetime.datetime(2030, 1, 1, 20)
+    assert not sb.SEEN_SUREBET["football"]
+    assert get_odds_index("football").surebets() == []
+
+
+def test_first_update_and_publication(monkeypatch):
+    monkeypatch.setattr(sb, "HISTORY", False)
+    monkeypatch.setattr(sb, "ODDS", {})
+    monkeypatch.setitem(sb.SEEN_SUREBET, "football", True)
+    sb.ODDS["football"] = OddsStore(get_odds("betclic", {"Marseille - Lyon": [2, 3.4, 3.6]}))
+    store = sb.ODDS["football"]
+    watcher = OddsWatcher(["Ligue 1"], "football", ["winamax"], feed=lambda site, competition: None,
+                          events=queue.Queue())
+    changes = watcher.apply_odds("winamax", "Ligue 1", get_odds("winamax", {"Marseille - Lyon": [2.3, 3.6, 3.9]}))
+    assert changes[0].trj > 1 and not sb.SEEN_SUREBET["football"]
+    assert dict(store["Marseille - Lyon"]["odds"]) == {"betclic": [2, 3.4, 3.6]}
+    assert sb.ODDS["football"] is not store
+    assert get_odds_index("football").surebets() == ["Marseille - Lyon"]
+    assert get_odds_index("football").odds is sb.ODDS["football"]
+    published = sb.ODDS["football"]
+    assert watcher.apply_odds("winamax", "Ligue 1", get_odds("winamax", {"Marseille - Lyon": [2.3, 3.6, 3.9]})) == []
+    assert sb.ODDS["football"] is published
@@ -0,0 +1,240 @@
+"""
+Client websocket persistant de l'API swarm (pasinobet, vbet, barrierebet) : une seule connexion
+et une seule session par site_id, sur laquelle les requêtes sont envoyées sans attendre les
+réponses précédentes (chaque réponse est associée à sa requête par son rid). Les abonnements
+(subscribe) reçoivent les mises à jour des cotes au fil de l'eau
+"""
+
+import asyncio
+import atexit
+import itertools
+import json
+import ssl
+import threading
+
+import websockets
+
+import sportsbetting as sb
+
+SWARM_URL = "wss://swarm-2.vbet.fr/"
+DEFAULT_TIMEOUT = 30
+UPDATE_RID = "0"
+
+LOOP = None
+LOOP_LOCK = threading.Lock()
+CLIENTS = {}
+
+
+def get_loop():
+    """
+    Boucle asyncio (lancée dans un thread dédié) sur laquelle vivent toutes les connexions
+    """
+    global LOOP
+    with LOOP_LOCK:
+        if LOOP is None:
+            LOOP = asyncio.new_event_loop()
+            threading.Thread(target=LOOP.run_forever, daemon=True).start()
+        return LOOP
+
+
+def run(coroutine, timeout=None):
+    """
+    Exécute une coroutine sur la boucle des connexions et attend son résultat
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, get_loop()).result(timeout)
+
+
+def merge_update(data, update):
+    """
+    Applique une mise à jour swarm à data : les dictionnaires sont fusionnés récursivement et
+    les valeurs None suppriment la clé correspondante
+    """
+    for key, value in update.items():
+        if value is None:
+            data.pop(key, None)
+        elif isinstance(value, dict) and isinstance(data.get(key), dict):
+            merge_update(data[key], value)
+        else:
+            data[key] = value
+    return data
+
+
+class SwarmClient:
+    """
+    Connexion swarm d'un site_id. La connexion (et la session) est ouverte à la première requête
+    et rouverte si le serveur la ferme, les abonnements en cours étant alors renouvelés
+    """
+
+    def __init__(self, site_id, url=SWARM_URL, language="fra", timeout=DEFAULT_TIMEOUT):
+        self.site_id = site_id
+        self.url = url
+        self.language = language
+        self.timeout = timeout
+        self.websocket = None
+        self.reader = None
+        self.lock = None
+        self.rids = itertools.count(1)
+        self.pending = {}
+        self.subscriptions = {}
+
+    async def connect(self):
+        """
+        Ouvre la connexion et la session si besoin
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            if self.websocket is not None:
+                return
+            ssl_context = ssl.SSLContext(protocol=ssl.PROTOCOL_TLS) if self.url.startswith("wss") else None
+            websocket = await websockets.connect(self.url, ssl=ssl_context, max_size=None)
+            self.websocket = websocket
+            self.reader = asyncio.ensure_future(self.read(websocket))
+            try:
+                await self.send("request_session", {"language": self.language, "site_id": self.site_id})
+                subscriptions = list(self.subscriptions.values())
+                self.subscriptions = {}
+                for subscription in subscriptions:
+                    await self.start_subscription(subscription)
+            except BaseException:
+                self.websocket = None
+                await websocket.close()
+                raise
+
+    async def read(self, websocket):
+        """
+        Distribue les messages reçus : réponses aux requêtes en attente et mises à jour des
+        abonnements
+        """
+        try:
+            async for message in websocket:
+                response = json.loads(message)
+                rid = str(response.get("rid"))
+                future = self.pending.pop(rid, None)
+                if future is not None:
+                    if not future.done():
+                        future.set_result(response)
+                elif rid == UPDATE_RID:
+                    for subid, update in response.get("data", {}).items():
+                        subscription = self.subscriptions.get(subid)
+                        if subscription is not None:
+                            merge_update(subscription["data"], update)
+                            if subscription["callback"]:
+                                subscription["callback"](subscription["data"])
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if self.websocket is websocket:
+                self.websocket = None
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connexion swarm fermée"))
+            self.pending = {}
+
+    async def send(self, command, params):
+        """
+        Envoie une commande sur la connexion ouverte et attend la réponse associée
+        """
+        rid = str(next(self.rids))
+        future = asyncio.get_event_loop().create_future()
+        self.pending[rid] = future
+        try:
+            await self.websocket.send(json.dumps({"command": command, "params": params, "rid": rid}))
+            response = await asyncio.wait_for(future, self.timeout)
+        finally:
+            self.pending.pop(rid, None)
+        if response.get("code") != 0:
+            raise sb.UnavailableSiteException("Erreur swarm : {}".format(response.get("msg")))
+        return response.get("data", {})
+
+    async def request(self, command, params):
+        """
+        Envoie une commande, en rouvrant une fois la connexion si elle a été fermée
+        """
+        for attempt in range(2):
+            await self.connect()
+            try:
+                return await self.send(command, params)
+            except (ConnectionError, websockets.ConnectionClosed):
+                if attempt:
+                    raise
+
+    async def start_subscription(self, subscription):
+        data = await self.send("get", dict(subscription["params"], subscribe=True))
+        subscription["subid"] = str(data["subid"])
+        subscription["data"] = data.get("data", {})
+        self.subscriptions[subscription["subid"]] = subscription
+        if subscription["callback"]:
+            subscription["callback"](subscription["data"])
+        return subscription
+
+    async def async_subscribe(self, params, callback=None):
+        for attempt in range(2):
+            await self.connect()
+            try:
+                subscription = {"params": params, "callback": callback}
+                return await self.start_subscription(subscription)
+            except (ConnectionError, websockets.ConnectionClosed):
+                if attempt:
+                    raise
+
+    async def async_unsubscribe(self, subid):
+        if self.subscriptions.pop(subid, None) is not None and self.websocket is not None:
+            await self.send("unsubscribe", {"subid": subid})
+
+    async def async_close(self):
+        self.subscriptions = {}
+        if self.websocket is not None:
+            await self.websocket.close()
+        if self.reader is not None:
+            await self.reader
+
+    def get(self, params):
+        """
+        Résultat d'une commande get
+        """
+        return run(self.request("get", params))
+
+    def get_all(self, list_params):
+        """
+        Résultats de plusieurs commandes get, envoyées sans attendre les réponses
+        """
+        async def get_all():
+            return await asyncio.gather(*(self.request("get", params) for params in list_params))
+        return run(get_all())
+
+    def subscribe(self, params, callback=None):
+        """
+        Abonnement à une commande get : callback(data) est appelée avec les données initiales
+        puis après chaque mise à jour. Retourne l'identifiant de l'abonnement
+        """
+        return run(self.async_subscribe(params, callback))["subid"]
+
+    def get_subscription(self, subid):
+        return self.subscriptions[subid]["data"]
+
+    def unsubscribe(self, subid):
+        run(self.async_unsubscribe(subid))
+
+    def close(self):
+        run(self.async_close(), self.timeout)
+
+
+def get_swarm_client(site_id, url=SWARM_URL):
+    """
+    Client swarm partagé d'un site_id
+    """
+    with LOOP_LOCK:
+        if (url, site_id) not in CLIENTS:
+            CLIENTS[(url, site_id)] = SwarmClient(site_id, url)
+        return CLIENTS[(url, site_id)]
+
+
+@atexit.register
+def close_clients():
+    for client in list(CLIENTS.values()):
+        if client.websocket is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests du client swarm, sur un serveur websocket local imitant l'API de pasinobet
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+import websockets
+
+from sportsbetting.bookmakers import pasinobet
+from sportsbetting.websocket_functions import SwarmClient
+
+
+def get_league_data(id_league, price=2.5):
+    """
+    Données swarm d'une compétition réduite à un match
+    """
+    events = {str(i): {"price": price + i, "order": i} for i in range(3)}
+    game = {"id": id_league * 10, "start_ts": 1900000000, "team1_name": "A{}".format(id_league),
+            "team2_name": "B{}".format(id_league), "market": {"1": {"event": events}}}
+    competition = {"name": "Ligue {}".format(id_league), "teams_reversed": False,
+                   "game": {str(id_league * 10): game}}
+    return {"region": {"1": {"name": "France", "competition": {str(id_league): competition}}}}
+
+
+class SwarmStub:
+    """
+    Serveur swarm local : une requête sur deux est retardée, si bien que les réponses n'arrivent
+    pas dans l'ordre des requêtes, et les abonnements reçoivent une mise à jour à la demande.
+    max_pending est le nombre maximal de requêtes reçues en attente de leur réponse
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.connections = 0
+        self.sessions = []
+        self.requests = 0
+        self.pending = 0
+        self.max_pending = 0
+        self.websockets = []
+        self.subscriptions = {}
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.server = asyncio.run_coroutine_threadsafe(self.serve(), self.loop).result()
+        self.url = "ws://127.0.0.1:{}".format(self.server.sockets[0].getsockname()[1])
+
+    async def serve(self):
+        return await websockets.serve(self.handler, "127.0.0.1", 0)
+
+    async def handler(self, websocket, path=None):
+        self.connections += 1
+        self.websockets.append(websocket)
+        async for message in websocket:
+            request = json.loads(message)
+            if request["command"] == "request_session":
+                self.sessions.append(request["params"]["site_id"])
+                await websocket.send(json.dumps({"code": 0, "rid": request["rid"], "data": {"sid": "1"}}))
+                continue
+            if request["command"] == "unsubscribe":
+                del self.subscriptions[request["params"]["subid"]]
+                await websocket.send(json.dumps({"code": 0, "rid": request["rid"], "data": {}}))
+                continue
+            self.requests += 1
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+            asyncio.ensure_future(self.respond(request, websocket, 0.2 if self.requests % 2 else 0))
+
+    async def respond(self, request, websocket, delay):
+        await asyncio.sleep(delay)
+        self.pending -= 1
+        await websocket.send(json.dumps(self.get_response(request, websocket)))
+
+    def get_response(self, request, websocket):
+        params = request["params"]
+        if "sport" in params["where"]:
+            data = {"competition": {str(i): {"id": i, "name": "Ligue {}".format(i)} for i in range(1, 5)}}
+            data["competition"]["5"] = {"id": 5, "name": "Compétition test"}
+        else:
+            data = get_league_data(params["where"]["competition"]["id"])
+        response = {"code": 0, "rid": request["rid"], "data": {"data": data}}
+        if params.get("subscribe"):
+            subid = str(len(self.subscriptions) + 1)
+            self.subscriptions[subid] = websocket
+            response["data"]["subid"] = subid
+        return response
+
+    def update(self, subid, update):
+        message = json.dumps({"code": 0, "rid": "0", "data": {subid: update}})
+        asyncio.run_coroutine_threadsafe(self.subscriptions[subid].send(message), self.loop).result()
+
+    def disconnect(self):
+        for websocket in self.websockets:
+            asyncio.run_coroutine_threadsafe(websocket.close(), self.loop).result()
+
+    def close(self):
+        self.server.close()
+        asyncio.run_coroutine_threadsafe(self.server.wait_closed(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+@pytest.fixture
+def swarm(monkeypatch):
+    stub = SwarmStub()
+    clients = {}
+    monkeypatch.setattr(pasinobet, "get_swarm_client",
+                        lambda site_id: clients.setdefault(site_id, SwarmClient(site_id, stub.url, timeout=5)))
+    yield stub
+    for client in clients.values():
+        client.close()
+    stub.close()
+
+
+def test_persistent_session(swarm):
+    odds = pasinobet.parse_pasinobet("https://www.pasinobet.fr/#/sport/competition/1")
+    assert odds["A1 - B1"]["odds"] == {"pasinobet": [2.5, 3.5, 4.5]}
+    swarm.max_pending = 0
+    odds = pasinobet.parse_pasinobet_sport("Football", False, False)
+    assert swarm.max_pending > 1
+    assert set(odds) == {"A1 - B1", "A2 - B2", "A3 - B3", "A4 - B4"}
+    assert odds["A2 - B2"]["competition"] == "France - Ligue 2"
+    odds = pasinobet.parse_pasinobet("https://www.vbet.fr/paris-sportifs/competition/2", vbet=True)
+    assert odds["A2 - B2"]["odds"] == {"vbet": [2.5, 3.5, 4.5]}
+    assert swarm.connections == 2 and swarm.sessions == ["599", "277"]
+    assert swarm.requests == 7
+
+
+def test_reconnection(swarm):
+    pasinobet.parse_pasinobet("https://www.pasinobet.fr/#/sport/competition/1")
+    swarm.disconnect()
+    time.sleep(0.1)
+    odds = pasinobet.parse_pasinobet("https://www.pasinobet.fr/#/sport/competition/2")
+    assert "A2 - B2" in odds and swarm.connections == 2
+
+
+def test_subscription(swarm):
+    updates = []
+    subid = pasinobet.subscribe_pasinobet("https://www.pasinobet.fr/#/sport/competition/1", updates.append)
+    assert updates[-1]["A1 - B1"]["odds"] == {"pasinobet": [2.5, 3.5, 4.5]}
+    game_update = {"market": {"1": {"event": {"1": {"price": 3.2}}}}}
+    swarm.update(subid, {"region": {"1": {"competition": {"1": {"game": {"10": game_update}}}}}})
+    swarm.update(subid, {"region": {"1": {"competition": {"1": {"game": {"10": None}}}}}})
+    for _ in range(50):
+        if len(updates) == 3:
+            break
+        time.sleep(0.02)
+    assert updates[1]["A1 - B1"]["odds"] == {"pasinobet": [2.5, 3.2, 4.5]}
+    assert updates[2] == {}
+    pasinobet.unsubscribe_pasinobet(subid)
+    assert not swarm.subscriptions